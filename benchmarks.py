@@ -0,0 +1,535 @@
+"""
+Micro-benchmarks for the voice agent hot paths
+Runs against a local SQLite (or Postgres) stand-in of the BTO schema - never production.
+
+Usage:
+    python benchmarks.py queries [--db sqlite:///bench_bto.db] [--iterations 2000]
+    python benchmarks.py intents [--iterations 2000]
+    python benchmarks.py phones [--iterations 2000]
+    python benchmarks.py responses [--db sqlite:///bench_bto.db] [--iterations 2000]
+    python benchmarks.py twiml [--db sqlite:///bench_bto.db] [--iterations 2000]
+    python benchmarks.py all [--save-baseline | --compare] [--baseline bench_baseline.json]
+
+--save-baseline stores each benchmark's stats (per suite, so one suite can be re-recorded alone);
+--compare re-runs and exits 1 if any p50 got slower than the baseline by more than --tolerance.
+Baselines are only comparable on the same machine and Python - record one before a change.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+DEFAULT_BENCH_DB = "sqlite:///bench_bto.db"
+DEFAULT_BASELINE = "bench_baseline.json"
+
+# A p50 this much slower than the baseline is a regression...
+REGRESSION_TOLERANCE = 0.25
+# ...unless it is also within this many µs (timer jitter on the sub-microsecond rows)
+REGRESSION_MIN_DELTA_US = 1.0
+
+_seeded = {}
+
+
+def measure(func, iterations: int, warmup: int = 50) -> dict:
+    """Per-call latency stats in microseconds"""
+
+    for _ in range(warmup):
+        func()
+
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1e6)
+
+    samples.sort()
+    return {
+        'mean_us': round(statistics.fmean(samples), 1),
+        'p50_us': round(samples[len(samples) // 2], 1),
+        'p95_us': round(samples[int(len(samples) * 0.95) - 1], 1),
+        'iterations': iterations
+    }
+
+
+def print_table(title: str, rows: list):
+    print("=" * 78)
+    print(title)
+    print("=" * 78)
+    print(f"{'benchmark':<44}{'mean µs':>11}{'p50 µs':>11}{'p95 µs':>11}")
+    print("-" * 78)
+    for name, stats in rows:
+        print(f"{name:<44}{stats['mean_us']:>11.1f}{stats['p50_us']:>11.1f}{stats['p95_us']:>11.1f}")
+    print("=" * 78)
+
+
+def prepare_database(db_url: str, customers: int = 500) -> list:
+    """Point the app at a fresh stand-in DB and seed it; returns seeded phones"""
+
+    # Once per process - database.py's engine stays bound to the first URL, and deleting the
+    # SQLite file under its pooled connections would leave them on the unlinked copy
+    if (db_url, customers) in _seeded:
+        return _seeded[(db_url, customers)]
+
+    if db_url.startswith("sqlite:///"):
+        path = db_url[len("sqlite:///"):]
+        if os.path.exists(path):
+            os.remove(path)
+
+    # Must be set before database.py is imported - it builds the shared engine at import
+    os.environ["DATABASE_URL"] = db_url
+
+    from database import engine
+    from bto_schema import create_bto_schema, seed_bto_sample
+
+    create_bto_schema(engine)
+    _seeded[(db_url, customers)] = seed_bto_sample(engine, customers=customers)
+    return _seeded[(db_url, customers)]
+
+
+def bench_queries(db_url: str, iterations: int) -> list:
+    """TVSBTOAgent hot queries: text() rebuilt per call (before) vs module-level statements (after)"""
+
+    phones = prepare_database(db_url)
+
+    from sqlalchemy import text
+    from database import SessionLocal
+    import langchain_agent
+    from langchain_agent import TVSBTOAgent
+
+    agent = TVSBTOAgent()
+    phone = phones[len(phones) // 2]
+    statements = [
+        ('get_booking_by_phone', langchain_agent.BOOKING_BY_PHONE_SQL, {"phone": phone}),
+        ('get_booking_snapshot', langchain_agent.BOOKING_SNAPSHOT_SQL, {"phone": phone}),
+        ('get_cancellation_info', langchain_agent.CANCELLATION_INFO_SQL, {"phone": phone}),
+        ('get_order_history', langchain_agent.ORDER_HISTORY_SQL, {"phone": phone}),
+    ]
+
+    rows = []
+    db = SessionLocal()
+    try:
+        for name, statement, params in statements:
+            sql = statement.text
+            rows.append((f"{name}: text() per call",
+                         measure(lambda: db.execute(text(sql), params).fetchall(), iterations)))
+            rows.append((f"{name}: precompiled",
+                         measure(lambda: db.execute(statement, params).fetchall(), iterations)))
+    finally:
+        db.close()
+
+    # End to end through the agent (session checkout + query + row mapping)
+    quiet = open(os.devnull, 'w')
+    stdout, sys.stdout = sys.stdout, quiet
+    try:
+        rows.append(("agent.get_booking_snapshot", measure(lambda: agent.get_booking_snapshot(phone), iterations)))
+        rows.append(("agent.get_order_history", measure(lambda: agent.get_order_history(phone), iterations)))
+        rows.append(("agent.log_call", measure(lambda: agent.log_call(phone, 'status', 'completed', 'CA-bench'),
+                                               max(iterations // 10, 10))))
+        batch = [{'phone_number': p, 'intent': 'status', 'outcome': 'completed', 'call_id': 'CA-bench'}
+                 for p in phones[:100]]
+        batch_stats = measure(lambda: agent.log_calls(batch), max(iterations // 100, 5), warmup=2)
+        rows.append(("agent.log_calls (per call, batches of 100)",
+                     {key: round(value / len(batch), 1) if key.endswith('_us') else value
+                      for key, value in batch_stats.items()}))
+    finally:
+        sys.stdout = stdout
+        quiet.close()
+
+    print_table(f"TVSBTOAgent queries ({db_url})", rows)
+    return rows
+
+
+# Typical caller turns - a mix of intents, yes/no answers, escalations and goodbyes
+INTENT_CORPUS = [
+    "Hi, I want to know the status of my booking",
+    "Where is my bike right now",
+    "When will my Apache be delivered to the dealership",
+    "Can you track the dispatch for me",
+    "I want to cancel my booking and get a refund",
+    "yes",
+    "no thanks",
+    "Okay.",
+    "Please connect me to a human agent",
+    "My scooter has a warranty problem, it's not working",
+    "Hmm I'm not sure what I wanted to ask",
+    "That's all, thank you, bye",
+    "Can I get an update on the progress of my vehicle order please",
+    "nope",
+]
+
+
+def _legacy_scans(user_message: str) -> tuple:
+    """The per-turn keyword scans as they were before intent_classifier (AI fallback left out)"""
+
+    user_lower = user_message.lower()
+
+    end_phrases = ['bye', 'goodbye', 'thank you', 'thanks', "that's all", 'nothing else', 'no thanks']
+    if any(phrase in user_lower for phrase in end_phrases):
+        return None, False, True
+
+    if 'cancel' in user_lower or 'refund' in user_lower:
+        intent = 'cancellation'
+    elif any(w in user_lower for w in ['delivery', 'when', 'arrive', 'dispatch', 'track']):
+        intent = 'delivery'
+    elif any(w in user_lower for w in ['status', 'where', 'update', 'progress', 'vehicle', 'bike']):
+        intent = 'status'
+    else:
+        intent = None
+
+    escalate = False
+    if user_lower.strip() not in ['no', 'nope', 'no thanks']:
+        explicit_escalation = ['human', 'agent', 'manager', 'supervisor', 'speak to', 'connect me', 'call back']
+        problem_words = ['warranty', 'accident', 'damage', 'defect', 'broken', 'not working', 'issue', 'problem']
+        escalate = (any(word in user_lower for word in explicit_escalation)
+                    or any(word in user_lower for word in problem_words))
+
+    # main.should_end_call scanned the caller's speech once more
+    end_call = any(phrase in user_lower for phrase in ['goodbye', 'bye', 'thank you', 'thanks', "that's all", 'nothing else'])
+    return intent, escalate, end_call
+
+
+def bench_intents(iterations: int) -> list:
+    """Per-turn keyword scans: legacy any() chains vs one compiled single-pass classifier"""
+
+    from intent_classifier import classifier
+
+    def legacy():
+        for utterance in INTENT_CORPUS:
+            _legacy_scans(utterance)
+
+    def compiled():
+        for utterance in INTENT_CORPUS:
+            classifier.classify(utterance)
+
+    per_turn = lambda stats: {key: round(value / len(INTENT_CORPUS), 2) if key.endswith('_us') else value
+                              for key, value in stats.items()}
+    rows = [
+        ("legacy keyword scans (per utterance)", per_turn(measure(legacy, iterations))),
+        ("compiled classifier (per utterance)", per_turn(measure(compiled, iterations))),
+    ]
+    print_table(f"Intent classification ({len(INTENT_CORPUS)} utterances)", rows)
+
+    # The scans are microseconds; the real cost is every turn that falls through to the LLM
+    legacy_ai = sum(1 for u in INTENT_CORPUS if _legacy_scans(u)[0] is None and not _legacy_scans(u)[2])
+    compiled_ai = 0
+    for utterance in INTENT_CORPUS:
+        result = classifier.classify(utterance)
+        labels = result['labels']
+        if not result['intent'] and not labels.keys() & {'end_call', 'escalation', 'problem'}:
+            compiled_ai += 1
+    print(f"LLM fallbacks: legacy {legacy_ai}/{len(INTENT_CORPUS)}, compiled {compiled_ai}/{len(INTENT_CORPUS)}")
+    return rows
+
+
+# en-IN ASR transcripts of callers giving their number -> number we should look up (None = must re-ask)
+PHONE_CORPUS = [
+    ("nine eight seven six five four three two one zero", "+919876543210"),
+    ("98765 43210", "+919876543210"),
+    ("my number is 9876543210", "+919876543210"),
+    ("it's double nine eight seven triple five four three two", "+919987555432"),
+    ("plus nine one nine eight seven six five four three two one zero", "+919876543210"),
+    ("+91 98765 43210", "+919876543210"),
+    ("919876543210", "+919876543210"),
+    ("zero nine eight seven six five four three two one zero", "+919876543210"),
+    ("nine eight oh seven six five four three two one", "+919807654321"),
+    ("um nine eight seven uh six five four three two one zero", "+919876543210"),
+    ("ninety eight seventy six fifty four thirty two ten", "+919876543210"),
+    ("nau aath saat chhe paanch char teen do ek shunya", "+919876543210"),
+    ("नौ आठ सात छह पांच चार तीन दो एक शून्य", "+919876543210"),
+    ("nine one double zero seven seven eight eight one one", "+919100778811"),
+    ("my phone number is seven zero one one two two three three four four", "+917011223344"),
+    ("eight double oh eight one two three four five six", "+918008123456"),
+    ("six three nine nine zero one two three four five please", "+916399012345"),
+    ("someone's phone", None),
+    ("I don't know it", None),
+    ("nine eight seven six five", None),
+]
+
+
+def _legacy_extract_phone_number(speech: str) -> str:
+    """main.extract_phone_number as it was before phone_parser"""
+
+    speech = speech.lower().replace(" ", "").replace("nine", "9").replace("eight", "8").replace("seven", "7").replace("six", "6").replace("five", "5").replace("four", "4").replace("three", "3").replace("two", "2").replace("one", "1").replace("zero", "0").replace("oh", "0")
+    phone = ''.join(filter(str.isdigit, speech))
+    if len(phone) == 10 or len(phone) == 12:
+        phone = phone[-10:]
+        return '+91' + phone
+    return None
+
+
+def bench_phones(iterations: int) -> list:
+    """Spoken phone numbers: chained str.replace (before) vs tokenizing parser (after)"""
+
+    from phone_parser import parse_phone_number
+
+    min_confidence = float(os.getenv("PHONE_MIN_CONFIDENCE", "0.6"))
+
+    def parsed(speech):
+        result = parse_phone_number(speech)
+        return result['phone'] if result['confidence'] >= min_confidence else None
+
+    rows = [
+        ("legacy str.replace chain (per transcript)",
+         measure(lambda: [_legacy_extract_phone_number(t) for t, _ in PHONE_CORPUS], iterations)),
+        ("phone_parser (per transcript)",
+         measure(lambda: [parse_phone_number(t) for t, _ in PHONE_CORPUS], iterations)),
+    ]
+    rows = [(name, {key: round(value / len(PHONE_CORPUS), 2) if key.endswith('_us') else value
+                    for key, value in stats.items()}) for name, stats in rows]
+    print_table(f"Phone number parsing ({len(PHONE_CORPUS)} transcripts)", rows)
+
+    for name, extract in (("legacy", _legacy_extract_phone_number), ("phone_parser", parsed)):
+        correct = sum(1 for text, expected in PHONE_CORPUS if extract(text) == expected)
+        wrong = sum(1 for text, expected in PHONE_CORPUS if extract(text) not in (None, expected))
+        reprompts = sum(1 for text, expected in PHONE_CORPUS if expected and extract(text) is None)
+        print(f"{name:<14} correct {correct}/{len(PHONE_CORPUS)}, wrong number {wrong}, "
+              f"needless re-prompts {reprompts}")
+    return rows
+
+
+# One caller turn per generate_response branch: (name, utterance, conversation so far)
+CANCEL_QUOTE = [{'role': 'user', 'content': "I want to cancel my booking"},
+                {'role': 'assistant', 'content': "A 10% cancellation fee of ₹9000 applies. Should I proceed?"}]
+RESPONSE_CASES = [
+    ('status', "where is my bike right now", []),
+    ('delivery', "when will it be delivered", []),
+    ('cancellation quote', "I want to cancel my booking", []),
+    ('yes (confirms cancellation)', "yes", CANCEL_QUOTE),
+    ('no (keeps booking)', "no", CANCEL_QUOTE),
+    ('escalation', "please connect me to a manager", []),
+    ('end of call', "that's all, thank you, bye", []),
+    ('unclear (n-gram / cached AI)', "hmm I'm not sure what I wanted to ask", []),
+]
+
+
+def bench_responses(db_url: str, iterations: int) -> list:
+    """generate_response per intent branch, booking snapshot cold (first turn) and warm (later turns)"""
+
+    phones = prepare_database(db_url)
+    from database import init_db
+    from business_logic import TVSBusinessLogic
+    from intent_classifier import normalize_utterance
+    from write_behind import write_queue
+
+    quiet = open(os.devnull, 'w')
+    stdout, sys.stdout = sys.stdout, quiet
+    rows = []
+    try:
+        init_db()
+        write_queue.start()  # escalations are queued as they are on the server
+        logic = TVSBusinessLogic()
+
+        # Never reach OpenAI from a benchmark - the unclear turn resolves from the n-gram model or this
+        for _, utterance, _ in RESPONSE_CASES:
+            logic.ai_intent_cache.set(normalize_utterance(utterance), 'status')
+
+        # A caller whose cancellation needs confirming exercises the escalation write too
+        phone = next((p for p in phones if logic.quote_cancellation(p, None).get('action') == 'pending_confirmation'),
+                     phones[len(phones) // 2])
+        call_sid = 'CA-bench-responses'
+
+        def turn(utterance, history, cold):
+            def run():
+                if cold:
+                    logic.invalidate_booking_snapshot(call_sid, phone)
+                logic.generate_response(phone, utterance, call_sid, history)
+            return run
+
+        for name, utterance, history in RESPONSE_CASES:
+            if name in ('status', 'delivery'):
+                rows.append((f"{name}: cold snapshot", measure(turn(utterance, history, True), iterations)))
+                rows.append((f"{name}: warm snapshot", measure(turn(utterance, history, False), iterations)))
+            else:
+                # the rest don't read the snapshot, or (cancellation) drop it themselves
+                rows.append((name, measure(turn(utterance, history, False), iterations)))
+    finally:
+        write_queue.stop()
+        sys.stdout = stdout
+        quiet.close()
+
+    print_table(f"generate_response by branch ({db_url})", rows)
+    return rows
+
+
+def bench_twiml(db_url: str, iterations: int) -> list:
+    """TwiML: VoiceResponse tree built per request (before) vs pre-rendered templates (after),
+    then requests/sec through the real webhook endpoints"""
+
+    import twiml_templates as templates
+
+    reply = "Great! Your Racing Red Apache RTR 310 Dual Disc is packed and ready for dispatch."
+    phone_gather = {'timeout': 5, 'speech_timeout': '3'}
+    speech_gather = {'timeout': 10, 'speech_timeout': 'auto'}
+    cases = [
+        ('greeting', templates._greeting, templates.GREETING, phone_gather),
+        ('phone retry', templates._phone_retry, templates.PHONE_RETRY, phone_gather),
+        ('phone confirmed', templates._phone_confirmed, templates.PHONE_CONFIRMED,
+         dict(speech_gather, phone='+919876543210')),
+        ('reply + gather', templates._reply_and_continue, templates.REPLY_AND_CONTINUE, dict(speech_gather, message=reply)),
+    ]
+
+    rows = []
+    for name, build, template, values in cases:
+        rows.append((f"{name}: VoiceResponse per request",
+                     measure(lambda: str(build(lambda slot: values[slot])), iterations)))
+        rows.append((f"{name}: template", measure(lambda: template.render(**values), iterations)))
+    print_table("TwiML rendering", rows)
+
+    # End to end through FastAPI (form parsing, session store, business logic, TwiML)
+    phones = prepare_database(db_url)
+    from fastapi.testclient import TestClient
+    from database import init_db
+    import main
+
+    init_db()
+    main.write_queue.start()
+    quiet = open(os.devnull, 'w')
+    stdout, sys.stdout = sys.stdout, quiet
+    endpoint_rows = []
+    try:
+        client = TestClient(main.app)
+        client.post('/voice', data={'CallSid': 'CA-bench', 'From': phones[0]})
+        client.post('/get-phone-number', data={'CallSid': 'CA-bench', 'SpeechResult': phones[0][3:]})
+        webhooks = [
+            ('POST /voice', '/voice', {'CallSid': 'CA-bench-new', 'From': phones[1]}),
+            ('POST /get-phone-number (retry)', '/get-phone-number', {'CallSid': 'CA-bench', 'SpeechResult': 'hmm'}),
+            ('POST /process-speech', '/process-speech',
+             {'CallSid': 'CA-bench', 'SpeechResult': 'where is my bike'}),
+        ]
+        count = max(iterations // 10, 50)
+        for name, path, form in webhooks:
+            stats = measure(lambda: client.post(path, data=form), count, warmup=10)
+            endpoint_rows.append((name, stats))
+    finally:
+        sys.stdout = stdout
+        quiet.close()
+        main.write_queue.stop()
+
+    print_table(f"Webhook endpoints via TestClient ({db_url})", endpoint_rows)
+    for name, stats in endpoint_rows:
+        print(f"{name:<44}{1e6 / stats['mean_us']:>10.0f} req/s (single client)")
+    return rows + endpoint_rows
+
+
+SUITES = {
+    'queries': lambda args: bench_queries(args.db, args.iterations),
+    'intents': lambda args: bench_intents(args.iterations),
+    'phones': lambda args: bench_phones(args.iterations),
+    'responses': lambda args: bench_responses(args.db, args.iterations),
+    'twiml': lambda args: bench_twiml(args.db, args.iterations),
+}
+
+
+def environment() -> dict:
+    """What a baseline was recorded on - numbers from another machine or Python aren't comparable"""
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count()
+    }
+
+
+def load_baseline(path: str) -> dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_baseline(path: str, results: dict, db_url: str, iterations: int):
+    """Store this run's stats per suite; suites that weren't run keep their old baseline"""
+
+    baseline = load_baseline(path) if os.path.exists(path) else {'suites': {}}
+    for suite, rows in results.items():
+        baseline['suites'][suite] = {
+            'recorded_at': datetime.now().isoformat(timespec='seconds'),
+            'environment': environment(),
+            'db': db_url,
+            'iterations': iterations,
+            'benchmarks': {name: stats for name, stats in rows}
+        }
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    print(f"💾 Saved baseline for {', '.join(results)} to {path}")
+
+
+def compare_to_baseline(baseline: dict, results: dict, tolerance: float = REGRESSION_TOLERANCE,
+                        min_delta_us: float = REGRESSION_MIN_DELTA_US) -> list:
+    """p50 of every benchmark vs the baseline; returns the regressions"""
+
+    regressions = []
+    print("=" * 78)
+    print(f"Baseline comparison (p50, regression = >{tolerance:.0%} and >{min_delta_us} µs slower)")
+    print("=" * 78)
+    print(f"{'benchmark':<44}{'base µs':>11}{'now µs':>11}{'change':>12}")
+    print("-" * 78)
+    for suite, rows in results.items():
+        recorded = baseline.get('suites', {}).get(suite)
+        if recorded is None:
+            print(f"⚠️ No baseline for '{suite}' - record one with --save-baseline")
+            continue
+        if recorded['environment'] != environment():
+            print(f"⚠️ '{suite}' baseline was recorded on {recorded['environment']} - expect noise")
+
+        for name, stats in rows:
+            before = recorded['benchmarks'].get(name)
+            if before is None:
+                print(f"{name:<44}{'new':>11}{stats['p50_us']:>11.1f}")
+                continue
+            base, now = before['p50_us'], stats['p50_us']
+            change = (now - base) / base if base else 0.0
+            flag = ''
+            if now - base > min_delta_us and change > tolerance:
+                flag = ' ❌'
+                regressions.append({'suite': suite, 'benchmark': name, 'base_p50_us': base,
+                                    'p50_us': now, 'change': round(change, 3)})
+            elif base - now > min_delta_us and -change > tolerance:
+                flag = ' ✅'
+            print(f"{name:<44}{base:>11.1f}{now:>11.1f}{change:>+11.0%}{flag}")
+    print("=" * 78)
+
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s) against the baseline")
+    else:
+        print("✅ No regressions against the baseline")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Voice agent micro-benchmarks")
+    parser.add_argument("suite", choices=list(SUITES) + ["all"], help="what to benchmark")
+    parser.add_argument("--db", default=DEFAULT_BENCH_DB, help="stand-in database URL (never production)")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline file for --save-baseline/--compare")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--save-baseline", action="store_true", help="record these results as the baseline")
+    mode.add_argument("--compare", action="store_true", help="fail (exit 1) on regressions against the baseline")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE,
+                        help="allowed p50 slowdown as a fraction (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        try:
+            baseline = load_baseline(args.baseline)
+        except (OSError, ValueError) as e:
+            sys.exit(f"❌ Could not read baseline {args.baseline}: {e}")
+
+    suites = list(SUITES) if args.suite == "all" else [args.suite]
+    results = {suite: SUITES[suite](args) for suite in suites}
+
+    if args.save_baseline:
+        save_baseline(args.baseline, results, args.db, args.iterations)
+    elif args.compare:
+        if compare_to_baseline(baseline, results, args.tolerance):
+            sys.exit(1)
@@ -0,0 +1,196 @@
+"""
+Local stand-in for the TVS BTO schema queried by TVSBTOAgent
+(users, dealerships, bookings, cancellations, order_status_history, call_logs)
+Works on SQLite and Postgres so benchmarks and load tests can run without Neon.
+"""
+
+import random
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+ORDER_STATUSES = [
+    'order_received',
+    'order_confirmed',
+    'order_manufactured',
+    'order_packed',
+    'order_dispatched',
+    'at_dealership'
+]
+
+# Cancellation fee (% of the booking amount) by how far the order has got - what TVSBTOAgent quotes
+CANCELLATION_FEE_PCT = {
+    'order_received': 0,
+    'order_confirmed': 25,
+    'order_manufactured': 50,
+    'order_packed': 75,
+    'order_dispatched': 100,
+    'at_dealership': 100
+}
+
+BTO_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id VARCHAR(36) PRIMARY KEY,
+        full_name VARCHAR(200),
+        email VARCHAR(200),
+        phone_e164 VARCHAR(20)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS dealerships (
+        id VARCHAR(36) PRIMARY KEY,
+        name VARCHAR(200),
+        city VARCHAR(100)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS bookings (
+        id VARCHAR(36) PRIMARY KEY,
+        booking_public_id VARCHAR(50),
+        user_id VARCHAR(36),
+        dealership_id VARCHAR(36),
+        vehicle_name VARCHAR(100),
+        model_variant VARCHAR(100),
+        color VARCHAR(50),
+        booking_status VARCHAR(50),
+        order_status VARCHAR(50),
+        is_cancelled BOOLEAN NOT NULL DEFAULT FALSE,
+        booking_date TIMESTAMP,
+        order_received_at TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS cancellations (
+        id VARCHAR(36) PRIMARY KEY,
+        booking_id VARCHAR(36),
+        fee_pct NUMERIC,
+        fee_amount NUMERIC,
+        refund_amount NUMERIC,
+        created_at TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS order_status_history (
+        id VARCHAR(36) PRIMARY KEY,
+        booking_id VARCHAR(36),
+        status VARCHAR(50),
+        updated_on TIMESTAMP,
+        comment TEXT
+    )
+    """,
+]
+
+CALL_LOGS_TABLE = """
+    CREATE TABLE IF NOT EXISTS call_logs (
+        id {id_column},
+        call_id VARCHAR(100),
+        booking_id VARCHAR(36),
+        user_id VARCHAR(36),
+        from_number VARCHAR(20),
+        intent VARCHAR(50),
+        outcome VARCHAR(50),
+        started_at TIMESTAMP
+    )
+"""
+
+# The lookups in TVSBTOAgent all start from users.phone_e164 and pick the latest booking
+BTO_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_users_phone ON users (phone_e164)",
+    "CREATE INDEX IF NOT EXISTS idx_bookings_user_date ON bookings (user_id, booking_date)",
+    "CREATE INDEX IF NOT EXISTS idx_cancellations_booking ON cancellations (booking_id)",
+    "CREATE INDEX IF NOT EXISTS idx_order_status_history_booking ON order_status_history (booking_id, updated_on)",
+]
+
+
+def create_bto_schema(engine, indexes: bool = True):
+    """Create the BTO tables (and indexes, unless a bulk load will add them after) if they don't exist"""
+
+    id_column = "BIGSERIAL PRIMARY KEY" if engine.dialect.name == "postgresql" else "INTEGER PRIMARY KEY AUTOINCREMENT"
+    with engine.begin() as conn:
+        for ddl in BTO_TABLES + [CALL_LOGS_TABLE.format(id_column=id_column)]:
+            conn.execute(text(ddl))
+    if indexes:
+        create_bto_indexes(engine)
+    print("✅ BTO schema ready")
+
+
+def create_bto_indexes(engine):
+    with engine.begin() as conn:
+        for ddl in BTO_INDEXES:
+            conn.execute(text(ddl))
+
+
+def phone_for(index: int) -> str:
+    """Deterministic customer phone number for seeded user #index"""
+    return f"+9196{index:08d}"
+
+
+def seed_bto_sample(engine, customers: int = 200, seed: int = 7) -> list:
+    """Insert a small deterministic dataset; returns the seeded phone numbers"""
+
+    rng = random.Random(seed)
+    now = datetime(2025, 10, 1)
+    dealerships = [
+        {'id': str(uuid.UUID(int=rng.getrandbits(128))), 'name': name, 'city': city}
+        for name, city in [('S V AUTOMOTIVES', 'Chennai'), ('TVS Showroom Delhi', 'New Delhi'),
+                           ('Sri Motors', 'Bengaluru'), ('Patel Auto', 'Ahmedabad')]
+    ]
+    users, bookings, cancellations, history = [], [], [], []
+
+    for i in range(customers):
+        user_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        users.append({'id': user_id, 'full_name': f"Customer {i}", 'email': f"customer{i}@example.com",
+                      'phone_e164': phone_for(i)})
+
+        booking_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        status_index = rng.randrange(len(ORDER_STATUSES))
+        booked = now - timedelta(days=rng.randrange(90))
+        bookings.append({
+            'id': booking_id,
+            'booking_public_id': f"BTO{2025000 + i}",
+            'user_id': user_id,
+            'dealership_id': rng.choice(dealerships)['id'],
+            'vehicle_name': rng.choice(['Apache RTR 310', 'Apache RTR 160', 'Jupiter', 'Ronin']),
+            'model_variant': rng.choice(['Standard', 'Dual Disc', 'Special Edition']),
+            'color': rng.choice(['Racing Red', 'Matte Black', 'Pearl White']),
+            'booking_status': 'confirmed',
+            'order_status': ORDER_STATUSES[status_index],
+            'is_cancelled': False,
+            'booking_date': booked,
+            'order_received_at': booked
+        })
+        for step in range(status_index + 1):
+            history.append({
+                'id': str(uuid.UUID(int=rng.getrandbits(128))),
+                'booking_id': booking_id,
+                'status': ORDER_STATUSES[step],
+                'updated_on': booked + timedelta(days=step * 3),
+                'comment': f"Moved to {ORDER_STATUSES[step].replace('_', ' ')}"
+            })
+        if rng.random() < 0.1:
+            cancellations.append({'id': str(uuid.UUID(int=rng.getrandbits(128))), 'booking_id': booking_id,
+                                  'fee_pct': 25, 'fee_amount': 12500, 'refund_amount': 37500, 'created_at': booked})
+
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO dealerships (id, name, city) VALUES (:id, :name, :city)"), dealerships)
+        conn.execute(text("INSERT INTO users (id, full_name, email, phone_e164) VALUES (:id, :full_name, :email, :phone_e164)"), users)
+        conn.execute(text("""
+            INSERT INTO bookings (id, booking_public_id, user_id, dealership_id, vehicle_name, model_variant, color,
+                                  booking_status, order_status, is_cancelled, booking_date, order_received_at)
+            VALUES (:id, :booking_public_id, :user_id, :dealership_id, :vehicle_name, :model_variant, :color,
+                    :booking_status, :order_status, :is_cancelled, :booking_date, :order_received_at)
+        """), bookings)
+        conn.execute(text("""
+            INSERT INTO order_status_history (id, booking_id, status, updated_on, comment)
+            VALUES (:id, :booking_id, :status, :updated_on, :comment)
+        """), history)
+        if cancellations:
+            conn.execute(text("""
+                INSERT INTO cancellations (id, booking_id, fee_pct, fee_amount, refund_amount, created_at)
+                VALUES (:id, :booking_id, :fee_pct, :fee_amount, :refund_amount, :created_at)
+            """), cancellations)
+
+    print(f"✅ Seeded {customers} BTO customers")
+    return [user['phone_e164'] for user in users]
@@ -3,79 +3,465 @@ TVS BTO Business Logic - IMPROVED with better intent detection
 """
 
 from langchain_agent import TVSBTOAgent
-from database import save_conversation, create_escalation
+from database import save_conversation
+from write_behind import write_queue
+from cache import TTLCache
+from circuit_breaker import CircuitBreaker
+import metrics
+import tracing
+from intent_classifier import classifier, normalize_utterance
+from ngram_classifier import load_model as load_ngram_model, NGRAM_MIN_CONFIDENCE
 from datetime import datetime
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Per-call booking snapshots: loaded once, reused for every turn of the call
+BOOKING_SNAPSHOT_TTL = float(os.getenv("BOOKING_SNAPSHOT_TTL", "120"))
+BOOKING_SNAPSHOT_MAX_CALLS = int(os.getenv("BOOKING_SNAPSHOT_MAX_CALLS", "10000"))
+
+# How long a turn waits for an in-flight prefetch before querying itself
+PREFETCH_WAIT_SECONDS = float(os.getenv("PREFETCH_WAIT_SECONDS", "1.5"))
+
+# AI intent answers for unclear utterances, keyed by normalized text (empty path = memory only)
+AI_INTENT_CACHE_SIZE = int(os.getenv("AI_INTENT_CACHE_SIZE", "5000"))
+AI_INTENT_CACHE_TTL = float(os.getenv("AI_INTENT_CACHE_TTL", "86400"))
+AI_INTENT_CACHE_PATH = os.getenv("AI_INTENT_CACHE_PATH", "")
+
+# Latency budget for one turn; the LLM fallback only gets what is left of it
+TURN_LATENCY_BUDGET = float(os.getenv("TURN_LATENCY_BUDGET", "2.5"))
+TURN_RESPONSE_RESERVE = float(os.getenv("TURN_RESPONSE_RESERVE", "0.5"))  # kept for the DB lookup + reply
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "2.0"))
+LLM_MIN_TIMEOUT_SECONDS = float(os.getenv("LLM_MIN_TIMEOUT_SECONDS", "0.3"))
+
+# Stop calling OpenAI while it is failing or slow
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_SLOW_SECONDS = float(os.getenv("LLM_BREAKER_SLOW_SECONDS", "1.5"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+
+# Answers computed from partial speech results, kept until the final result arrives
+SPECULATION_TTL = float(os.getenv("SPECULATION_TTL", "30"))
+SPECULATIVE_INTENTS = ('status', 'delivery', 'cancellation')
+
 
 class TVSBusinessLogic:
     """Business logic handler for TVS BTO voice agent - IMPROVED"""
     
     def __init__(self):
         self.agent = TVSBTOAgent()
+        self.booking_snapshots = TTLCache(maxsize=BOOKING_SNAPSHOT_MAX_CALLS, ttl=BOOKING_SNAPSHOT_TTL)
+        
+        # Speculative prefetch bookkeeping (see prefetch_call_data)
+        self._prefetch_lock = threading.Lock()
+        self._prefetch_inflight = {}
+        self._prefetch_markers = TTLCache(maxsize=BOOKING_SNAPSHOT_MAX_CALLS, ttl=BOOKING_SNAPSHOT_TTL)
+        self._prefetch_counts = {
+            'started': 0,
+            'completed': 0,
+            'failed': 0,
+            'hits': 0,
+            'misses': 0,
+            'time_saved_seconds': 0.0
+        }
+        
+        # Repeat phrasings ("hello", "my booking") skip the LLM round trip
+        self.ai_intent_cache = TTLCache(maxsize=AI_INTENT_CACHE_SIZE, ttl=AI_INTENT_CACHE_TTL)
+        self.ai_intent_cache_path = AI_INTENT_CACHE_PATH
+        self.ai_calls = 0
+        self.llm_breaker = CircuitBreaker(
+            'openai-intent',
+            failure_threshold=LLM_BREAKER_FAILURES,
+            slow_call_seconds=LLM_BREAKER_SLOW_SECONDS,
+            reset_timeout=LLM_BREAKER_RESET_SECONDS
+        )
+        self._llm_lock = threading.Lock()
+        self._llm_counts = {'turns': 0, 'seconds': 0.0, 'max_seconds': 0.0, 'defaulted': 0,
+                            'breaker_open': 0, 'no_budget': 0}
+        
+        # Local n-gram model answers most unclear utterances before the LLM is asked
+        self.ngram_model = load_ngram_model()
+        self._ngram_counts = {'answered': 0, 'deferred': 0}
+        
+        # Early dispatch on partial speech results (see speculate_response)
+        self.speculations = TTLCache(maxsize=BOOKING_SNAPSHOT_MAX_CALLS, ttl=SPECULATION_TTL)
+        self._speculation_counts = {
+            'started': 0,
+            'used': 0,
+            'discarded': 0,
+            'failed': 0,
+            'time_saved_seconds': 0.0,
+            'head_start_seconds': 0.0
+        }
+        if self.ai_intent_cache_path:
+            try:
+                loaded = self.ai_intent_cache.load(self.ai_intent_cache_path)
+                print(f"✅ Loaded {loaded} cached AI intents from {self.ai_intent_cache_path}")
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Could not load AI intent cache: {e}")
     
-    def classify_intent(self, user_message: str) -> str:
-        """Hybrid: Fast if-else + Smart AI fallback"""
+    def get_booking_snapshot(self, phone_number: str, call_sid: str = None) -> dict:
+        """Booking + cancellation data for this call, from cache when warm"""
         
-        user_lower = user_message.lower()
+        key = call_sid or phone_number
         
-        # FAST PATH: Keywords (99% of cases)
-        if 'cancel' in user_lower or 'refund' in user_lower:
-            return 'cancellation'
+        # A prefetch may still be running from /get-phone-number - wait for it briefly
+        waited = 0.0
+        pending = self._prefetch_inflight.get(key)
+        if pending is not None:
+            wait_start = time.perf_counter()
+            pending.wait(PREFETCH_WAIT_SECONDS)
+            waited = time.perf_counter() - wait_start
         
-        if any(w in user_lower for w in ['delivery', 'when', 'arrive', 'dispatch', 'track']):
-            return 'delivery'
+        marker = self._prefetch_markers.get(key)
+        if marker is not None:
+            self._prefetch_markers.invalidate(key)  # only the first lookup counts
         
-        if any(w in user_lower for w in ['status', 'where', 'update', 'progress', 'vehicle', 'bike']):
-            return 'status'
+        snapshot = self.booking_snapshots.get(key)
+        if snapshot is not None and snapshot['phone'] == phone_number:
+            if marker is not None:
+                self._record_prefetch('hits', max(0.0, (marker['load_seconds'] or 0.0) - waited))
+            return snapshot['result']
+        
+        if marker is not None:
+            self._record_prefetch('misses')
+        
+        result = self.agent.get_booking_snapshot(phone_number)
+        
+        # Cache hits and genuine misses; DB errors are retried on the next turn
+        if result['success'] or result.get('error') == "Booking not found":
+            self.booking_snapshots.set(key, {'phone': phone_number, 'result': result, 'history': None})
+        
+        return result
+    
+    def get_order_history(self, phone_number: str, call_sid: str = None) -> dict:
+        """Order status timeline, from the prefetched snapshot when available"""
+        
+        snapshot = self.booking_snapshots.get(call_sid or phone_number)
+        if snapshot is not None and snapshot['phone'] == phone_number and snapshot.get('history'):
+            return snapshot['history']
+        
+        return self.agent.get_order_history(phone_number)
+    
+    @tracing.traced('prefetch')
+    def prefetch_call_data(self, phone_number: str, call_sid: str):
+        """Warm booking, cancellation and history data while the caller hears the pause"""
+        
+        key = call_sid or phone_number
+        done = threading.Event()
+        with self._prefetch_lock:
+            if key in self._prefetch_inflight:
+                return
+            self._prefetch_inflight[key] = done
+            self._prefetch_counts['started'] += 1
+        
+        self._prefetch_markers.set(key, {'load_seconds': None})
+        start = time.perf_counter()
+        try:
+            result = self.agent.get_booking_snapshot(phone_number)
+            history = self.agent.get_order_history(phone_number) if result['success'] else None
+            
+            if result['success'] or result.get('error') == "Booking not found":
+                self.booking_snapshots.set(key, {'phone': phone_number, 'result': result, 'history': history})
+                self._prefetch_markers.set(key, {'load_seconds': time.perf_counter() - start})
+                self._record_prefetch('completed')
+                print(f"⚡ Prefetched booking data for {call_sid} in {time.perf_counter() - start:.2f}s")
+            else:
+                self._prefetch_markers.invalidate(key)
+                self._record_prefetch('failed')
+        except Exception as e:
+            print(f"⚠️ Prefetch failed: {e}")
+            self._prefetch_markers.invalidate(key)
+            self._record_prefetch('failed')
+        finally:
+            with self._prefetch_lock:
+                self._prefetch_inflight.pop(key, None)
+            done.set()
+    
+    def _record_prefetch(self, counter: str, seconds_saved: float = 0.0):
+        with self._prefetch_lock:
+            self._prefetch_counts[counter] += 1
+            self._prefetch_counts['time_saved_seconds'] += seconds_saved
+    
+    def prefetch_stats(self) -> dict:
+        """Prefetch hit rate and time saved per call"""
+        
+        with self._prefetch_lock:
+            counts = dict(self._prefetch_counts)
+        
+        lookups = counts['hits'] + counts['misses']
+        counts['hit_rate'] = round(counts['hits'] / lookups, 3) if lookups else 0.0
+        counts['avg_time_saved_per_call'] = round(counts['time_saved_seconds'] / counts['hits'], 3) if counts['hits'] else 0.0
+        counts['time_saved_seconds'] = round(counts['time_saved_seconds'], 3)
+        return counts
+    
+    def invalidate_booking_snapshot(self, call_sid: str = None, phone_number: str = None):
+        """Drop cached booking data after something changed it"""
+        
+        self.booking_snapshots.invalidate(call_sid or phone_number)
+        self.speculations.invalidate(call_sid or phone_number)
+    
+    def speculation_intent(self, call_sid: str, partial_text: str):
+        """Intent worth answering ahead of the final speech result, or None
+
+        Cheap enough for the event loop: one keyword pass and a cache lookup.
+        """
+        
+        classification = classifier.classify(partial_text)
+        intent = classification['intent']
+        if intent not in SPECULATIVE_INTENTS:
+            return None
+        # The final turn won't use a handler answer for these
+        if classification['labels'].keys() & {'end_call', 'escalation', 'problem', 'negation'}:
+            return None
+        
+        existing = self.speculations.get(call_sid)
+        if existing is not None and existing['intent'] == intent:
+            return None  # already computed (or computing) for this intent
+        return intent
+    
+    @tracing.traced('speculate')
+    def speculate_response(self, phone_number: str, call_sid: str, intent: str, partial_text: str = ''):
+        """Compute the handler answer for `intent` while the caller is still speaking
+
+        Side-effect free: cancellations are only quoted here, the escalation is queued when the
+        final result confirms the intent (see generate_response).
+        """
+        
+        with self._prefetch_lock:
+            existing = self.speculations.get(call_sid)
+            if existing is not None and existing['intent'] == intent:
+                return
+            if existing is not None and existing['result'] is not None:
+                self._speculation_counts['discarded'] += 1  # the partial changed its mind
+                metrics.SPECULATIONS.inc(result='discarded')
+            self.speculations.set(call_sid, {'intent': intent, 'phone': phone_number, 'result': None,
+                                             'seconds': 0.0, 'ready_at': None})
+            self._speculation_counts['started'] += 1
+            metrics.SPECULATIONS.inc(result='started')
+        
+        start = time.perf_counter()
+        try:
+            if intent == 'cancellation':
+                result = self.quote_cancellation(phone_number, call_sid)
+            elif intent == 'delivery':
+                result = self.handle_delivery_update(phone_number, call_sid)
+            else:
+                result = self.handle_status_check(phone_number, call_sid)
+        except Exception as e:
+            print(f"⚠️ Speculative {intent} answer failed: {e}")
+            self.speculations.invalidate(call_sid)
+            with self._prefetch_lock:
+                self._speculation_counts['failed'] += 1
+                metrics.SPECULATIONS.inc(result='failed')
+            return
+        
+        speculation = {'intent': intent, 'phone': phone_number, 'result': result,
+                       'seconds': time.perf_counter() - start, 'ready_at': time.perf_counter()}
+        with self._prefetch_lock:
+            current = self.speculations.get(call_sid)
+            if current is not None and current['intent'] == intent:
+                self.speculations.set(call_sid, speculation)
+        print(f"🔮 Speculated '{intent}' for {call_sid} from \"{partial_text}\" in {speculation['seconds'] * 1000:.0f}ms")
+    
+    def take_speculation(self, call_sid: str, phone_number: str, intent: str, timings: dict = None):
+        """The answer precomputed for this turn's final intent, if the partials guessed right"""
+        
+        with self._prefetch_lock:
+            speculation = self.speculations.get(call_sid)
+            if speculation is None or speculation['result'] is None:
+                return None
+            self.speculations.invalidate(call_sid)
+            if speculation['intent'] != intent or speculation['phone'] != phone_number:
+                self._speculation_counts['discarded'] += 1
+                metrics.SPECULATIONS.inc(result='discarded')
+                return None
+            head_start = time.perf_counter() - speculation['ready_at']
+            self._speculation_counts['used'] += 1
+            metrics.SPECULATIONS.inc(result='used')
+            self._speculation_counts['time_saved_seconds'] += speculation['seconds']
+            self._speculation_counts['head_start_seconds'] += head_start
+        
+        if timings is not None:
+            timings['speculation_saved_ms'] = round(speculation['seconds'] * 1000, 2)
+        return speculation['result']
+    
+    def speculation_stats(self) -> dict:
+        """How often partial results predicted the final intent, and the handler time that saved"""
+        
+        with self._prefetch_lock:
+            counts = dict(self._speculation_counts)
+        
+        used = counts['used']
+        counts['hit_rate'] = round(used / counts['started'], 3) if counts['started'] else 0.0
+        counts['avg_saved_ms'] = round(counts['time_saved_seconds'] * 1000 / used, 2) if used else 0.0
+        counts['avg_head_start_ms'] = round(counts.pop('head_start_seconds') * 1000 / used, 1) if used else 0.0
+        counts['time_saved_seconds'] = round(counts['time_saved_seconds'], 3)
+        return counts
+    
+    def classify_intent(self, user_message: str, classification: dict = None,
+                        deadline: float = None, timings: dict = None) -> str:
+        """Hybrid: Fast compiled keywords + Smart AI fallback
+
+        `deadline` (time.perf_counter() value) caps how long the AI fallback may take;
+        `timings` receives the resolution path, plus llm_ms / llm_outcome when the fallback runs
+        """
+        
+        # FAST PATH: Keywords (99% of cases) - one pass over every phrase table
+        classification = classification or classifier.classify(user_message)
+        if classification['intent']:
+            self._resolved(timings, 'keyword')
+            return classification['intent']
+        
+        # MIDDLE PATH: offline n-gram model trained on past calls (sub-millisecond)
+        if self.ngram_model is not None:
+            with tracing.span('intent.ngram') as span:
+                intent, confidence = self.ngram_model.predict(user_message)
+                span.set('intent', intent)
+                span.set('confidence', confidence)
+            if intent and confidence >= NGRAM_MIN_CONFIDENCE:
+                self._ngram_counts['answered'] += 1
+                self._resolved(timings, 'ngram')
+                print(f"🧮 N-gram classified: {intent} ({confidence})")
+                return intent
+            self._ngram_counts['deferred'] += 1
         
         # SLOW PATH: AI for edge cases (1% of cases)
         print(f"⚠️ Unclear intent, using AI: {user_message}")
-        return self._classify_with_ai(user_message)
+        return self._classify_with_ai(user_message, deadline, timings)
 
-    def _classify_with_ai(self, user_message: str) -> str:
-        """Use GPT-3.5 for unclear cases only"""
-        
+    @tracing.traced('intent.ai')
+    def _classify_with_ai(self, user_message: str, deadline: float = None, timings: dict = None) -> str:
+        """Use GPT-3.5 for unclear cases only (answers cached per normalized utterance)"""
+        
+        timings = timings if timings is not None else {}
+        key = normalize_utterance(user_message)
+        cached = self.ai_intent_cache.get(key)
+        if cached is not None:
+            print(f"⚡ AI intent cache hit: {cached}")
+            timings['llm_outcome'] = 'cache'
+            self._resolved(timings, 'ai_cache')
+            return cached
+        
+        # Never let the LLM eat the rest of the turn - whatever is left of the budget, at most
+        timeout = LLM_TIMEOUT_SECONDS
+        if deadline is not None:
+            timeout = min(timeout, deadline - time.perf_counter() - TURN_RESPONSE_RESERVE)
+        if timeout < LLM_MIN_TIMEOUT_SECONDS:
+            print(f"⏱️ No latency budget left for AI, defaulting to status")
+            return self._llm_default(timings, 'no_budget')
+        
+        if not self.llm_breaker.allow_request():
+            print(f"🔴 AI circuit open, defaulting to status")
+            return self._llm_default(timings, 'breaker_open')
+        
+        started = time.perf_counter()
         try:
             import openai
             
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "Classify as: cancellation, delivery, or status. One word only."
-                    },
-                    {
-                        "role": "user",
-                        "content": user_message
-                    }
-                ],
-                temperature=0,
-                max_tokens=5,
-                timeout=2
-            )
+            self.ai_calls += 1
             
+            with tracing.span('openai.chat_completion', tracing.KIND_CLIENT, model="gpt-3.5-turbo",
+                              timeout_seconds=round(timeout, 3)):
+                response = openai.ChatCompletion.create(
+                    model="gpt-3.5-turbo",
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": "Classify as: cancellation, delivery, or status. One word only."
+                        },
+                        {
+                            "role": "user",
+                            "content": user_message
+                        }
+                    ],
+                    temperature=0,
+                    max_tokens=5,
+                    request_timeout=timeout  # HTTP timeout (`timeout` only bounds the client's retry loop)
+                )
+            
+            self.llm_breaker.record_success(self._record_llm_time(started, timings, 'ok'))
             result = response.choices[0].message.content.strip().lower()
             print(f"🤖 AI classified: {result}")
             
-            for intent in ['cancellation', 'delivery', 'status']:
-                if intent in result:
-                    return intent
+            intent = next((i for i in ['cancellation', 'delivery', 'status'] if i in result), 'status')  # Default
             
-            return 'status'  # Default
+            # Only real answers are cached - a timeout shouldn't pin the fallback for a day
+            self.ai_intent_cache.set(key, intent)
+            self._resolved(timings, 'llm')
+            return intent
         
         except Exception as e:
+            self._record_llm_time(started, timings, 'error')
+            self.llm_breaker.record_failure()
             print(f"⚠️ AI failed: {e}, defaulting to status")
-            return 'status'
+            return self._llm_default(timings, 'error')
+    
+    def _record_llm_time(self, started: float, timings: dict, outcome: str) -> float:
+        """Time this turn spent waiting on OpenAI, per turn and in aggregate"""
+        
+        elapsed = time.perf_counter() - started
+        timings['llm_ms'] = round(elapsed * 1000, 2)
+        timings['llm_outcome'] = outcome
+        metrics.LLM_SECONDS.observe(elapsed, outcome=outcome)
+        with self._llm_lock:
+            self._llm_counts['turns'] += 1
+            self._llm_counts['seconds'] += elapsed
+            self._llm_counts['max_seconds'] = max(self._llm_counts['max_seconds'], elapsed)
+        return elapsed
+    
+    @staticmethod
+    def _resolved(timings: dict, path: str):
+        """Count how the intent was decided and keep it on the turn (it gates n-gram training)"""
+        
+        metrics.INTENT_RESOLUTIONS.inc(path=path)
+        if timings is not None:
+            timings['resolution'] = path
+    
+    def _llm_default(self, timings: dict, reason: str) -> str:
+        timings.setdefault('llm_outcome', reason)
+        self._resolved(timings, 'llm_default')
+        with self._llm_lock:
+            self._llm_counts['defaulted'] += 1
+            if reason in self._llm_counts:
+                self._llm_counts[reason] += 1
+        return 'status'
+    
+    def save_ai_intent_cache(self) -> int:
+        """Persist the AI intent cache (if a path is configured) so restarts start warm"""
+        
+        if not self.ai_intent_cache_path:
+            return 0
+        try:
+            saved = self.ai_intent_cache.save(self.ai_intent_cache_path)
+            print(f"💾 Saved {saved} cached AI intents to {self.ai_intent_cache_path}")
+            return saved
+        except OSError as e:
+            print(f"⚠️ Could not save AI intent cache: {e}")
+            return 0
+    
+    def ai_intent_stats(self) -> dict:
+        with self._llm_lock:
+            llm = dict(self._llm_counts)
+        llm['avg_ms_per_llm_turn'] = round(llm['seconds'] * 1000 / llm['turns'], 1) if llm['turns'] else 0.0
+        llm['seconds'] = round(llm['seconds'], 3)
+        llm['max_seconds'] = round(llm['max_seconds'], 3)
+        return dict(
+            self.ai_intent_cache.stats(),
+            llm_calls=self.ai_calls,
+            llm_time=llm,
+            llm_breaker=self.llm_breaker.stats(),
+            ngram_model=self.ngram_model is not None,
+            ngram_answered=self._ngram_counts['answered'],
+            ngram_deferred=self._ngram_counts['deferred']
+        )
     
-    def handle_status_check(self, phone_number: str) -> dict:
+    def handle_status_check(self, phone_number: str, call_sid: str = None) -> dict:
         """Handle vehicle status inquiry"""
         
-        result = self.agent.get_booking_by_phone(phone_number)
+        result = self.get_booking_snapshot(phone_number, call_sid)
         
         if not result['success']:
             return {
@@ -102,10 +488,10 @@ class TVSBusinessLogic:
             "data": booking_data
         }
     
-    def handle_delivery_update(self, phone_number: str) -> dict:
+    def handle_delivery_update(self, phone_number: str, call_sid: str = None) -> dict:
         """Handle delivery/tracking inquiry"""
         
-        result = self.agent.get_booking_by_phone(phone_number)
+        result = self.get_booking_snapshot(phone_number, call_sid)
         
         if not result['success']:
             return {
@@ -137,10 +523,10 @@ class TVSBusinessLogic:
             "data": booking_data
         }
     
-    def handle_cancellation_request(self, phone_number: str, call_sid: str) -> dict:
-        """Handle cancellation request"""
+    def quote_cancellation(self, phone_number: str, call_sid: str) -> dict:
+        """Cancellation fee and reply for this booking - no side effects"""
         
-        result = self.agent.get_cancellation_info(phone_number)
+        result = self.get_booking_snapshot(phone_number, call_sid)
         
         if not result['success']:
             return {
@@ -174,23 +560,32 @@ class TVSBusinessLogic:
             Would you like to know more about your delivery instead?"""
             action = "not_eligible"
         
-        if action == "pending_confirmation":
-            create_escalation(
-                call_sid=call_sid,
-                booking_id=booking_id,
-                escalation_type="cancellation_request",
-                description=f"Customer cancellation with {charge_percent}% charge",
-                escalated_to="Finance Team"
-            )
-        
         return {
             "success": True,
             "message": response,
             "intent": "cancellation",
             "action": action,
+            "booking_id": booking_id,
             "cancellation_info": cancel_info
         }
     
+    def handle_cancellation_request(self, phone_number: str, call_sid: str, quote: dict = None) -> dict:
+        """Handle cancellation request (`quote` may come from speculate_response)"""
+        
+        result = quote or self.quote_cancellation(phone_number, call_sid)
+        
+        if result.get('action') == "pending_confirmation":
+            write_queue.enqueue_escalation(
+                call_sid=call_sid,
+                booking_id=result['booking_id'],
+                escalation_type="cancellation_request",
+                description=f"Customer cancellation with {result['cancellation_info'].get('fee_pct', 0)}% charge",
+                escalated_to="Finance Team"
+            )
+            self.invalidate_booking_snapshot(call_sid, phone_number)
+        
+        return result
+    
     def handle_rejection(self, context: str) -> str:
         """Handle when customer says NO/DON'T WANT"""
         
@@ -207,23 +602,21 @@ class TVSBusinessLogic:
         
         return "Perfect! I'm here to help. What would you like to know?"
     
-    def should_escalate_to_human(self, user_message: str, conversation_history: list) -> bool:
+    def should_escalate_to_human(self, user_message: str, conversation_history: list, classification: dict = None) -> bool:
         """IMPROVED: Only escalate for REAL complex issues, not casual NO"""
         
-        user_lower = user_message.lower()
+        labels = (classification or classifier.classify(user_message))['labels']
         
         # NEVER escalate for goodbye/thanks (fixed in generate_response)
-        end_phrases = ['bye', 'goodbye', 'thank you', 'thanks', "that's all", 'nothing else']
-        if any(phrase in user_lower for phrase in end_phrases):
+        if 'end_call' in labels:
             return False
         
         # NEVER escalate just because they said "no"
-        if user_lower.strip() in ['no', 'nope', 'no thanks']:
+        if 'negation' in labels:
             return False
         
         # Only escalate for EXPLICIT requests
-        explicit_escalation = ['human', 'agent', 'manager', 'supervisor', 'speak to', 'connect me', 'call back']
-        if any(word in user_lower for word in explicit_escalation):
+        if 'escalation' in labels:
             return True
         
         # Complex issues after multiple attempts
@@ -231,65 +624,107 @@ class TVSBusinessLogic:
             return True
         
         # Real problems
-        problem_words = ['warranty', 'accident', 'damage', 'defect', 'broken', 'not working', 'issue', 'problem']
-        if any(word in user_lower for word in problem_words):
+        if 'problem' in labels:
             return True
         
         return False
     
-    def generate_response(self, phone_number: str, user_message: str, call_sid: str, conversation_history: list) -> str:
-        """IMPROVED: Better context-aware responses"""
+    def generate_response(self, phone_number: str, user_message: str, call_sid: str, conversation_history: list) -> dict:
+        """IMPROVED: Better context-aware responses
+
+        Returns the turn result - reply text, the intent actually acted on and how it was resolved
+        (keyword, ngram, llm, llm_default, ... - None when no classifier ran), whether the call was
+        escalated or is ending, the booking data used and per-stage timings in ms
+        """
+        
+        started = time.perf_counter()
+        timings = {}
         
-        user_lower = user_message.lower()
+        # One pass labels the utterance for every check below
+        with tracing.span('intent.keyword') as span:
+            classification = classifier.classify(user_message)
+            span.set('intent', classification['intent'])
+        labels = classification['labels']
+        timings['classify_ms'] = round((time.perf_counter() - started) * 1000, 2)
         
         # FIRST: Check for end-of-call phrases
-        end_phrases = ['bye', 'goodbye', 'thank you', 'thanks', "that's all", 'nothing else', 'no thanks']
-        if any(phrase in user_lower for phrase in end_phrases):
-            return "Thank you for choosing TVS. Goodbye!"
+        if 'end_call' in labels:
+            return self._turn_result(started, timings, "Thank you for choosing TVS. Goodbye!", 'end_call', end_call=True)
         
-        # Classify intent
-        intent = self.classify_intent(user_message)
+        # Escalation doesn't depend on the intent, so decide it before any AI call
+        escalate = self.should_escalate_to_human(user_message, conversation_history, classification)
+        
+        # Classify intent (skip the AI fallback when we're escalating anyway)
+        intent_started = time.perf_counter()
+        if escalate and not classification['intent']:
+            intent = 'escalation'
+        else:
+            intent = self.classify_intent(user_message, classification,
+                                          deadline=started + TURN_LATENCY_BUDGET, timings=timings)
+        timings['intent_ms'] = round((time.perf_counter() - intent_started) * 1000, 2)
         
         # HANDLE SPECIAL INTENTS FIRST
         if intent == 'reject_cancellation':
-            return self.handle_rejection('cancellation')
+            return self._turn_result(started, timings, self.handle_rejection('cancellation'), intent)
         
         elif intent == 'negation':
             context = ' '.join([msg.get('content', '') for msg in conversation_history[-2:]])
-            return self.handle_rejection(context)
+            return self._turn_result(started, timings, self.handle_rejection(context), intent)
         
         elif intent == 'affirmation':
             context = ' '.join([msg.get('content', '') for msg in conversation_history[-2:]])
-            return self.handle_affirmation(context)
+            if 'cancellation' in context:
+                self.invalidate_booking_snapshot(call_sid, phone_number)
+            return self._turn_result(started, timings, self.handle_affirmation(context), intent)
         
         # THEN: Check for escalation
-        if self.should_escalate_to_human(user_message, conversation_history):
-            create_escalation(
+        if escalate:
+            write_queue.enqueue_escalation(
                 call_sid=call_sid,
                 booking_id="ESCALATED",
                 escalation_type="explicit_request",
                 description=user_message,
                 escalated_to="Support Team"
             )
-            return "I understand. Let me connect you to one of our support specialists right away."
+            self.invalidate_booking_snapshot(call_sid, phone_number)
+            return self._turn_result(started, timings, "I understand. Let me connect you to one of our support specialists right away.",
+                                     intent, escalated=True)
         
         # HANDLE MAIN INTENTS
-        if intent == 'status':
-            result = self.handle_status_check(phone_number)
-            return result['message']
-        
-        elif intent == 'delivery':
-            result = self.handle_delivery_update(phone_number)
-            return result['message']
-        
-        elif intent == 'cancellation':
-            result = self.handle_cancellation_request(phone_number, call_sid)
-            return result['message']
+        handlers = {
+            'status': self.handle_status_check,
+            'delivery': self.handle_delivery_update,
+            'cancellation': self.handle_cancellation_request
+        }
+        if intent in handlers:
+            handler_started = time.perf_counter()
+            speculated = self.take_speculation(call_sid, phone_number, intent, timings)
+            with tracing.span(f'handler.{intent}', speculative=speculated is not None):
+                if intent == 'cancellation':
+                    result = self.handle_cancellation_request(phone_number, call_sid, quote=speculated)
+                else:
+                    result = speculated or handlers[intent](phone_number, call_sid)
+            timings['handler_ms'] = round((time.perf_counter() - handler_started) * 1000, 2)
+            return self._turn_result(started, timings, result['message'], intent,
+                                     data=result.get('data') or result.get('cancellation_info'))
         
         elif intent == 'unknown':
-            return "I'm sorry, I didn't quite understand. Could you please rephrase? You can ask about status, delivery, or cancellation."
+            return self._turn_result(started, timings, "I'm sorry, I didn't quite understand. Could you please rephrase? You can ask about status, delivery, or cancellation.", intent)
         
-        return "How can I help you with your vehicle booking?"
+        return self._turn_result(started, timings, "How can I help you with your vehicle booking?", intent)
+    
+    def _turn_result(self, started: float, timings: dict, message: str, intent: str,
+                     escalated: bool = False, end_call: bool = False, data: dict = None) -> dict:
+        timings['total_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        return {
+            "message": message,
+            "intent": intent,
+            "resolution": timings.get('resolution'),
+            "escalated": escalated,
+            "end_call": end_call,
+            "data": data,
+            "timings": timings
+        }
     
     def _map_order_status(self, order_status: str) -> str:
         """Convert order status to human-readable message"""
@@ -0,0 +1,134 @@
+"""
+Small in-process caches shared by the voice agent
+Bounded LRU with per-entry TTL, safe to use from executor threads
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Bounded LRU cache where every entry expires after `ttl` seconds"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300, refresh_on_access: bool = False):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # True = idle TTL (each hit pushes expiry out), False = absolute TTL from insert
+        self.refresh_on_access = refresh_on_access
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            if self.refresh_on_access:
+                self._data[key] = (now + self.ttl, value)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl: float = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+            self._data[key] = (expires_at, value)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key) -> bool:
+        with self._lock:
+            return self._data.pop(key, None) is not None
+
+    def items(self) -> list:
+        """Snapshot of live (key, value) pairs, oldest first"""
+        now = time.monotonic()
+        with self._lock:
+            return [(key, value) for key, (expires_at, value) in self._data.items() if expires_at > now]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def purge_expired(self) -> int:
+        """Drop every expired entry; returns how many were removed"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, (expires_at, _) in self._data.items() if expires_at <= now]
+            for key in expired:
+                del self._data[key]
+            self.expirations += len(expired)
+            return len(expired)
+
+    def save(self, path: str) -> int:
+        """Write live entries to a JSON file (string keys, JSON-serialisable values)
+
+        Expiry is stored as wall-clock time so entries keep their remaining TTL across restarts.
+        Returns how many entries were written.
+        """
+        now = time.monotonic()
+        wall_now = time.time()
+        with self._lock:
+            entries = [[key, wall_now + (expires_at - now), value]
+                       for key, (expires_at, value) in self._data.items() if expires_at > now]
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, path)  # readers never see a half-written file
+        return len(entries)
+
+    def load(self, path: str) -> int:
+        """Load entries written by save(), skipping expired ones; returns how many were loaded"""
+        if not os.path.exists(path):
+            return 0
+
+        with open(path, encoding='utf-8') as f:
+            entries = json.load(f)
+
+        wall_now = time.time()
+        loaded = 0
+        for key, wall_expires_at, value in entries:  # oldest first, so LRU order survives
+            remaining = wall_expires_at - wall_now
+            if remaining > 0:
+                self.set(key, value, ttl=min(remaining, self.ttl))
+                loaded += 1
+        return loaded
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
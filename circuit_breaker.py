@@ -0,0 +1,84 @@
+"""
+Circuit breaker for slow or failing downstream calls (the OpenAI intent fallback)
+closed -> open after N consecutive failures/slow calls -> half-open probe after a cool-down
+"""
+
+import threading
+import time
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Thread-safe consecutive-failure breaker with half-open probing"""
+
+    def __init__(self, name: str, failure_threshold: int = 5, slow_call_seconds: float = 1.5,
+                 reset_timeout: float = 30.0, half_open_max_calls: int = 1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds  # a success slower than this counts as a failure
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+
+        self.state = CLOSED
+        self._lock = threading.Lock()
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._half_open_inflight = 0
+        self.counts = {'calls': 0, 'successes': 0, 'failures': 0, 'slow_calls': 0,
+                       'rejected': 0, 'opened': 0}
+
+    def allow_request(self) -> bool:
+        """Whether the caller may try the downstream call now"""
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    self.counts['rejected'] += 1
+                    return False
+                self.state = HALF_OPEN
+                self._half_open_inflight = 0
+                print(f"🟡 Circuit '{self.name}' half-open - probing")
+
+            if self.state == HALF_OPEN:
+                if self._half_open_inflight >= self.half_open_max_calls:
+                    self.counts['rejected'] += 1
+                    return False
+                self._half_open_inflight += 1
+
+            self.counts['calls'] += 1
+            return True
+
+    def record_success(self, duration: float):
+        if duration >= self.slow_call_seconds:
+            with self._lock:
+                self.counts['slow_calls'] += 1
+            self.record_failure()
+            return
+
+        with self._lock:
+            self.counts['successes'] += 1
+            self._consecutive_failures = 0
+            if self.state == HALF_OPEN:
+                self.state = CLOSED
+                self._half_open_inflight = 0
+                print(f"🟢 Circuit '{self.name}' closed")
+
+    def record_failure(self):
+        with self._lock:
+            self.counts['failures'] += 1
+            self._consecutive_failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self._consecutive_failures >= self.failure_threshold):
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+                self._half_open_inflight = 0
+                self.counts['opened'] += 1
+                print(f"🔴 Circuit '{self.name}' open for {self.reset_timeout}s "
+                      f"after {self._consecutive_failures} consecutive failures")
+
+    def stats(self) -> dict:
+        with self._lock:
+            retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at)) if self.state == OPEN else 0.0
+            return dict(self.counts, state=self.state, consecutive_failures=self._consecutive_failures,
+                        retry_in_seconds=round(retry_in, 1))
@@ -0,0 +1,318 @@
+"""
+Synthetic data generator for the BTO schema
+Bulk-loads production-sized volumes of users, dealerships, bookings, cancellations and order status
+history into a stand-in database (never production) so query work can be checked at scale - e.g.
+get_booking_by_phone's `ORDER BY b.booking_date DESC LIMIT 1` for a caller with dozens of bookings.
+
+Rows are generated in batches and streamed with COPY on Postgres (psycopg2 or psycopg 3), and with
+executemany elsewhere. Indexes are built after the load. Skew is configurable:
+  - bookings per user follow P(k) ~ k^-bookings_skew up to --max-bookings (a few heavy callers)
+  - dealerships are picked Zipf(--dealer-skew) - a handful of showrooms take most bookings
+  - vehicle models are weighted by popularity; order status advances with booking age
+User #i gets bto_schema.phone_for(i), so load_test.py --customers N hits generated callers.
+
+Usage:
+    python data_generator.py --db postgresql+psycopg2://localhost/bto_scale --users 1000000
+    python data_generator.py --db sqlite:///bto_scale.db --users 100000 --bookings-skew 1.5 --drop
+"""
+
+import argparse
+import csv
+import io
+import itertools
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+from bto_schema import CANCELLATION_FEE_PCT, ORDER_STATUSES, phone_for
+
+load_dotenv()
+
+DEFAULT_GENERATOR_DB = "sqlite:///bto_scale.db"
+
+# (vehicle, weight) - relative share of bookings
+VEHICLES = [('Jupiter', 30), ('Apache RTR 160', 22), ('NTORQ 125', 16), ('Raider 125', 12),
+            ('Apache RTR 310', 8), ('iQube', 7), ('Ronin', 5)]
+VARIANTS = ['Standard', 'Disc', 'Dual Disc', 'Special Edition', 'SmartXonnect']
+COLORS = ['Racing Red', 'Matte Black', 'Pearl White', 'Titanium Grey', 'Metallic Blue']
+CITIES = ['Chennai', 'Bengaluru', 'New Delhi', 'Mumbai', 'Hyderabad', 'Pune', 'Ahmedabad', 'Kolkata',
+          'Jaipur', 'Lucknow', 'Kochi', 'Coimbatore', 'Indore', 'Nagpur', 'Madurai', 'Mysuru']
+FIRST_NAMES = ['Rahul', 'Priya', 'Arjun', 'Divya', 'Karthik', 'Sneha', 'Vikram', 'Anjali', 'Suresh', 'Meena',
+               'Rohit', 'Kavya', 'Manoj', 'Lakshmi', 'Aditya', 'Pooja']
+LAST_NAMES = ['Kumar', 'Sharma', 'Iyer', 'Reddy', 'Patel', 'Nair', 'Singh', 'Gupta', 'Rao', 'Das']
+BOOKING_PRICE = 50000
+
+# Column order for COPY / executemany, per table (load order: dealerships first)
+TABLE_COLUMNS = {
+    'dealerships': ('id', 'name', 'city'),
+    'users': ('id', 'full_name', 'email', 'phone_e164'),
+    'bookings': ('id', 'booking_public_id', 'user_id', 'dealership_id', 'vehicle_name', 'model_variant',
+                 'color', 'booking_status', 'order_status', 'is_cancelled', 'booking_date', 'order_received_at'),
+    'cancellations': ('id', 'booking_id', 'fee_pct', 'fee_amount', 'refund_amount', 'created_at'),
+    'order_status_history': ('id', 'booking_id', 'status', 'updated_on', 'comment'),
+}
+
+
+def zipf_weights(count: int, skew: float) -> list:
+    """Cumulative weights for rank k (1-based) ~ k^-skew, for random.choices(cum_weights=...)"""
+    return list(itertools.accumulate(1.0 / (rank ** skew) for rank in range(1, count + 1)))
+
+
+def cancellation_fee_pct(status_index: int) -> int:
+    """Fee by how far the order got - the same charges the agent quotes (0/25/50/75/100%)"""
+
+    return CANCELLATION_FEE_PCT[ORDER_STATUSES[status_index]]
+
+
+class BulkLoader:
+    """Buffers rows per table; COPY on Postgres, executemany on everything else"""
+
+    def __init__(self, engine, batch_size: int = 20000):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.connection = engine.raw_connection()
+        self.buffers = {table: [] for table in TABLE_COLUMNS}
+        self.counts = {table: 0 for table in TABLE_COLUMNS}
+        self.seconds = {table: 0.0 for table in TABLE_COLUMNS}
+
+        self.mode = 'executemany'
+        if engine.dialect.name == 'postgresql':
+            cursor = self.connection.cursor()
+            if hasattr(cursor, 'copy_expert'):
+                self.mode = 'copy'  # psycopg2
+            elif hasattr(cursor, 'copy'):
+                self.mode = 'copy3'  # psycopg 3
+            cursor.close()
+
+        paramstyle = engine.dialect.paramstyle
+        self._placeholder = '?' if paramstyle == 'qmark' else '%s'
+        if paramstyle not in ('qmark', 'format', 'pyformat'):
+            raise ValueError(f"Unsupported DB-API paramstyle for bulk loads: {paramstyle}")
+
+    def add(self, table: str, row: tuple):
+        buffer = self.buffers[table]
+        buffer.append(row)
+        if len(buffer) >= self.batch_size:
+            self.flush(table)
+
+    def flush(self, table: str = None):
+        for name in ([table] if table else list(TABLE_COLUMNS)):
+            rows, self.buffers[name] = self.buffers[name], []
+            if not rows:
+                continue
+            started = time.perf_counter()
+            cursor = self.connection.cursor()
+            try:
+                if self.mode == 'executemany':
+                    self._executemany(cursor, name, rows)
+                else:
+                    self._copy(cursor, name, rows)
+                self.connection.commit()
+            except Exception:
+                self.connection.rollback()
+                raise
+            finally:
+                cursor.close()
+            self.counts[name] += len(rows)
+            self.seconds[name] += time.perf_counter() - started
+
+    def _executemany(self, cursor, table: str, rows: list):
+        columns = TABLE_COLUMNS[table]
+        placeholders = ', '.join([self._placeholder] * len(columns))
+        cursor.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", rows)
+
+    def _copy(self, cursor, table: str, rows: list):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            # CSV COPY reads an unquoted empty field as NULL
+            writer.writerow(['' if value is None else value.isoformat() if isinstance(value, datetime) else value
+                             for value in row])
+        sql = f"COPY {table} ({', '.join(TABLE_COLUMNS[table])}) FROM STDIN WITH (FORMAT csv)"
+        if self.mode == 'copy':
+            buffer.seek(0)
+            cursor.copy_expert(sql, buffer)
+        else:
+            with cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+
+def generate(loader: BulkLoader, users: int, dealerships: int = 500, bookings_skew: float = 2.0,
+             max_bookings: int = 40, dealer_skew: float = 1.1, cancel_rate: float = 0.04,
+             quote_rate: float = 0.08, days: int = 730, first_user: int = 0, first_booking: int = 0,
+             dealer_ids: list = None, seed: int = 7) -> dict:
+    """Stream users and everything hanging off them into `loader`; returns distribution stats
+
+    When appending, pass the existing counts and dealership ids so nothing collides
+    """
+
+    rng = random.Random(f"{seed}:{first_user}")
+    new_id = lambda: str(uuid.UUID(int=rng.getrandbits(128), version=4))
+    now = datetime(2025, 10, 1)
+
+    if not dealer_ids:
+        dealer_ids = []
+        for i in range(dealerships):
+            dealer_ids.append(new_id())
+            city = CITIES[i % len(CITIES)]
+            loader.add('dealerships', (dealer_ids[-1], f"TVS {city} {i // len(CITIES) + 1}", city))
+    dealerships = len(dealer_ids)
+    dealer_weights = zipf_weights(dealerships, dealer_skew)
+
+    booking_counts = list(range(1, max_bookings + 1))
+    booking_weights = zipf_weights(max_bookings, bookings_skew)
+    vehicles = [name for name, _ in VEHICLES]
+    vehicle_weights = list(itertools.accumulate(weight for _, weight in VEHICLES))
+    last_status = len(ORDER_STATUSES) - 1
+
+    stats = {'bookings': 0, 'max_bookings': 0, 'busiest_phone': None, 'bookings_per_user': {}}
+    booking_number = first_booking
+    for i in range(first_user, first_user + users):
+        user_id = new_id()
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        phone = phone_for(i)
+        loader.add('users', (user_id, f"{first} {last}", f"{first.lower()}.{last.lower()}{i}@example.com", phone))
+
+        count = rng.choices(booking_counts, cum_weights=booking_weights)[0]
+        stats['bookings'] += count
+        bucket = str(count) if count < 5 else '5+'
+        stats['bookings_per_user'][bucket] = stats['bookings_per_user'].get(bucket, 0) + 1
+        if count > stats['max_bookings']:
+            stats['max_bookings'], stats['busiest_phone'] = count, phone
+
+        for _ in range(count):
+            booking_id = new_id()
+            booking_number += 1
+            age_days = rng.random() * days
+            booked = now - timedelta(days=age_days, seconds=rng.randrange(86400))
+            # Orders move roughly one stage every 4-12 days, so old bookings are at the dealership
+            status_index = min(last_status, int(age_days / rng.uniform(4, 12)))
+            cancelled = rng.random() < cancel_rate
+            loader.add('bookings', (
+                booking_id, f"BTO{2020000000 + booking_number}", user_id,
+                dealer_ids[rng.choices(range(dealerships), cum_weights=dealer_weights)[0]],
+                rng.choices(vehicles, cum_weights=vehicle_weights)[0], rng.choice(VARIANTS), rng.choice(COLORS),
+                'cancelled' if cancelled else 'confirmed', ORDER_STATUSES[status_index], cancelled, booked, booked
+            ))
+
+            updated = booked
+            for step in range(status_index + 1):
+                loader.add('order_status_history', (new_id(), booking_id, ORDER_STATUSES[step], updated,
+                                                    f"Moved to {ORDER_STATUSES[step].replace('_', ' ')}"))
+                updated += timedelta(days=rng.uniform(2, 8))
+
+            if cancelled or rng.random() < quote_rate:
+                fee_pct = cancellation_fee_pct(status_index)
+                fee_amount = BOOKING_PRICE * fee_pct // 100
+                loader.add('cancellations', (new_id(), booking_id, fee_pct, fee_amount, BOOKING_PRICE - fee_amount,
+                                             booked + timedelta(days=rng.uniform(0, 3))))
+
+    return stats
+
+
+def drop_bto_tables(engine):
+    from sqlalchemy import text
+
+    with engine.begin() as conn:
+        for table in list(TABLE_COLUMNS) + ['call_logs']:
+            conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+    print("🗑️ Dropped BTO tables")
+
+
+def check_queries(phones: list, iterations: int = 200) -> list:
+    """TVSBTOAgent lookups against the generated data - the busiest caller and a typical one"""
+
+    import langchain_agent
+    from benchmarks import measure, print_table
+    from database import SessionLocal
+
+    rows = []
+    db = SessionLocal()
+    try:
+        for label, phone in phones:
+            for name in ('BOOKING_BY_PHONE_SQL', 'BOOKING_SNAPSHOT_SQL', 'ORDER_HISTORY_SQL'):
+                statement = getattr(langchain_agent, name)
+                rows.append((f"{name[:-4].lower()} ({label})",
+                             measure(lambda: db.execute(statement, {"phone": phone}).fetchall(), iterations, warmup=10)))
+    finally:
+        db.close()
+    print_table("Agent queries on the generated data", rows)
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-load synthetic BTO data into a stand-in database")
+    parser.add_argument("--db", default=DEFAULT_GENERATOR_DB, help="stand-in database URL (never production)")
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--dealerships", type=int, default=500)
+    parser.add_argument("--bookings-skew", type=float, default=2.0, help="P(k bookings) ~ k^-skew; lower = heavier tail")
+    parser.add_argument("--max-bookings", type=int, default=40, help="most bookings one user can have")
+    parser.add_argument("--dealer-skew", type=float, default=1.1, help="Zipf exponent for dealership popularity")
+    parser.add_argument("--cancel-rate", type=float, default=0.04, help="share of bookings already cancelled")
+    parser.add_argument("--quote-rate", type=float, default=0.08, help="share of active bookings with a fee quote")
+    parser.add_argument("--days", type=int, default=730, help="booking dates spread over this many days")
+    parser.add_argument("--batch-size", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--drop", action="store_true", help="drop the BTO tables first (otherwise rows are appended)")
+    parser.add_argument("--no-check", action="store_true", help="skip timing the agent queries afterwards")
+    args = parser.parse_args()
+
+    # Must be set before database.py is imported - it builds the shared engine at import
+    os.environ["DATABASE_URL"] = args.db
+
+    from sqlalchemy import text
+    from database import engine
+    from bto_schema import create_bto_schema, create_bto_indexes
+
+    if args.drop:
+        drop_bto_tables(engine)
+    create_bto_schema(engine, indexes=False)  # indexes are cheaper to build once, after the load
+
+    with engine.connect() as conn:
+        first_user = conn.execute(text("SELECT COUNT(*) FROM users")).scalar()
+        first_booking = conn.execute(text("SELECT COUNT(*) FROM bookings")).scalar()
+        dealer_ids = [row[0] for row in conn.execute(text("SELECT id FROM dealerships ORDER BY id"))]
+    if first_user:
+        print(f"➕ Appending after {first_user} existing users ({len(dealer_ids)} dealerships kept)")
+
+    loader = BulkLoader(engine, batch_size=args.batch_size)
+    print(f"🏭 Generating {args.users} users into {args.db} ({loader.mode})...")
+    started = time.perf_counter()
+    try:
+        stats = generate(loader, args.users, dealerships=args.dealerships, bookings_skew=args.bookings_skew,
+                         max_bookings=args.max_bookings, dealer_skew=args.dealer_skew, cancel_rate=args.cancel_rate,
+                         quote_rate=args.quote_rate, days=args.days, first_user=first_user,
+                         first_booking=first_booking, dealer_ids=dealer_ids, seed=args.seed)
+    finally:
+        loader.close()
+    load_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    create_bto_indexes(engine)
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    index_seconds = time.perf_counter() - started
+
+    total = sum(loader.counts.values())
+    print("=" * 64)
+    print(f"{'table':<24}{'rows':>14}{'rows/s':>14}")
+    print("-" * 64)
+    for table, count in loader.counts.items():
+        rate = count / loader.seconds[table] if loader.seconds[table] else 0
+        print(f"{table:<24}{count:>14,}{rate:>14,.0f}")
+    print("-" * 64)
+    print(f"{'total':<24}{total:>14,}{total / load_seconds:>14,.0f}  ({load_seconds:.1f}s + {index_seconds:.1f}s indexes)")
+    print("=" * 64)
+    print(f"📊 Bookings per user: {dict(sorted(stats['bookings_per_user'].items()))}; "
+          f"busiest caller {stats['busiest_phone']} has {stats['max_bookings']}")
+
+    if not args.no_check:
+        check_queries([('busiest caller', stats['busiest_phone']),
+                       ('typical caller', phone_for(first_user + args.users // 2))])
@@ -0,0 +1,104 @@
+"""
+Bounded executor for the blocking stages of a voice turn
+Keeps sync DB / OpenAI work off the event loop with per-stage concurrency limits
+"""
+
+import asyncio
+import contextvars
+import functools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Default per-stage limits (override with <STAGE>_CONCURRENCY, e.g. TURN_CONCURRENCY=32)
+DEFAULT_STAGE_LIMITS = {
+    'turn': int(os.getenv("TURN_CONCURRENCY", "16")),
+    'prefetch': int(os.getenv("PREFETCH_CONCURRENCY", "8")),
+    'session': int(os.getenv("SESSION_CONCURRENCY", "8")),  # sqlite/redis session store I/O
+}
+
+
+class StageExecutor:
+    """Runs blocking callables on a shared thread pool, limited per stage"""
+
+    def __init__(self, stage_limits: dict = None, max_workers: int = None):
+        self.stage_limits = dict(DEFAULT_STAGE_LIMITS)
+        if stage_limits:
+            self.stage_limits.update(stage_limits)
+
+        if max_workers is None:
+            max_workers = int(os.getenv("EXECUTOR_WORKERS", "0")) or sum(self.stage_limits.values())
+
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="turn-stage")
+        self._semaphores = {}
+        self._in_flight = {stage: 0 for stage in self.stage_limits}
+        self._waiting = {stage: 0 for stage in self.stage_limits}
+
+    def _semaphore(self, stage: str) -> asyncio.Semaphore:
+        if stage not in self._semaphores:
+            limit = self.stage_limits.get(stage, 4)
+            self.stage_limits.setdefault(stage, limit)
+            self._in_flight.setdefault(stage, 0)
+            self._waiting.setdefault(stage, 0)
+            self._semaphores[stage] = asyncio.Semaphore(limit)
+        return self._semaphores[stage]
+
+    async def run(self, stage: str, func, *args, **kwargs):
+        """Run func(*args, **kwargs) on the pool once a slot for `stage` is free"""
+
+        semaphore = self._semaphore(stage)
+        self._waiting[stage] += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self._waiting[stage] -= 1
+
+        self._in_flight[stage] += 1
+        try:
+            loop = asyncio.get_running_loop()
+            # run_in_executor doesn't carry contextvars over - copy them so tracing spans nest
+            context = contextvars.copy_context()
+            return await loop.run_in_executor(self._pool, functools.partial(context.run, func, *args, **kwargs))
+        finally:
+            self._in_flight[stage] -= 1
+            semaphore.release()
+
+    def stats(self) -> dict:
+        """Current per-stage load"""
+        return {
+            stage: {
+                'limit': limit,
+                'in_flight': self._in_flight.get(stage, 0),
+                'waiting': self._waiting.get(stage, 0)
+            }
+            for stage, limit in self.stage_limits.items()
+        }
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait)
+
+
+if __name__ == "__main__":
+    # Concurrency check: N simulated blocking turns should finish in ~one turn's latency
+    turn_seconds = 0.2
+    calls = 16
+
+    def fake_turn(i):
+        time.sleep(turn_seconds)  # stands in for a Neon query + OpenAI call
+        return i
+
+    async def simulate():
+        executor = StageExecutor({'turn': calls})
+        start = time.perf_counter()
+        results = await asyncio.gather(*(executor.run('turn', fake_turn, i) for i in range(calls)))
+        elapsed = time.perf_counter() - start
+        executor.shutdown()
+        return results, elapsed
+
+    results, elapsed = asyncio.run(simulate())
+    print(f"{len(results)} concurrent turns of {turn_seconds}s finished in {elapsed:.2f}s")
+    print(f"Serialized on the event loop this would take {calls * turn_seconds:.2f}s")
@@ -0,0 +1,367 @@
+"""
+Adaptive Gather timeouts per stage and per caller
+Every Gather records how it ended - how long Twilio waited after the caller's last words
+(last partial result -> final result) and whether we had to ask again - per stage and
+speech_timeout setting. New Gathers use the setting with the lowest expected cost:
+    trailing wait + re-prompt rate x what a re-prompt adds to the call
+Callers who keep getting cut off get a longer setting than the stage picks.
+
+The Gather in progress rides in the call's session record, so any worker can finish it;
+each worker adds only its own new counts into GATHER_STATS_PATH when it saves.
+
+Usage:
+    python gather_tuning.py report [--path cache/gather_stats.json]
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+import metrics
+from cache import TTLCache
+
+load_dotenv()
+
+GATHER_TUNING = os.getenv("GATHER_TUNING", "true").lower() == "true"
+GATHER_STATS_PATH = os.getenv("GATHER_STATS_PATH", "cache/gather_stats.json")
+GATHER_MIN_SAMPLES = int(os.getenv("GATHER_MIN_SAMPLES", "30"))  # per setting, before it can be picked
+GATHER_EXPLORE_RATE = float(os.getenv("GATHER_EXPLORE_RATE", "0.05"))
+GATHER_REPROMPT_COST = float(os.getenv("GATHER_REPROMPT_COST", "8"))  # seconds a "sorry, again?" adds
+GATHER_CALLER_TTL = float(os.getenv("GATHER_CALLER_TTL", str(30 * 86400)))
+
+# What the webhooks used before tuning - also the fallback until there is data
+STAGE_DEFAULTS = {
+    'phone': {'timeout': 5, 'speech_timeout': '3'},      # /get-phone-number
+    'question': {'timeout': 10, 'speech_timeout': '5'},  # first question after the number
+    'followup': {'timeout': 10, 'speech_timeout': '5'},  # "anything else?" / didn't catch that
+}
+
+# Shortest to longest; 'auto' ends on Twilio's own pause detection
+SPEECH_TIMEOUTS = ('auto', '1', '2', '3', '5')
+AUTO_NOMINAL_SECONDS = 1.0  # for ranking 'auto' before its wait has been measured
+
+MIN_TIMEOUT = 3
+CALLER_SLOW_REPROMPT_RATE = 0.3
+SPEECH_START_SAMPLES = 500
+
+
+def _nominal_wait(speech_timeout: str) -> float:
+    return AUTO_NOMINAL_SECONDS if speech_timeout == 'auto' else float(speech_timeout)
+
+
+def _longer(speech_timeout: str) -> str:
+    index = SPEECH_TIMEOUTS.index(speech_timeout)
+    return SPEECH_TIMEOUTS[min(index + 1, len(SPEECH_TIMEOUTS) - 1)]
+
+
+def _empty_settings() -> dict:
+    return {
+        stage: {value: {'gathers': 0, 'reprompts': 0, 'wait_samples': 0, 'wait_seconds': 0.0}
+                for value in SPEECH_TIMEOUTS}
+        for stage in STAGE_DEFAULTS
+    }
+
+
+@contextmanager
+def _file_lock(path: str):
+    """Exclusive lock on `path`.lock across worker processes (no-op where fcntl is missing)"""
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    with open(f"{path}.lock", 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+class GatherTuner:
+    """Gather statistics and the timeout choice made from them
+
+    The open Gather is a plain dict kept by the caller (in the call session), not here.
+    Aggregate statistics and caller history are loaded at startup; save() merges what this
+    process recorded since into GATHER_STATS_PATH, so several workers don't overwrite each other.
+    """
+
+    def __init__(self, path: str = GATHER_STATS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.settings = _empty_settings()
+        # Prompt sent -> first partial result: how long callers take to start talking
+        self.speech_starts = {stage: deque(maxlen=SPEECH_START_SAMPLES) for stage in STAGE_DEFAULTS}
+        self.callers = TTLCache(maxsize=50000, ttl=GATHER_CALLER_TTL)
+        self._reset_unsaved()
+
+        if self.path:
+            try:
+                self.load(self.path)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️ Could not load Gather stats: {e}")
+
+    # ---------- choosing ----------
+
+    def choose(self, stage: str, caller: str = None) -> dict:
+        """timeout / speech_timeout for the next Gather of `stage`"""
+
+        default = STAGE_DEFAULTS[stage]
+        if not GATHER_TUNING:
+            return dict(default)
+
+        with self._lock:
+            speech_timeout, _ = self._best(stage)
+            undersampled = [value for value, row in self.settings[stage].items()
+                            if row['gathers'] < GATHER_MIN_SAMPLES]
+            timeout = self._timeout(stage)
+
+        # Keep learning about settings we have too little data on
+        if undersampled and random.random() < GATHER_EXPLORE_RATE:
+            speech_timeout = random.choice(undersampled)
+
+        history = self.callers.get(caller) if caller else None
+        if history and history['gathers'] >= 2 and history['reprompts'] / history['gathers'] >= CALLER_SLOW_REPROMPT_RATE:
+            speech_timeout = _longer(speech_timeout)
+
+        return {'timeout': timeout, 'speech_timeout': speech_timeout}
+
+    def _cost(self, stage: str, speech_timeout: str) -> float:
+        """Expected seconds this setting adds to a Gather (caller holds the lock)"""
+        row = self.settings[stage][speech_timeout]
+        wait = row['wait_seconds'] / row['wait_samples'] if row['wait_samples'] else _nominal_wait(speech_timeout)
+        reprompt_rate = row['reprompts'] / row['gathers'] if row['gathers'] else 0.0
+        return wait + reprompt_rate * GATHER_REPROMPT_COST
+
+    def _best(self, stage: str) -> tuple:
+        """(speech_timeout, cost) among settings with enough data, else the stage default"""
+        ranked = [(self._cost(stage, value), value) for value, row in self.settings[stage].items()
+                  if row['gathers'] >= GATHER_MIN_SAMPLES]
+        if not ranked:
+            default = STAGE_DEFAULTS[stage]['speech_timeout']
+            return default, self._cost(stage, default)
+        cost, value = min(ranked)
+        return value, cost
+
+    def _timeout(self, stage: str) -> int:
+        """Initial-silence timeout: p95 time to first words + 1s, never above the old default
+
+        Measured from when the prompt was sent, so it includes the prompt itself - conservative.
+        """
+        default = STAGE_DEFAULTS[stage]['timeout']
+        starts = sorted(self.speech_starts[stage])
+        if len(starts) < GATHER_MIN_SAMPLES:
+            return default
+        p95 = starts[int(0.95 * (len(starts) - 1))]
+        return max(MIN_TIMEOUT, min(default, math.ceil(p95) + 1))
+
+    # ---------- recording ----------
+
+    def _reset_unsaved(self):
+        """Counts recorded since the last load/save - what save() adds to the file (caller holds the lock)"""
+        self._unsaved = {'calls': 0, 'settings': _empty_settings(),
+                         'speech_starts': {stage: [] for stage in STAGE_DEFAULTS}, 'callers': {}}
+
+    def call_started(self):
+        with self._lock:
+            self.calls += 1
+            self._unsaved['calls'] += 1
+
+    def issued(self, stage: str, setting: dict, caller: str = None) -> dict:
+        """A Gather with `setting` was just returned to Twilio - keep the returned record with the call
+
+        Wall-clock times, since the partial and action webhooks may land on another worker.
+        Partial results are recorded in the session store under 'id', not in this record.
+        """
+        return {
+            'id': uuid.uuid4().hex,
+            'stage': stage,
+            'speech_timeout': setting['speech_timeout'],
+            'caller': caller,
+            'issued_at': time.time(),
+            'first_partial': None,
+            'last_partial': None
+        }
+
+    def completed(self, gather: dict, outcome: str):
+        """The Gather's action webhook ran: outcome is 'answered', 'reprompt' or 'no_input'"""
+
+        if gather is None:
+            return
+        metrics.GATHERS.inc(stage=gather['stage'], outcome=outcome)
+        now = time.time()
+        reprompted = int(outcome != 'answered')
+        wait = now - gather['last_partial'] if gather['last_partial'] is not None else None
+        start = round(gather['first_partial'] - gather['issued_at'], 3) if gather['first_partial'] is not None else None
+
+        with self._lock:
+            for settings in (self.settings, self._unsaved['settings']):
+                row = settings[gather['stage']][gather['speech_timeout']]
+                row['gathers'] += 1
+                row['reprompts'] += reprompted
+                if wait is not None:
+                    row['wait_samples'] += 1
+                    row['wait_seconds'] += wait
+            if start is not None:
+                self.speech_starts[gather['stage']].append(start)
+                self._unsaved['speech_starts'][gather['stage']].append(start)
+
+            caller = gather['caller']
+            if caller:
+                history = self.callers.get(caller) or {'gathers': 0, 'reprompts': 0}
+                self.callers.set(caller, {'gathers': history['gathers'] + 1,
+                                          'reprompts': history['reprompts'] + reprompted})
+                unsaved = self._unsaved['callers'].setdefault(caller, {'gathers': 0, 'reprompts': 0})
+                unsaved['gathers'] += 1
+                unsaved['reprompts'] += reprompted
+
+    # ---------- reporting ----------
+
+    def report(self) -> dict:
+        """Per-stage table and the estimated call-duration reduction against the old fixed timeouts"""
+
+        stages = {}
+        saved_per_call = 0.0
+        with self._lock:
+            calls = self.calls
+            for stage, rows in self.settings.items():
+                chosen, chosen_cost = self._best(stage)
+                default = STAGE_DEFAULTS[stage]['speech_timeout']
+                default_cost = self._cost(stage, default)
+                gathers = sum(row['gathers'] for row in rows.values())
+                per_call = gathers / calls if calls else 0.0
+                saved_per_call += per_call * (default_cost - chosen_cost)
+                stages[stage] = {
+                    'gathers': gathers,
+                    'gathers_per_call': round(per_call, 2),
+                    'default': {'timeout': STAGE_DEFAULTS[stage]['timeout'], 'speech_timeout': default},
+                    'chosen': {'timeout': self._timeout(stage), 'speech_timeout': chosen},
+                    'seconds_saved_per_gather': round(default_cost - chosen_cost, 2),
+                    'settings': {
+                        value: {
+                            'gathers': row['gathers'],
+                            'reprompt_rate': round(row['reprompts'] / row['gathers'], 3) if row['gathers'] else None,
+                            'avg_wait_seconds': round(row['wait_seconds'] / row['wait_samples'], 2) if row['wait_samples'] else None,
+                            'expected_cost_seconds': round(self._cost(stage, value), 2)
+                        }
+                        for value, row in rows.items()
+                    }
+                }
+        return {'calls': calls, 'est_seconds_saved_per_call': round(saved_per_call, 2), 'stages': stages}
+
+    def stats(self) -> dict:
+        report = self.report()
+        return {
+            'calls': report['calls'],
+            'est_seconds_saved_per_call': report['est_seconds_saved_per_call'],
+            'stages': {stage: dict(row['chosen'], gathers=row['gathers']) for stage, row in report['stages'].items()}
+        }
+
+    # ---------- persistence ----------
+
+    def save(self, path: str = None) -> int:
+        """Add this process's counts since the last load/save into the file; returns callers written
+
+        Read-merge-write under a file lock, so workers shutting down together each add their own
+        share. Afterwards this process also sees what the other workers have saved.
+        """
+
+        path = path or self.path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with _file_lock(path), self._lock:
+            data = self._read(path) or {'calls': 0, 'settings': {}, 'speech_starts': {}, 'callers': {}}
+            unsaved = self._unsaved
+
+            data['calls'] += unsaved['calls']
+            for stage, rows in unsaved['settings'].items():
+                for value, row in rows.items():
+                    merged = data['settings'].setdefault(stage, {}).setdefault(value, dict.fromkeys(row, 0))
+                    for field, count in row.items():
+                        merged[field] = merged.get(field, 0) + count
+            for stage, starts in unsaved['speech_starts'].items():
+                data['speech_starts'][stage] = (data['speech_starts'].get(stage, []) + starts)[-SPEECH_START_SAMPLES:]
+            for caller, counts in unsaved['callers'].items():
+                history = data['callers'].get(caller) or {'gathers': 0, 'reprompts': 0}
+                data['callers'][caller] = {field: history[field] + counts[field] for field in history}
+
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+
+            self._apply(data)
+            self._reset_unsaved()
+        return len(data['callers'])
+
+    def load(self, path: str) -> bool:
+        data = self._read(path)
+        if data is None:
+            return False
+
+        with self._lock:
+            self._apply(data)
+            self._reset_unsaved()
+        print(f"✅ Loaded Gather stats for {self.calls} calls from {path}")
+        return True
+
+    @staticmethod
+    def _read(path: str) -> dict:
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def _apply(self, data: dict):
+        """Replace the in-memory statistics with `data` (caller holds the lock)"""
+        self.calls = data['calls']
+        self.settings = _empty_settings()
+        for stage, rows in data['settings'].items():
+            for value, row in rows.items():
+                if stage in self.settings and value in self.settings[stage]:
+                    self.settings[stage][value].update(row)
+        for stage, starts in self.speech_starts.items():
+            starts.clear()
+            starts.extend(data['speech_starts'].get(stage, []))
+        for caller, history in data.get('callers', {}).items():
+            self.callers.set(caller, history)
+
+
+def print_report(report: dict):
+    print("=" * 78)
+    print(f"📞 Gather tuning over {report['calls']} calls - "
+          f"estimated {report['est_seconds_saved_per_call']}s shorter per call than fixed timeouts")
+    print("=" * 78)
+    for stage, row in report['stages'].items():
+        print(f"\n{stage}: {row['gathers']} gathers ({row['gathers_per_call']}/call) | "
+              f"default {row['default']} -> chosen {row['chosen']} | {row['seconds_saved_per_gather']}s/gather")
+        print(f"  {'speech_timeout':<15}{'gathers':>9}{'re-prompt':>11}{'avg wait':>10}{'cost':>8}")
+        for value, setting in row['settings'].items():
+            rate = '-' if setting['reprompt_rate'] is None else f"{setting['reprompt_rate']:.1%}"
+            wait = '-' if setting['avg_wait_seconds'] is None else f"{setting['avg_wait_seconds']}s"
+            print(f"  {value:<15}{setting['gathers']:>9}{rate:>11}{wait:>10}{setting['expected_cost_seconds']:>7}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Adaptive Gather timeout statistics")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    report_parser = subparsers.add_parser("report", help="per-stage settings and estimated time saved")
+    report_parser.add_argument("--path", default=GATHER_STATS_PATH or "cache/gather_stats.json")
+    args = parser.parse_args()
+
+    if args.command == "report":
+        if not os.path.exists(args.path):
+            print(f"❌ No Gather stats at {args.path} - they are saved when the server shuts down")
+        else:
+            print_report(GatherTuner(args.path).report())
@@ -0,0 +1,148 @@
+"""
+Single-pass keyword classifier for caller utterances
+All phrase tables (intents, end-of-call, escalation, problem words, yes/no) are compiled
+into one regex; one scan returns every label with a confidence score.
+"""
+
+import re
+
+# Main intents, in priority order (cancellation wins over delivery wins over status)
+INTENT_KEYWORDS = {
+    'cancellation': ['cancel', 'refund'],
+    'delivery': ['delivery', 'when', 'arrive', 'dispatch', 'track'],
+    'status': ['status', 'where', 'update', 'progress', 'vehicle', 'bike'],
+}
+
+# Other labels matched anywhere in the utterance
+PHRASE_LABELS = {
+    'end_call': ['goodbye', 'bye', 'thank you', 'thanks', "that's all", 'nothing else', 'no thanks'],
+    'escalation': ['human', 'agent', 'manager', 'supervisor', 'speak to', 'connect me', 'call back'],
+    'problem': ['warranty', 'accident', 'damage', 'defect', 'broken', 'not working', 'issue', 'problem'],
+}
+
+# Labels that only apply when they are the whole utterance ("no", not "no, where is my bike")
+WHOLE_UTTERANCE_LABELS = {
+    'negation': ['no', 'nope', 'no thanks', 'nah'],
+    'affirmation': ['yes', 'yeah', 'yep', 'yes please', 'ok', 'okay', 'sure', 'go ahead', 'please proceed'],
+}
+
+INTENT_PRIORITY = list(INTENT_KEYWORDS)
+
+# What a call is about - closing, escalation and yes/no turns don't change it
+BUSINESS_INTENTS = tuple(INTENT_KEYWORDS)
+
+_TRAILING_PUNCTUATION = ' \t\n.,!?;:'
+_NON_WORD = re.compile(r"[^a-z0-9' ]+")
+_SPACES = re.compile(r"\s+")
+
+
+def _trie_pattern(phrases) -> str:
+    """Regex for a set of literals with shared prefixes factored out ("wh(?:en|ere)")
+
+    A flat alternation retries every phrase at every position; the trie form lets the regex
+    engine drop out after the first character that can't start a phrase. Optional tails are
+    greedy, so the longest phrase at a position wins, like a longest-first alternation.
+    """
+
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{body})?' if '' in node else body
+
+    return build(trie)
+
+
+def normalize_utterance(utterance: str) -> str:
+    """Canonical form for caching: 'Hello?? I have a  question.' -> 'hello i have a question'"""
+    return _SPACES.sub(' ', _NON_WORD.sub(' ', (utterance or '').lower())).strip()
+
+
+def _confidence(hits: int, competing_hits: int) -> float:
+    """More hits -> more confident; hits for rival labels -> less confident"""
+    if not hits:
+        return 0.0
+    return round((1 - 0.4 ** hits) * hits / max(competing_hits, hits), 3)
+
+
+class IntentClassifier:
+    """Compiled, single-pass classifier over all keyword tables"""
+
+    def __init__(self, intent_keywords: dict = None, phrase_labels: dict = None, whole_utterance_labels: dict = None):
+        self.intent_keywords = intent_keywords or INTENT_KEYWORDS
+        self.phrase_labels = phrase_labels or PHRASE_LABELS
+        self.whole_utterance_labels = whole_utterance_labels or WHOLE_UTTERANCE_LABELS
+        self.intent_priority = list(self.intent_keywords)
+
+        # phrase -> labels it carries
+        phrase_to_labels = {}
+        for table in (self.intent_keywords, self.phrase_labels):
+            for label, phrases in table.items():
+                for phrase in phrases:
+                    phrase_to_labels.setdefault(phrase, set()).add(label)
+
+        # The scan below tries every start position and takes the longest phrase there, so a
+        # shorter phrase starting at the same spot ("no" under "no thanks") is implied by it
+        self._closure = {
+            phrase: [other for other in phrase_to_labels if phrase.startswith(other)]
+            for phrase in phrase_to_labels
+        }
+        # Flattened per matched phrase, so classify() only has to count
+        self._labels_for = {
+            phrase: [label for other in closure for label in sorted(phrase_to_labels[other])]
+            for phrase, closure in self._closure.items()
+        }
+
+        self._phrase_to_labels = phrase_to_labels
+        # Zero-width lookahead so matches may overlap, like repeated substring checks would
+        self._pattern = re.compile(f'(?=({_trie_pattern(phrase_to_labels)}))')
+
+        self._whole = {}
+        for label, phrases in self.whole_utterance_labels.items():
+            for phrase in phrases:
+                self._whole.setdefault(phrase, set()).add(label)
+
+    def classify(self, utterance: str) -> dict:
+        """All labels for the utterance with confidences, plus the primary intent"""
+
+        text = (utterance or '').lower()
+
+        found = self._pattern.findall(text)
+
+        hits = {}
+        for phrase in found:
+            for label in self._labels_for[phrase]:
+                hits[label] = hits.get(label, 0) + 1
+
+        intent_hits = sum(hits.get(label, 0) for label in self.intent_priority)
+        labels = {}
+        for label, count in hits.items():
+            competing = intent_hits if label in self.intent_keywords else count
+            labels[label] = _confidence(count, competing)
+
+        for label in self._whole.get(text.strip(_TRAILING_PUNCTUATION), ()):
+            labels[label] = 1.0
+
+        intent = next((label for label in self.intent_priority if label in labels), None)
+        return {
+            'intent': intent,
+            'confidence': labels.get(intent, 0.0),
+            'labels': labels,
+            'matches': sorted({phrase for match in set(found) for phrase in self._closure[match]})
+        }
+
+
+# Shared instance - compile once per process
+classifier = IntentClassifier()
+
+
+def classify_utterance(utterance: str) -> dict:
+    return classifier.classify(utterance)
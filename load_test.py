@@ -0,0 +1,267 @@
+"""
+Offline call simulator / load test
+Plays Twilio's part for thousands of concurrent scripted calls - /voice -> /get-phone-number ->
+(/partial-speech) -> /process-speech ... -> /call-status with the form fields Twilio sends - against
+a seeded local stand-in database, and reports per-webhook p50/p95/p99 latency, throughput and
+error rate. Runs the app in-process by default; --url drives a server that is already running
+(start it on a DB seeded with the same --customers).
+
+In-process, the simulated callers and the app share one event loop. A webhook that never leaves
+the loop finishes inside a single loop step, while one that waits on the stage executor
+(/process-speech) waits for a whole step - and with --think 0 a step runs every other caller's
+requests, so that wait grows with --concurrency. Compare in-process runs with each other; for
+absolute latencies use --url and a realistic --think.
+
+Usage:
+    python load_test.py [--calls 2000] [--concurrency 200] [--customers 500] [--db sqlite:///loadtest_bto.db]
+    python load_test.py --url http://localhost:8000 --calls 500 --think 1.5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_LOAD_DB = "sqlite:///loadtest_bto.db"
+
+DIGIT_WORDS = ['zero', 'one', 'two', 'three', 'four', 'five', 'six', 'seven', 'eight', 'nine']
+
+# (weight, utterances after the phone number) - the last line of most scripts ends the call
+SCRIPTS = [
+    (30, ["where is my bike", "thanks bye"]),
+    (20, ["when will it be delivered", "okay thank you goodbye"]),
+    (10, ["what is the status of my order", "when will it reach the showroom", "bye"]),
+    (12, ["I want to cancel my booking", "no", "bye"]),
+    (5, ["I want to cancel my booking", "yes", "thank you bye"]),
+    (8, ["I want to talk to a manager"]),
+    (8, ["how many more days", "ok bye"]),
+    (7, ["hmm", "where is my scooter", "that's all thanks"]),
+]
+
+
+def spoken_number(national: str, rng: random.Random) -> list:
+    """How a caller might say the number - words, digits, "double", sometimes in two goes"""
+
+    words = []
+    i = 0
+    while i < len(national):
+        if i + 1 < len(national) and national[i] == national[i + 1] and rng.random() < 0.5:
+            words.extend(['double', DIGIT_WORDS[int(national[i])]])
+            i += 2
+        else:
+            words.append(DIGIT_WORDS[int(national[i])] if rng.random() < 0.8 else national[i])
+            i += 1
+
+    if rng.random() < 0.15:
+        split = rng.randrange(3, len(words) - 2)
+        return [' '.join(words[:split]), ' '.join(words[split:])]
+    return [' '.join(words)]
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+class CallSimulator:
+    """Twilio stand-in: one scripted call = the sequence of webhooks Twilio would make"""
+
+    def __init__(self, client, phones: list, rng: random.Random, think_seconds: float = 0.0,
+                 partials: bool = True, unknown_rate: float = 0.05):
+        self.client = client
+        self.phones = phones
+        self.rng = rng
+        self.think_seconds = think_seconds
+        self.partials = partials
+        self.unknown_rate = unknown_rate
+        self.latencies = {}  # webhook path -> seconds
+        self.errors = {}
+        self.requests = 0
+        self.calls_completed = 0
+
+    async def post(self, path: str, form: dict) -> str:
+        self.requests += 1
+        start = time.perf_counter()
+        try:
+            response = await self.client.post(path, data=form)
+            status = response.status_code
+            body = response.text
+        except Exception as e:
+            status, body = type(e).__name__, ''
+        self.latencies.setdefault(path, []).append(time.perf_counter() - start)
+
+        if status != 200 or (path not in ('/call-status', '/partial-speech') and '<Response>' not in body):
+            self.errors.setdefault(path, {}).setdefault(str(status), 0)
+            self.errors[path][str(status)] += 1
+        return body
+
+    async def think(self):
+        if self.think_seconds:
+            await asyncio.sleep(self.rng.uniform(0.5, 1.5) * self.think_seconds)
+
+    async def run_call(self, index: int):
+        rng = self.rng
+        call_sid = f"CA{rng.getrandbits(128):032x}"
+        caller = f"+9198{rng.randrange(10 ** 8):08d}"
+        customer = self.phones[rng.randrange(len(self.phones))] if rng.random() >= self.unknown_rate \
+            else f"+9199{rng.randrange(10 ** 8):08d}"  # not in the DB
+        base = {'AccountSid': 'AC' + '0' * 32, 'CallSid': call_sid, 'From': caller, 'To': '+18005550100',
+                'Direction': 'inbound', 'ApiVersion': '2010-04-01'}
+        started = time.perf_counter()
+
+        await self.post('/voice', dict(base, CallStatus='ringing'))
+
+        for part in spoken_number(customer[-10:], rng):
+            await self.think()
+            await self.post('/get-phone-number', dict(base, CallStatus='in-progress', SpeechResult=part,
+                                                      Confidence=f"{rng.uniform(0.7, 0.99):.2f}"))
+
+        script = [lines for weight, lines in SCRIPTS for _ in range(weight)][rng.randrange(sum(w for w, _ in SCRIPTS))]
+        for utterance in script:
+            await self.think()
+            if self.partials:
+                words = utterance.split()
+                for sequence, cut in enumerate(sorted({max(1, len(words) // 2), len(words)})):
+                    await self.post('/partial-speech', dict(base, SequenceNumber=str(sequence + 1),
+                                                            StableSpeechResult=' '.join(words[:cut]),
+                                                            UnstableSpeechResult=''))
+            body = await self.post('/process-speech', dict(base, CallStatus='in-progress', SpeechResult=utterance,
+                                                           Confidence=f"{rng.uniform(0.7, 0.99):.2f}"))
+            if '<Hangup' in body:
+                break
+
+        await self.post('/call-status', dict(base, CallStatus='completed',
+                                             CallDuration=str(int(time.perf_counter() - started) + 1)))
+        self.calls_completed += 1
+
+    def report(self, wall_seconds: float) -> dict:
+        endpoints = {}
+        all_latencies = []
+        for path, values in self.latencies.items():
+            values.sort()
+            all_latencies.extend(values)
+            errors = sum(self.errors.get(path, {}).values())
+            endpoints[path] = {
+                'requests': len(values),
+                'p50_ms': round(percentile(values, 0.50) * 1000, 2),
+                'p95_ms': round(percentile(values, 0.95) * 1000, 2),
+                'p99_ms': round(percentile(values, 0.99) * 1000, 2),
+                'max_ms': round(values[-1] * 1000, 2),
+                'errors': errors,
+                'error_rate': round(errors / len(values), 4)
+            }
+        all_latencies.sort()
+        errors = sum(row['errors'] for row in endpoints.values())
+        return {
+            'calls': self.calls_completed,
+            'requests': self.requests,
+            'seconds': round(wall_seconds, 2),
+            'requests_per_second': round(self.requests / wall_seconds, 1),
+            'calls_per_second': round(self.calls_completed / wall_seconds, 1),
+            'error_rate': round(errors / self.requests, 4) if self.requests else 0.0,
+            'p50_ms': round(percentile(all_latencies, 0.50) * 1000, 2),
+            'p95_ms': round(percentile(all_latencies, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(all_latencies, 0.99) * 1000, 2),
+            'endpoints': endpoints,
+            'error_statuses': self.errors
+        }
+
+
+async def run_load(client, phones: list, calls: int, concurrency: int, think_seconds: float,
+                   partials: bool, seed: int) -> dict:
+    simulator = CallSimulator(client, phones, random.Random(seed), think_seconds, partials)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one_call(index):
+        async with semaphore:
+            await simulator.run_call(index)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_call(i) for i in range(calls)))
+    return simulator.report(time.perf_counter() - start)
+
+
+async def run_in_process(db_url: str, customers: int, **options) -> dict:
+    """Seed the stand-in DB, start the app's lifecycle hooks and drive it over ASGI (no sockets)"""
+
+    import httpx
+    from benchmarks import prepare_database
+
+    phones = prepare_database(db_url, customers)
+    import main
+
+    quiet = open(os.devnull, 'w')
+    stdout, sys.stdout = sys.stdout, quiet  # the app logs every turn
+    try:
+        await main.startup()
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=30) as client:
+            report = await run_load(client, phones, **options)
+        await main.shutdown()
+    finally:
+        sys.stdout = stdout
+        quiet.close()
+    return report
+
+
+async def run_against_server(url: str, customers: int, **options) -> dict:
+    import httpx
+    from bto_schema import phone_for
+
+    phones = [phone_for(i) for i in range(customers)]
+    limits = httpx.Limits(max_connections=options['concurrency'])
+    async with httpx.AsyncClient(base_url=url.rstrip('/'), timeout=30, limits=limits) as client:
+        return await run_load(client, phones, **options)
+
+
+def print_report(report: dict, target: str):
+    print("=" * 84)
+    print(f"📞 {report['calls']} simulated calls against {target}")
+    print(f"   {report['requests']} webhooks in {report['seconds']}s - {report['requests_per_second']} req/s, "
+          f"{report['calls_per_second']} calls/s, error rate {report['error_rate']:.2%}")
+    print("=" * 84)
+    print(f"{'webhook':<22}{'requests':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'errors':>10}")
+    print("-" * 84)
+    for path, row in report['endpoints'].items():
+        print(f"{path:<22}{row['requests']:>10}{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}"
+              f"{row['max_ms']:>10}{row['errors']:>10}")
+    print("-" * 84)
+    print(f"{'all':<22}{report['requests']:>10}{report['p50_ms']:>10}{report['p95_ms']:>10}{report['p99_ms']:>10}")
+    print("=" * 84)
+    if report['error_statuses']:
+        print(f"❌ Errors by status: {report['error_statuses']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate concurrent calls against the voice agent webhooks")
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200, help="calls in progress at once")
+    parser.add_argument("--customers", type=int, default=500, help="seeded BTO customers callers ask about")
+    parser.add_argument("--db", default=DEFAULT_LOAD_DB, help="stand-in database URL (never production)")
+    parser.add_argument("--url", help="drive a running server instead of the app in-process")
+    parser.add_argument("--think", type=float, default=0.0, help="mean seconds a caller speaks before each webhook")
+    parser.add_argument("--no-partials", action="store_true", help="don't send partialResultCallback requests")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    options = dict(calls=args.calls, concurrency=args.concurrency, think_seconds=args.think,
+                   partials=not args.no_partials, seed=args.seed)
+    if args.url:
+        report = asyncio.run(run_against_server(args.url, args.customers, **options))
+        target = args.url
+    else:
+        report = asyncio.run(run_in_process(args.db, args.customers, **options))
+        target = f"in-process app ({args.db})"
+
+    print_report(report, target)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
@@ -3,178 +3,236 @@ TVS BTO AI Voice Agent - Main FastAPI Server
 Handles incoming calls, speech processing, and AI responses
 """
 
-from fastapi import FastAPI, Request, Form
+from fastapi import FastAPI, Request, Form, WebSocket
 from fastapi.responses import Response
-from twilio.twiml.voice_response import VoiceResponse, Gather
 import openai
 import os
 from dotenv import load_dotenv
-from datetime import datetime
+import asyncio
 import json
+import time
 
 from business_logic import TVSBusinessLogic
-from database import save_conversation, create_escalation, init_db
+from database import init_db, warm_up_pool, pool_status
+from executor import StageExecutor
+from session_store import create_session_store
+from write_behind import write_queue
+from intent_classifier import classifier, normalize_utterance, BUSINESS_INTENTS
+from phone_parser import parse_phone_number
+from gather_tuning import GatherTuner
+import metrics
+import tracing
+from tracing import tracer, TraceMiddleware
+from media_stream import MediaStreamHandler, stream_stats, usable_stream_url
+from twiml_templates import (
+    GREETING, PHONE_NOT_HEARD, PHONE_PARTIAL, PHONE_RETRY, PHONE_CONFIRMED, PHONE_CONFIRMED_STREAM,
+    SESSION_EXPIRED, PHONE_NEEDED, SPEECH_NOT_HEARD, REPLY_AND_CONTINUE, REPLY_AND_GOODBYE
+)
 
 load_dotenv()
 
+# Below this the number is asked for again rather than risk looking up the wrong customer
+PHONE_MIN_CONFIDENCE = float(os.getenv("PHONE_MIN_CONFIDENCE", "0.6"))
+
+# wss:// URL of /media-stream - when set, calls switch to real-time Media Streams after the phone number
+# (only with a real streaming transcriber configured, see media_stream.usable_stream_url)
+MEDIA_STREAM_URL = usable_stream_url(os.getenv("MEDIA_STREAM_URL", ""))
+
 app = FastAPI()
+app.add_middleware(TraceMiddleware)  # a root span per webhook when TRACE_EXPORTER is set
+app.add_middleware(metrics.MetricsMiddleware)
 business_logic = TVSBusinessLogic()
 
+# Blocking turn stages (DB queries, OpenAI, transcript writes) run here, not on the event loop
+stage_executor = StageExecutor()
+
 # Configure OpenAI
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
-# Store active conversations
-conversations = {}
+# Active call sessions (idle-expiring, size-bounded; shared across workers unless SESSION_BACKEND=memory)
+sessions = create_session_store()
+metrics.Gauge('voice_active_sessions', 'Call sessions in the session store', callback=lambda: len(sessions))
+
+# Gather timeouts picked per stage and caller from how past Gathers ended
+gather_tuner = GatherTuner()
+
+# Keep references to fire-and-forget tasks so they aren't garbage collected
+background_tasks = set()
+
+
+def run_in_background(stage: str, func, *args, **kwargs):
+    """Schedule a blocking stage without holding up the webhook response"""
+    task = asyncio.create_task(stage_executor.run(stage, func, *args, **kwargs))
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+
+def twiml(template, **values) -> Response:
+    """Pre-rendered TwiML template, filled in, as a webhook response"""
+    with tracing.span('twiml.render', template=template.name):
+        content = template.render(**values)
+    return Response(content=content, media_type="application/xml")
+
+
+async def read_form(request: Request):
+    """Webhook form + CallSid; the time FastAPI spent parsing the request is traced here"""
+    form_data = await request.form()
+    call_sid = form_data.get('CallSid')
+    tracing.set_call_sid(call_sid)
+    tracing.mark('request.parse')
+    return form_data, call_sid
+
+
+async def session_io(func, *args):
+    """Run a session store call - on the executor when the backend does file/socket I/O"""
+    if sessions.blocking:
+        return await stage_executor.run('session', func, *args)
+    return func(*args)
+
+
+async def get_session(call_sid: str):
+    with tracing.span('session.get'):
+        return await session_io(sessions.get, call_sid)
+
+
+async def save_session(session):
+    with tracing.span('session.save'):
+        await session_io(sessions.save, session)
+
+
+def gather_timeouts(session, stage: str) -> dict:
+    """timeout/speech_timeout slots for the Gather about to be returned
+    
+    Its timing rides in session.pending_gather (save the session afterwards), so the action
+    webhook can finish it on any worker; partial results go to the store under its id.
+    """
+    caller = session.caller if session is not None else None
+    setting = gather_tuner.choose(stage, caller)
+    if session is not None:
+        session.pending_gather = gather_tuner.issued(stage, setting, caller)
+    return setting
+
+
+async def gather_completed(session, outcome: str):
+    """The session's pending Gather ended with `outcome` (answered / reprompt / no_input)"""
+    if session is None:
+        return
+    gather = session.pending_gather
+    if gather is not None and gather.get('id'):
+        partials = await session_io(sessions.take_partials, session.call_sid, gather['id'])
+        if partials is not None:
+            gather['first_partial'], gather['last_partial'] = partials
+    gather_tuner.completed(gather, outcome)
+    session.pending_gather = None
 
 # Initialize DB on startup
 @app.on_event("startup")
 async def startup():
     init_db()
     print("✅ Database initialized!")
+    warm_up_pool()
+    write_queue.start()
+    tracer.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    # Let in-flight prefetches/speculations finish before the pool stops taking work
+    if background_tasks:
+        await asyncio.gather(*background_tasks, return_exceptions=True)
+    stage_executor.shutdown(wait=True)
+    print("👋 Stage executor stopped")
+    write_queue.stop()
+    tracer.stop()
+    business_logic.save_ai_intent_cache()
+    if gather_tuner.path:
+        try:
+            gather_tuner.save()
+            print(f"💾 Saved Gather stats to {gather_tuner.path}")
+        except OSError as e:
+            print(f"⚠️ Could not save Gather stats: {e}")
 
 
 @app.post("/voice")
 async def handle_incoming_call(request: Request):
     """Handle incoming Twilio call - Initial greeting"""
     
-    form_data = await request.form()
+    form_data, call_sid = await read_form(request)
     caller_number = form_data.get('From', 'Unknown')
-    call_sid = form_data.get('CallSid')
     
-    # Initialize conversation
-    conversations[call_sid] = {
-        'caller': caller_number,
-        'customer_phone': None,  # Will be set after customer provides it
-        'history': [],
-        'start_time': datetime.now().isoformat(),
-        'stage': 'phone_verification'  # Track conversation stage
-    }
+    # Initialize conversation (customer_phone is set after the customer provides it)
+    session = await session_io(sessions.create, call_sid, caller_number)
+    gather_tuner.call_started()
     
     print(f"📞 New call from: {caller_number} | SID: {call_sid}")
     
-    response = VoiceResponse()
-    
-    # Greeting
-    response.say(
-        "Hello! Welcome to TVS vehicle booking support.",
-        voice='Polly.Joanna',
-        language='en-IN'
-    )
-    
-    response.pause(length=1)
-    
-    # Ask for phone number
-    gather = Gather(
-        input='speech',
-        action='/get-phone-number',
-        method='POST',
-        timeout=5,
-        speech_timeout='3',
-        language='en-IN'
-    )
-    
-    gather.say(
-        "To help you better, please provide your mobile number. Say your 10-digit number.",
-        voice='Polly.Joanna'
-    )
-    response.append(gather)
-    
-    response.say("I didn't hear your number. Please call back. Goodbye!")
-    
-    return Response(content=str(response), media_type="application/xml")
+    # Greeting + ask for phone number (pre-rendered)
+    setting = gather_timeouts(session, 'phone')
+    await save_session(session)
+    return twiml(GREETING, **setting)
 
 
 @app.post("/get-phone-number")
 async def get_phone_number(request: Request, SpeechResult: str = Form(None)):
     """Get customer's phone number"""
     
-    form_data = await request.form()
-    call_sid = form_data.get('CallSid')
+    form_data, call_sid = await read_form(request)
     phone_speech = SpeechResult or ''
     
     print(f"🗣️ Customer said: {phone_speech}")
     
-    response = VoiceResponse()
+    session = await get_session(call_sid)
     
     if not phone_speech.strip():
-        response.say("I'm sorry, I didn't catch your number. Please try again.", voice='Polly.Joanna')
-        response.pause(length=1)
-        gather = Gather(
-            input='speech',
-            action='/get-phone-number',
-            method='POST',
-            timeout=5,
-            speech_timeout='3',
-            language='en-IN'
-        )
-        gather.say("Please say your 10-digit mobile number.")
-        response.append(gather)
-        return Response(content=str(response), media_type="application/xml")
-    
-    # Extract phone number from speech
-    customer_phone = extract_phone_number(phone_speech)
-    
-    if not customer_phone:
-        response.say("I'm sorry, I couldn't understand the number. Let me try again.", voice='Polly.Joanna')
-        response.pause(length=1)
-        gather = Gather(
-            input='speech',
-            action='/get-phone-number',
-            method='POST',
-            timeout=5,
-            speech_timeout='3',
-            language='en-IN'
-        )
-        gather.say("Please say your 10-digit mobile number clearly.")
-        response.append(gather)
-        return Response(content=str(response), media_type="application/xml")
-    
-    # Format phone number
-    if not customer_phone.startswith('+'):
-        customer_phone = '+91' + customer_phone if len(customer_phone) == 10 else '+' + customer_phone
-    
+        await gather_completed(session, 'no_input')
+        setting = gather_timeouts(session, 'phone')
+        if session is not None:
+            await save_session(session)
+        return twiml(PHONE_NOT_HEARD, **setting)
+    
+    # Parse the spoken number (callers often give it in parts - continue what we have)
+    partial = session.partial_phone if session is not None else ''
+    parsed = parse_phone_number(phone_speech, prefix=partial or '')
+    print(f"🔢 Parsed number: {parsed['digits'] or '-'} (confidence {parsed['confidence']})")
+    
+    if not parsed['complete'] and 0 < len(parsed['digits']) < 10 and session is not None:
+        # Keep the digits we heard and only ask for the rest
+        session.partial_phone = parsed['digits']
+        await gather_completed(session, 'reprompt')  # cut off mid-number
+        setting = gather_timeouts(session, 'phone')
+        await save_session(session)
+        return twiml(PHONE_PARTIAL, digits=' '.join(parsed['digits']), remaining=10 - len(parsed['digits']), **setting)
+    
+    if parsed['phone'] is None or parsed['confidence'] < PHONE_MIN_CONFIDENCE:
+        await gather_completed(session, 'reprompt')
+        setting = gather_timeouts(session, 'phone')
+        if session is not None:
+            session.partial_phone = None
+            await save_session(session)
+        return twiml(PHONE_RETRY, **setting)
+    
+    customer_phone = parsed['phone']
     print(f"✅ Customer phone: {customer_phone}")
+    await gather_completed(session, 'answered')
+    
+    # Acknowledge, pause while the prefetch runs, then gather the question (or switch to the stream)
+    setting = None if MEDIA_STREAM_URL else gather_timeouts(session, 'question')
     
     # Store in conversation
-    if call_sid in conversations:
-        conversations[call_sid]['customer_phone'] = customer_phone
-        conversations[call_sid]['stage'] = 'asking_help'
+    if session is not None:
+        session.customer_phone = customer_phone
+        session.partial_phone = None
+        session.stage = 'asking_help'
+        await save_session(session)
         print(f"✅ Stored phone in conversation: {call_sid}")
+        
+        # Warm booking data during the pause below so the first question is answered instantly
+        run_in_background('prefetch', business_logic.prefetch_call_data, customer_phone, call_sid)
     
-    # IMPORTANT: Acknowledge and create pause
-    response.say(
-        f"Thank you! I have your number as {customer_phone}. Let me retrieve your booking details.",
-        voice='Polly.Joanna',
-        language='en-IN'
-    )
-    response.pause(length=2)
-    
-    # Create the Gather for next input - THIS IS KEY
-    gather = Gather(
-        num_digits=0,  # ← Accept any digits
-        input='speech',
-        action='/process-speech',
-        method='POST',
-        timeout=10,    # ← INCREASED from 6
-        speech_timeout='5',  # ← INCREASED from 4
-        language='en-IN',
-        hints='status,delivery,cancel,where,when'
-    )
-    gather.say(
-        "Now, how can I help you today? Ask about your vehicle status, delivery updates, or cancellation.",
-        voice='Polly.Joanna'
-    )
-    response.append(gather)
-    
-    # Fallback if no speech heard
-    response.say("I didn't hear your question. Please call back. Goodbye!", voice='Polly.Joanna')
-    
-    # IMPORTANT: Return with proper XML encoding
-    return Response(
-        content=str(response),
-        media_type="application/xml",
-        status_code=200
-    )
+    if MEDIA_STREAM_URL:
+        return twiml(PHONE_CONFIRMED_STREAM, phone=customer_phone, stream_url=MEDIA_STREAM_URL)
+    return twiml(PHONE_CONFIRMED, phone=customer_phone, **setting)
 
 @app.post("/process-speech")
 async def process_speech(
@@ -185,135 +243,195 @@ async def process_speech(
 ):
     """Process customer speech using AI and business logic"""
     
-    form_data = await request.form()
-    call_sid = form_data.get('CallSid')
+    form_data, call_sid = await read_form(request)
     user_speech = SpeechResult or ''
     
     print(f"🗣️ Customer: {user_speech}")
     print(f"⏱️ Processing speech...")
     
-    response = VoiceResponse()
-    
     # Validate session
-    if call_sid not in conversations:
+    session = await get_session(call_sid)
+    if session is None:
         print(f"❌ Session not found: {call_sid}")
-        response.say("Session expired. Please call back.")
-        response.hangup()
-        return Response(content=str(response), media_type="application/xml")
+        return twiml(SESSION_EXPIRED)
     
-    customer_phone = conversations[call_sid].get('customer_phone')
+    customer_phone = session.customer_phone
     
     if not customer_phone:
-        response.say("I need to verify your phone number first.")
-        gather = Gather(
-            input='speech',
-            action='/get-phone-number',
-            method='POST',
-            timeout=5
-        )
-        gather.say("Please say your 10-digit mobile number.")
-        response.append(gather)
-        return Response(content=str(response), media_type="application/xml")
+        return twiml(PHONE_NEEDED)
     
     if not user_speech.strip():
-        response.say("I'm sorry, I didn't catch that. Please speak clearly.", voice='Polly.Joanna')
-        response.pause(length=1)
-        gather = Gather(
-            input='speech',
-            action='/process-speech',
-            method='POST',
-            timeout=10,
-            speech_timeout='5',
-            language='en-IN'
-        )
-        gather.say("What would you like to know?")
-        response.append(gather)
-        return Response(content=str(response), media_type="application/xml")
+        await gather_completed(session, 'no_input')
+        setting = gather_timeouts(session, 'followup')
+        await save_session(session)
+        return twiml(SPEECH_NOT_HEARD, **setting)
+    
+    turn = await run_turn(session, user_speech)
+    ai_response = turn['message']
+    await gather_completed(session, gather_outcome(turn, user_speech))
+    
+    # Speak response, then either hang up or keep the conversation going (one session write either way)
+    if turn['end_call']:
+        await save_session(session)
+        return twiml(REPLY_AND_GOODBYE, message=ai_response)
+    setting = gather_timeouts(session, 'followup')
+    await save_session(session)
+    return twiml(REPLY_AND_CONTINUE, message=ai_response, **setting)
+
+
+def gather_outcome(turn: dict, user_speech: str) -> str:
+    """'reprompt' when the Gather didn't really capture a request - usually the caller was cut off
+    
+    Signals: nothing classifiable was heard, no classifier could place the words and the LLM
+    fallback fell back to its default (timeout, no budget, breaker open), or the turn errored
+    and asked the caller to try again.
+    """
+    if not normalize_utterance(user_speech):
+        return 'reprompt'
+    if turn.get('resolution') == 'llm_default' or turn['intent'] == 'unknown':
+        return 'reprompt'
+    return 'answered'
+
+
+async def run_turn(session, user_speech: str) -> dict:
+    """One caller utterance -> turn result; records it in the session (the caller saves it) and the transcript"""
     
     # Get conversation history
-    history = conversations[call_sid]['history']
+    history = session.history_messages()
     
     try:
         print(f"🤔 Generating response...")
         
-        # Get AI response with timeout
-        ai_response = business_logic.generate_response(
-            phone_number=customer_phone,
-            user_message=user_speech,
-            call_sid=call_sid,
-            conversation_history=history
-        )
+        # Get AI response off the event loop so other calls keep flowing
+        with tracing.span('turn.generate_response') as span:
+            turn = await stage_executor.run(
+                'turn',
+                business_logic.generate_response,
+                phone_number=session.customer_phone,
+                user_message=user_speech,
+                call_sid=session.call_sid,
+                conversation_history=history
+            )
+            span.set('intent', turn['intent'])
         
-        print(f"🤖 Agent: {ai_response[:100]}...")  # Log first 100 chars
+        print(f"🤖 Agent: {turn['message'][:100]}...")  # Log first 100 chars
+        print(f"⏱️ Turn timings: {turn['timings']}")
         
     except Exception as e:
         print(f"❌ Error generating response: {e}")
-        ai_response = "I'm having trouble processing your request. Please try again."
+        turn = {
+            "message": "I'm having trouble processing your request. Please try again.",
+            "intent": "unknown",
+            "resolution": None,
+            "escalated": False,
+            "end_call": should_end_call(user_speech),
+            "data": None,
+            "timings": {}
+        }
+    
+    # The intent stored is the one generate_response acted on - no second classification
+    ai_response = turn['message']
+    intent = turn['intent']
+    metrics.TURNS.inc(intent=intent)
     
     # Add to history
-    history.append({"role": "user", "content": user_speech})
-    history.append({"role": "assistant", "content": ai_response})
+    turn_index = session.message_count
+    session.add_turn(user_speech, ai_response)
+    session.last_intent = intent
+    if intent in BUSINESS_INTENTS:
+        session.business_intent = intent  # "thanks, bye" mustn't become what the call was about
+    
+    # Save conversation (append this exchange only) - written after Twilio has its reply
+    write_queue.enqueue_turn(
+        call_sid=session.call_sid,
+        phone=session.customer_phone,
+        turn_index=turn_index,
+        user_text=user_speech,
+        assistant_text=ai_response,
+        intent=intent,
+        resolution=turn.get('resolution')
+    )
     
-    # Save conversation
-    try:
-        save_or_update_conversation(
-            call_sid=call_sid,
-            phone=customer_phone,
-            transcript={"messages": history},
-            intent=business_logic.classify_intent(user_speech)
-        )
-    except Exception as e:
-        print(f"⚠️ DB save error: {e}")
-    
-    # Speak response with pause
-    response.pause(length=0.5)
-    response.say(ai_response, voice='Polly.Joanna', language='en-IN')
-    response.pause(length=0.5)
-    
-    # Check if should end call
-    if should_end_call(user_speech):
-        response.say("Thank you for choosing TVS. Goodbye!", voice='Polly.Joanna')
-        response.hangup()
-    else:
-        # Continue conversation with proper Gather
-        response.pause(length=1)
-        gather = Gather(
-            input='speech',
-            action='/process-speech',
-            method='POST',
-            timeout=10,
-            speech_timeout='5',
-            language='en-IN',
-            hints='delivery,status,cancel,when,where'
-        )
-        gather.say("Is there anything else I can help you with?", voice='Polly.Joanna')
-        response.append(gather)
-        
-        # Fallback
-        response.say("I didn't hear your response. Thank you for calling. Goodbye!", voice='Polly.Joanna')
+    return turn
+
+
+def speculate(session, partial_text: str):
+    """Start answering from a partial transcript; the final turn picks the answer up if it agrees"""
+    
+    if session is None or not session.customer_phone:
+        return
+    intent = business_logic.speculation_intent(session.call_sid, partial_text)
+    if intent is not None:
+        run_in_background('speculate', business_logic.speculate_response,
+                          session.customer_phone, session.call_sid, intent, partial_text)
+
+
+@app.post("/partial-speech")
+async def partial_speech(request: Request):
+    """Gather partialResultCallback - interim transcripts while the caller is still speaking"""
     
-    return Response(
-        content=str(response),
-        media_type="application/xml",
-        status_code=200
+    form_data, call_sid = await read_form(request)
+    partial_text = ' '.join(
+        part for part in (form_data.get('StableSpeechResult'), form_data.get('UnstableSpeechResult')) if part
     )
+    
+    session = await get_session(call_sid)
+    if session is not None and session.pending_gather is not None and session.pending_gather.get('id'):
+        # Recorded on its own - saving the whole session here could overwrite a concurrent /process-speech
+        await session_io(sessions.record_partial, call_sid, session.pending_gather['id'], time.time())
+    if partial_text.strip():
+        speculate(session, partial_text)
+    
+    return Response(content="OK", media_type="text/plain", status_code=200)
+
+
+@app.websocket("/media-stream")
+async def media_stream(websocket: WebSocket):
+    """Real-time mode: one Twilio Media Streams WebSocket per call (see MEDIA_STREAM_URL)"""
+    
+    async def on_partial(call_sid: str, text: str):
+        # The caller is still talking - once the words name an intent, start on the answer
+        speculate(await get_session(call_sid), text)
+    
+    async def on_utterance(call_sid: str, text: str) -> dict:
+        print(f"🗣️ Customer (stream): {text}")
+        with tracing.trace('media-stream utterance', call_sid, tracing.KIND_SERVER):
+            session = await get_session(call_sid)
+            if session is None or not session.customer_phone:
+                return {"message": "Session expired. Please call back.", "intent": None, "resolution": None,
+                        "escalated": False, "end_call": True, "data": None, "timings": {}}
+            turn = await run_turn(session, text)
+            await save_session(session)
+            return turn
+    
+    await MediaStreamHandler(websocket, on_utterance, on_partial).run()
+
 
 @app.post("/call-status")
 async def call_status(request: Request):
     """Track call completion"""
     
     try:
-        form_data = await request.form()
-        call_sid = form_data.get('CallSid')
+        form_data, call_sid = await read_form(request)
         status = form_data.get('CallStatus')
         
         print(f"📊 Call {call_sid} status: {status}")
         
-        if status == 'completed' and call_sid in conversations:
-            messages = len(conversations[call_sid]['history'])
-            print(f"✅ Call ended. Total exchanges: {messages}")
-            # Optional: Clean up conversation
-            # del conversations[call_sid]
+        if status == 'completed':
+            session = await get_session(call_sid)
+            if session is not None:
+                print(f"✅ Call ended. Total exchanges: {session.message_count}")
+                if session.customer_phone:
+                    write_queue.enqueue_call_log(
+                        phone_number=session.customer_phone,
+                        intent=session.business_intent or session.last_intent or 'unknown',
+                        outcome='completed',
+                        call_id=call_sid
+                    )
+            
+            # Clean up conversation
+            await session_io(sessions.delete, call_sid)
+            business_logic.invalidate_booking_snapshot(call_sid)
         
         # Return proper response with Content-Type
         return Response(
@@ -334,71 +452,44 @@ async def call_status(request: Request):
 async def root():
     return {
         "status": "🤖 TVS BTO Voice Agent Running",
-        "active_calls": len(conversations)
+        "active_calls": await session_io(len, sessions)
     }
 
 
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus scrape target - fixed label sets, so the cost doesn't grow with call volume"""
+    # The session gauge may query the store, so render where store I/O is allowed
+    content = await session_io(metrics.registry.render)
+    return Response(content=content, media_type=metrics.CONTENT_TYPE)
+
+
 @app.get("/stats")
 async def stats():
+    """Aggregate component stats - no per-call details or phone numbers (see /metrics for time series)"""
+    session_stats = await session_io(sessions.stats)
     return {
-        "active_calls": len(conversations),
-        "details": [
-            {
-                "call_sid": sid,
-                "caller": conv['caller'],
-                "customer_phone": conv.get('customer_phone'),
-                "messages": len(conv['history']),
-                "stage": conv.get('stage')
-            }
-            for sid, conv in conversations.items()
-        ]
+        "active_calls": session_stats['size'],
+        "sessions": session_stats,
+        "write_queue": write_queue.stats(),
+        "prefetch": business_logic.prefetch_stats(),
+        "speculation": business_logic.speculation_stats(),
+        "gather": gather_tuner.stats(),
+        "tracing": tracer.stats(),
+        "ai_intent_cache": business_logic.ai_intent_stats(),
+        "media_streams": stream_stats()
     }
 
 
-def extract_phone_number(speech: str) -> str:
-    """Extract phone number from speech"""
-    
-    # Remove spaces and common words
-    speech = speech.lower().replace(" ", "").replace("nine", "9").replace("eight", "8").replace("seven", "7").replace("six", "6").replace("five", "5").replace("four", "4").replace("three", "3").replace("two", "2").replace("one", "1").replace("zero", "0").replace("oh", "0")
-    
-    # Extract only digits
-    phone = ''.join(filter(str.isdigit, speech))
-    
-    # Validate length (10 digits for Indian numbers)
-    if len(phone) == 10 or len(phone) == 12:
-        return phone[-10:]  # Take last 10 digits
-    
-    return None
-
-
-def save_or_update_conversation(call_sid: str, phone: str, transcript: dict, intent: str):
-    """Save or update conversation (avoid duplicates)"""
-    
-    from database import SessionLocal, Conversation
-    
-    db = SessionLocal()
-    try:
-        # Check if conversation exists
-        existing = db.query(Conversation).filter(Conversation.call_sid == call_sid).first()
-        
-        if existing:
-            # Update existing
-            existing.transcript = transcript
-            existing.intent = intent
-            db.commit()
-            print(f"💾 Conversation updated: {call_sid}")
-        else:
-            # Insert new
-            save_conversation(call_sid, phone, transcript, intent)
-    finally:
-        db.close()
+@app.get("/db-pool")
+async def db_pool():
+    return pool_status()
 
 
 def should_end_call(user_speech: str) -> bool:
     """Check if customer wants to end call"""
     
-    end_phrases = ['goodbye', 'bye', 'thank you', 'thanks', 'that\'s all', 'nothing else']
-    return any(phrase in user_speech.lower() for phrase in end_phrases)
+    return 'end_call' in classifier.classify(user_speech)['labels']
 
 
 if __name__ == "__main__":
@@ -0,0 +1,520 @@
+"""
+Real-time call mode over Twilio Media Streams (<Connect><Stream> WebSocket)
+Caller audio arrives as 8 kHz μ-law frames; an energy endpointer splits it into utterances,
+a pluggable transcriber turns them into (partial) text and the reply is streamed back as
+μ-law from a pluggable synthesizer. Decisions still come from TVSBusinessLogic via main.py.
+
+Local testing without Twilio:
+    python media_stream.py make-fixture fixtures/status.ulaw --words 5 3
+    python media_stream.py replay fixtures/status.ulaw --call-sid CA123 \\
+        --transcripts "where is my bike" "thank you bye"
+"""
+
+import argparse
+import asyncio
+from abc import ABC, abstractmethod
+import base64
+import importlib
+import json
+import math
+import os
+import random
+import threading
+import time
+from array import array
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SAMPLE_RATE = 8000
+FRAME_BYTES = 160  # 20 ms of 8 kHz μ-law
+FRAME_MS = 20
+
+# Endpointing: RMS above STREAM_SPEECH_RMS is speech; STREAM_SILENCE_MS of quiet ends the utterance
+STREAM_SPEECH_RMS = float(os.getenv("STREAM_SPEECH_RMS", "500"))
+STREAM_SILENCE_MS = int(os.getenv("STREAM_SILENCE_MS", "600"))
+STREAM_MIN_SPEECH_MS = int(os.getenv("STREAM_MIN_SPEECH_MS", "200"))
+
+MEDIA_TRANSCRIBER = os.getenv("MEDIA_TRANSCRIBER", "fixture")
+MEDIA_SYNTHESIZER = os.getenv("MEDIA_SYNTHESIZER", "tone")
+
+# Spoken when a turn fails mid-stream, same words as the webhook flow's fallback
+REPLY_ON_ERROR = "I'm having trouble processing your request. Please try again."
+
+
+# ---------- G.711 μ-law ----------
+
+_ULAW_BIAS = 0x84
+_ULAW_CLIP = 32635
+
+
+def _ulaw_to_linear(byte: int) -> int:
+    byte = ~byte & 0xFF
+    exponent = (byte >> 4) & 0x07
+    sample = ((((byte & 0x0F) << 3) + _ULAW_BIAS) << exponent) - _ULAW_BIAS
+    return -sample if byte & 0x80 else sample
+
+
+def _linear_to_ulaw(sample: int) -> int:
+    sign = 0x80 if sample < 0 else 0
+    sample = min(abs(sample), _ULAW_CLIP) + _ULAW_BIAS
+    exponent = 7
+    mask = 0x4000
+    while exponent > 0 and not sample & mask:
+        exponent -= 1
+        mask >>= 1
+    mantissa = (sample >> (exponent + 3)) & 0x0F
+    return ~(sign | (exponent << 4) | mantissa) & 0xFF
+
+
+ULAW_DECODE = [_ulaw_to_linear(b) for b in range(256)]
+_ULAW_SQUARES = [s * s for s in ULAW_DECODE]
+_ulaw_encode_table = None
+_encode_table_lock = threading.Lock()
+
+
+def ulaw_decode(data: bytes) -> array:
+    """μ-law bytes -> signed 16-bit PCM samples"""
+    return array('h', [ULAW_DECODE[b] for b in data])
+
+
+def ulaw_encode(samples) -> bytes:
+    """Signed 16-bit PCM samples -> μ-law bytes"""
+    global _ulaw_encode_table
+    if _ulaw_encode_table is None:
+        with _encode_table_lock:
+            if _ulaw_encode_table is None:
+                _ulaw_encode_table = bytes(_linear_to_ulaw(s - 32768) for s in range(65536))
+    table = _ulaw_encode_table
+    return bytes(table[s + 32768] for s in samples)
+
+
+def frame_rms(frame: bytes) -> float:
+    """Loudness of a μ-law frame, without materializing PCM"""
+    return math.sqrt(sum(_ULAW_SQUARES[b] for b in frame) / len(frame)) if frame else 0.0
+
+
+# ---------- utterance endpointing ----------
+
+class Endpointer:
+    """Energy-based speech/silence tracker over 20 ms frames"""
+
+    def __init__(self, speech_rms: float = STREAM_SPEECH_RMS, silence_ms: int = STREAM_SILENCE_MS,
+                 min_speech_ms: int = STREAM_MIN_SPEECH_MS):
+        self.speech_rms = speech_rms
+        self.silence_frames = max(silence_ms // FRAME_MS, 1)
+        self.min_speech_frames = max(min_speech_ms // FRAME_MS, 1)
+        self.reset()
+
+    def reset(self):
+        self.in_speech = False
+        self.speech_frames = 0
+        self.quiet_frames = 0
+
+    def feed(self, frame: bytes) -> str:
+        """'speech_start', 'speech', 'end' (utterance finished), or 'silence'"""
+        loud = frame_rms(frame) >= self.speech_rms
+        if loud:
+            self.quiet_frames = 0
+            self.speech_frames += 1
+            if not self.in_speech and self.speech_frames >= self.min_speech_frames:
+                self.in_speech = True
+                return 'speech_start'
+            return 'speech'
+
+        if self.in_speech:
+            self.quiet_frames += 1
+            if self.quiet_frames >= self.silence_frames:
+                self.reset()
+                return 'end'
+            return 'speech'
+
+        self.speech_frames = 0  # a click, not speech
+        return 'silence'
+
+
+# ---------- pluggable speech-to-text / text-to-speech ----------
+
+class Transcriber:
+    """Speech-to-text for one stream. feed() may return a partial transcript."""
+
+    def start(self, parameters: dict):
+        pass
+
+    def feed(self, frame: bytes):
+        return None
+
+    def finish_utterance(self) -> str:
+        return ''
+
+
+class FixtureTranscriber(Transcriber):
+    """Replays known transcripts for recorded fixtures (one per detected utterance)
+
+    The transcripts come from the stream's customParameters (`fixture_transcripts`, a JSON
+    list), so a replay client can drive the full pipeline with real μ-law audio.
+    Partials reveal one more word every `frames_per_word` speech frames.
+    """
+
+    def __init__(self, frames_per_word: int = 10):
+        self.frames_per_word = frames_per_word
+        self.transcripts = []
+        self.index = 0
+        self.frames = 0
+
+    def start(self, parameters: dict):
+        raw = parameters.get('fixture_transcripts') or '[]'
+        self.transcripts = json.loads(raw) if isinstance(raw, str) else list(raw)
+
+    def _current(self) -> str:
+        return self.transcripts[self.index] if self.index < len(self.transcripts) else ''
+
+    def feed(self, frame: bytes):
+        self.frames += 1
+        if self.frames % self.frames_per_word:
+            return None
+        words = self._current().split()
+        return ' '.join(words[:self.frames // self.frames_per_word]) or None
+
+    def finish_utterance(self) -> str:
+        text = self._current()
+        self.index += 1
+        self.frames = 0
+        return text
+
+
+class Synthesizer(ABC):
+    """Text-to-speech returning 8 kHz μ-law audio"""
+
+    @abstractmethod
+    def synthesize(self, text: str) -> bytes:
+        ...
+
+
+class ToneSynthesizer(Synthesizer):
+    """Stand-in voice for local runs: a soft 440 Hz tone, ~150 ms per word"""
+
+    def synthesize(self, text: str) -> bytes:
+        count = int(SAMPLE_RATE * 0.15 * max(len(text.split()), 1))
+        return ulaw_encode(int(3000 * math.sin(2 * math.pi * 440 * i / SAMPLE_RATE)) for i in range(count))
+
+
+class PollySynthesizer(Synthesizer):
+    """Amazon Polly (same voice as the Gather flow); needs boto3 and AWS credentials"""
+
+    def __init__(self, voice: str = 'Joanna'):
+        import boto3  # optional dependency, only needed for this synthesizer
+        self.client = boto3.client('polly')
+        self.voice = voice
+
+    def synthesize(self, text: str) -> bytes:
+        audio = self.client.synthesize_speech(
+            Text=text, VoiceId=self.voice, OutputFormat='pcm', SampleRate=str(SAMPLE_RATE)
+        )['AudioStream'].read()
+        return ulaw_encode(array('h', audio))  # 16-bit little-endian PCM
+
+
+TRANSCRIBERS = {'fixture': FixtureTranscriber}
+SYNTHESIZERS = {'tone': ToneSynthesizer, 'polly': PollySynthesizer}
+
+
+def usable_stream_url(url: str, transcriber: str = None) -> str:
+    """`url` when calls can really be switched to the stream, else '' (stay on Gather webhooks)
+
+    The 'fixture' transcriber only replays transcripts sent by a test client - on a live call
+    the agent would never hear the caller, so it needs a real streaming speech-to-text backend.
+    """
+    transcriber = transcriber or MEDIA_TRANSCRIBER
+    if url and transcriber == 'fixture':
+        print("⚠️ MEDIA_STREAM_URL ignored: MEDIA_TRANSCRIBER is 'fixture', which can't hear live callers - "
+              "set it to a streaming speech-to-text Transcriber (package.module:ClassName)")
+        return ''
+    return url
+
+
+def load_component(spec: str, registry: dict):
+    """Registry name ('tone') or 'package.module:ClassName' for a custom provider"""
+    if spec in registry:
+        return registry[spec]()
+    module_name, _, class_name = spec.partition(':')
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+# ---------- the stream ----------
+
+_stats_lock = threading.Lock()
+_stream_counts = {'streams': 0, 'active': 0, 'utterances': 0, 'barge_ins': 0,
+                  'reply_ms_total': 0.0, 'replies': 0}
+
+
+def stream_stats() -> dict:
+    with _stats_lock:
+        counts = dict(_stream_counts)
+    replies = counts.pop('replies')
+    total = counts.pop('reply_ms_total')
+    counts['avg_reply_ms'] = round(total / replies, 1) if replies else 0.0
+    return counts
+
+
+def _count(key: str, amount=1):
+    with _stats_lock:
+        _stream_counts[key] += amount
+
+
+class MediaStreamHandler:
+    """Runs one Twilio Media Stream WebSocket
+
+    on_partial(call_sid, text) is awaited for partial transcripts (speculative work);
+    on_utterance(call_sid, text) is awaited for each final utterance and returns the turn
+    result dict from TVSBusinessLogic.generate_response.
+    """
+
+    def __init__(self, websocket, on_utterance, on_partial=None,
+                 transcriber: Transcriber = None, synthesizer: Synthesizer = None):
+        self.websocket = websocket
+        self.on_utterance = on_utterance
+        self.on_partial = on_partial
+        self.transcriber = transcriber or load_component(MEDIA_TRANSCRIBER, TRANSCRIBERS)
+        self.synthesizer = synthesizer or load_component(MEDIA_SYNTHESIZER, SYNTHESIZERS)
+        self.endpointer = Endpointer()
+        self.stream_sid = None
+        self.call_sid = None
+        self.pending_marks = set()
+        self.replies = 0
+        self.last_partial = None
+        self.reply_task = None
+        self.hangup_mark = None  # close once this reply has finished playing
+        self.closing = False
+
+    async def run(self):
+        await self.websocket.accept()
+        _count('streams')
+        _count('active')
+        try:
+            while not self.closing:
+                message = json.loads(await self.websocket.receive_text())
+                await self.handle(message)
+        except Exception as e:
+            if type(e).__name__ != 'WebSocketDisconnect':
+                print(f"⚠️ Media stream error ({self.call_sid}): {e}")
+        finally:
+            if self.reply_task is not None and not self.reply_task.done():
+                self.reply_task.cancel()
+            try:
+                await self.websocket.close()
+            except Exception:
+                pass  # Twilio already hung up
+            _count('active', -1)
+            print(f"🔌 Media stream closed: {self.call_sid}")
+
+    async def handle(self, message: dict):
+        event = message.get('event')
+
+        if event == 'start':
+            start = message['start']
+            self.stream_sid = start.get('streamSid') or message.get('streamSid')
+            self.call_sid = start.get('callSid')
+            self.transcriber.start(start.get('customParameters') or {})
+            print(f"🎧 Media stream started: {self.call_sid}")
+
+        elif event == 'media':
+            if message['media'].get('track', 'inbound') != 'inbound':
+                return
+            frame = base64.b64decode(message['media']['payload'])
+            await self.handle_frame(frame)
+
+        elif event == 'mark':
+            name = message.get('mark', {}).get('name')
+            self.pending_marks.discard(name)
+            if name is not None and name == self.hangup_mark:
+                self.closing = True  # goodbye played - Twilio continues with the TwiML after <Connect>
+
+        elif event == 'stop':
+            self.closing = True
+
+    async def handle_frame(self, frame: bytes):
+        state = self.endpointer.feed(frame)
+
+        if state == 'speech_start' and self.pending_marks:
+            # Caller talked over the reply - stop playback (barge-in)
+            await self.send({'event': 'clear', 'streamSid': self.stream_sid})
+            self.pending_marks.clear()
+            _count('barge_ins')
+
+        if state in ('speech_start', 'speech'):
+            partial = self.transcriber.feed(frame)
+            if partial and partial != self.last_partial and self.on_partial is not None:
+                self.last_partial = partial
+                await self.on_partial(self.call_sid, partial)
+
+        elif state == 'end':
+            text = self.transcriber.finish_utterance()
+            self.last_partial = None
+            if text:
+                _count('utterances')
+                # Keep reading frames while the turn runs, so barge-in and marks still work
+                self.reply_task = asyncio.create_task(self.reply(text))
+
+    async def reply(self, text: str):
+        """Runs as its own task - nothing awaits it, so failures are handled here"""
+        started = time.perf_counter()
+        try:
+            turn = await self.on_utterance(self.call_sid, text)
+        except Exception as e:
+            print(f"❌ Media stream turn failed ({self.call_sid}): {e}")
+            turn = {'message': REPLY_ON_ERROR, 'end_call': False}
+
+        try:
+            await self.speak(turn, started)
+        except Exception as e:
+            print(f"❌ Media stream reply failed ({self.call_sid}): {e}")
+
+    async def speak(self, turn: dict, started: float):
+        audio = await asyncio.get_running_loop().run_in_executor(None, self.synthesizer.synthesize, turn['message'])
+        self.replies += 1
+        mark = f"reply-{self.replies}"
+        for offset in range(0, len(audio), FRAME_BYTES):
+            await self.send({
+                'event': 'media',
+                'streamSid': self.stream_sid,
+                'media': {'payload': base64.b64encode(audio[offset:offset + FRAME_BYTES]).decode('ascii')}
+            })
+            if offset == 0:
+                _count('replies')
+                _count('reply_ms_total', (time.perf_counter() - started) * 1000)
+        await self.send({'event': 'mark', 'streamSid': self.stream_sid, 'mark': {'name': mark}})
+        self.pending_marks.add(mark)
+
+        if turn.get('end_call'):
+            self.hangup_mark = mark
+
+    async def send(self, message: dict):
+        if self.closing:
+            return  # the stream is going away - the caller won't hear it
+        try:
+            await self.websocket.send_text(json.dumps(message))
+        except Exception:
+            self.closing = True
+
+
+# ---------- local fixtures + replay client ----------
+
+def make_fixture(path: str, words_per_utterance: list, seed: int = 7):
+    """Synthetic caller audio: a noisy 'speech' burst per utterance (~300 ms a word), then silence"""
+
+    rng = random.Random(seed)
+    samples = [int(rng.gauss(0, 40)) for _ in range(SAMPLE_RATE // 2)]
+    for words in words_per_utterance:
+        for i in range(int(SAMPLE_RATE * 0.3 * words)):
+            envelope = 0.6 + 0.4 * math.sin(2 * math.pi * 4 * i / SAMPLE_RATE)
+            samples.append(int(rng.gauss(0, 4000) * envelope))
+        samples.extend(int(rng.gauss(0, 40)) for _ in range(int(SAMPLE_RATE * 1.5)))
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(ulaw_encode(max(-32768, min(32767, s)) for s in samples))
+    print(f"✅ Wrote {len(samples) / SAMPLE_RATE:.1f}s fixture with {len(words_per_utterance)} utterances to {path}")
+
+
+async def replay(send_text, receive_text, audio: bytes, call_sid: str, transcripts: list = None,
+                 realtime: bool = True) -> dict:
+    """Play a μ-law recording into a media stream the way Twilio does; returns what came back
+
+    send_text/receive_text are the WebSocket's coroutine functions, so this works with the
+    `websockets` client as well as Starlette's TestClient.
+    """
+
+    stream_sid = f"MZ{call_sid}"
+    received = {'media_frames': 0, 'marks': [], 'clears': 0, 'first_audio_after_s': []}
+    started = time.perf_counter()
+    utterance_end = {'at': None}
+
+    async def reader():
+        while True:
+            try:
+                message = json.loads(await receive_text())
+            except Exception:  # the server closed the stream (hangup after the goodbye)
+                return
+            if message['event'] == 'media':
+                received['media_frames'] += 1
+                if utterance_end['at'] is not None:
+                    received['first_audio_after_s'].append(round(time.perf_counter() - utterance_end['at'], 3))
+                    utterance_end['at'] = None
+            elif message['event'] == 'mark':
+                received['marks'].append(message['mark']['name'])
+                await send_text(json.dumps({'event': 'mark', 'streamSid': stream_sid, 'mark': message['mark']}))
+            elif message['event'] == 'clear':
+                received['clears'] += 1
+
+    await send_text(json.dumps({'event': 'connected', 'protocol': 'Call', 'version': '1.0.0'}))
+    await send_text(json.dumps({
+        'event': 'start',
+        'streamSid': stream_sid,
+        'start': {
+            'streamSid': stream_sid,
+            'callSid': call_sid,
+            'tracks': ['inbound'],
+            'mediaFormat': {'encoding': 'audio/x-mulaw', 'sampleRate': SAMPLE_RATE, 'channels': 1},
+            'customParameters': {'fixture_transcripts': json.dumps(transcripts or [])}
+        }
+    }))
+
+    reader_task = asyncio.create_task(reader())
+    endpointer = Endpointer()
+    try:
+        for chunk, offset in enumerate(range(0, len(audio), FRAME_BYTES)):
+            if reader_task.done():
+                break
+            frame = audio[offset:offset + FRAME_BYTES]
+            if endpointer.feed(frame) == 'end':
+                utterance_end['at'] = time.perf_counter()
+            await send_text(json.dumps({
+                'event': 'media',
+                'streamSid': stream_sid,
+                'media': {'track': 'inbound', 'chunk': str(chunk + 1), 'timestamp': str(chunk * FRAME_MS),
+                          'payload': base64.b64encode(frame).decode('ascii')}
+            }))
+            await asyncio.sleep(FRAME_MS / 1000 if realtime else 0)
+        await asyncio.sleep(0.5)
+        if not reader_task.done():
+            await send_text(json.dumps({'event': 'stop', 'streamSid': stream_sid, 'stop': {'callSid': call_sid}}))
+    finally:
+        reader_task.cancel()
+
+    received['seconds'] = round(time.perf_counter() - started, 2)
+    return received
+
+
+async def _replay_over_websocket(url: str, path: str, call_sid: str, transcripts: list, realtime: bool):
+    import websockets  # optional dependency for the CLI client
+
+    with open(path, 'rb') as f:
+        audio = f.read()
+    async with websockets.connect(url) as ws:
+        result = await replay(ws.send, ws.recv, audio, call_sid, transcripts, realtime)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Media Streams fixtures and replay client")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    fixture_parser = subparsers.add_parser("make-fixture", help="write synthetic μ-law caller audio")
+    fixture_parser.add_argument("path")
+    fixture_parser.add_argument("--words", type=int, nargs="+", default=[4, 3], help="words per utterance")
+
+    replay_parser = subparsers.add_parser("replay", help="stream a μ-law file to a running server")
+    replay_parser.add_argument("path")
+    replay_parser.add_argument("--url", default="ws://localhost:8000/media-stream")
+    replay_parser.add_argument("--call-sid", required=True, help="a call that already has a phone number")
+    replay_parser.add_argument("--transcripts", nargs="*", default=[], help="for the fixture transcriber")
+    replay_parser.add_argument("--fast", action="store_true", help="don't pace frames in real time")
+
+    args = parser.parse_args()
+
+    if args.command == "make-fixture":
+        make_fixture(args.path, args.words)
+    elif args.command == "replay":
+        asyncio.run(_replay_over_websocket(args.url, args.path, args.call_sid, args.transcripts, not args.fast))
@@ -0,0 +1,219 @@
+"""
+Prometheus metrics for the voice agent
+Counters, gauges and fixed-bucket histograms kept in memory and rendered in the Prometheus
+text format by /metrics. Every metric has a bounded label set, so a scrape costs the same
+no matter how many calls are active or have been handled. No caller data goes into labels.
+"""
+
+import os
+import threading
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# How stale a callback gauge may be (session store size is a query on the sqlite/redis backends)
+METRICS_GAUGE_MAX_AGE = float(os.getenv("METRICS_GAUGE_MAX_AGE", "15"))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, '')) for name in self.label_names)
+
+    def render(self) -> list:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> list:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        super().__init__(name, help_text, labels)
+        self._values = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> list:
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in values]
+
+
+class Gauge(_Metric):
+    """Set directly, or read from `callback` at most every METRICS_GAUGE_MAX_AGE seconds"""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, help_text: str, callback=None, max_age: float = METRICS_GAUGE_MAX_AGE):
+        super().__init__(name, help_text)
+        self.callback = callback
+        self.max_age = max_age
+        self._value = 0
+        self._read_at = None
+
+    def set(self, value: float):
+        with self._lock:
+            self._value = value
+
+    def _samples(self) -> list:
+        if self.callback is not None:
+            now = time.monotonic()
+            if self._read_at is None or now - self._read_at >= self.max_age:
+                try:
+                    self.set(self.callback())
+                except Exception as e:
+                    print(f"⚠️ Metric {self.name} unavailable: {e}")
+                self._read_at = now
+        return [f"{self.name} {_format_value(self._value)}"]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._series = {}  # labels -> [per-bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+    def _samples(self) -> list:
+        with self._lock:
+            series = [(key, list(values)) for key, values in self._series.items()]
+
+        lines = []
+        for key, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(values[-2])}")
+            lines.append(f"{self.name}_count{labels} {values[-1]}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'started')
+
+    def __init__(self, histogram: Histogram, labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric: _Metric):
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+# ---------- the agent's metrics ----------
+
+TURNS = Counter('voice_turns_total', 'Caller turns answered, by the intent acted on', ('intent',))
+INTENT_RESOLUTIONS = Counter(
+    'voice_intent_resolutions_total',
+    'How each turn\'s intent was decided (keyword, ngram, ai_cache, llm, llm_default)', ('path',)
+)
+LLM_SECONDS = Histogram('voice_llm_request_seconds', 'OpenAI intent fallback latency', ('outcome',))
+DB_QUERY_SECONDS = Histogram('voice_db_query_seconds', 'TVSBTOAgent query latency', ('method',))
+ESCALATIONS = Counter('voice_escalations_total', 'Escalations queued, by type', ('type',))
+GATHERS = Counter('voice_gathers_total', 'Gather results by stage and outcome (reprompt/no_input = asked again)',
+                  ('stage', 'outcome'))
+WEBHOOK_SECONDS = Histogram('voice_webhook_seconds', 'End-to-end webhook latency', ('route', 'status'))
+SPECULATIONS = Counter('voice_speculations_total', 'Answers started from partial speech results, by result',
+                       ('result',))
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request by route template (unknown paths -> 'other')"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status = {'code': 500}
+
+        async def send_with_status(message):
+            if message['type'] == 'http.response.start':
+                status['code'] = message['status']
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get('route')
+            WEBHOOK_SECONDS.observe(time.perf_counter() - started,
+                                    route=getattr(route, 'path', 'other'), status=status['code'])
@@ -0,0 +1,317 @@
+"""
+Offline intent classifier for utterances the keyword pass can't place
+Character n-gram TF-IDF + nearest centroid, trained from stored call transcripts.
+Runs in-process in well under a millisecond; below NGRAM_MIN_CONFIDENCE the caller
+falls back to the LLM.
+
+Usage:
+    python ngram_classifier.py train [--out models/intent_ngram.json] [--holdout 0.2]
+    python ngram_classifier.py report [--model models/intent_ngram.json]
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import statistics
+import time
+from collections import Counter
+from datetime import datetime
+from dotenv import load_dotenv
+
+from intent_classifier import classifier as keyword_classifier, normalize_utterance
+
+load_dotenv()
+
+NGRAM_MODEL_PATH = os.getenv("NGRAM_MODEL_PATH", "models/intent_ngram.json")
+NGRAM_MIN_CONFIDENCE = float(os.getenv("NGRAM_MIN_CONFIDENCE", "0.15"))
+
+# Same label set the LLM fallback answers with
+LABELS = ('cancellation', 'delivery', 'status')
+
+# Resolution paths (see business_logic.classify_intent) whose intent is a real label;
+# ai_cache is a stored LLM answer for the same normalized utterance
+TRAINING_SOURCES = ('keyword', 'llm', 'ai_cache')
+
+NGRAM_RANGE = (3, 5)
+MAX_CENTROID_FEATURES = 3000
+
+# Phrasings without any keyword, so a fresh install has something to train on
+SEED_EXAMPLES = [
+    ("I don't want the scooter anymore", 'cancellation'),
+    ("I changed my mind about buying it", 'cancellation'),
+    ("please stop my order", 'cancellation'),
+    ("I want my money back", 'cancellation'),
+    ("can I get the booking amount returned", 'cancellation'),
+    ("I won't be taking the vehicle", 'cancellation'),
+    ("how many more days", 'delivery'),
+    ("how long do I have to wait", 'delivery'),
+    ("can I pick it up this week", 'delivery'),
+    ("is it coming to the showroom soon", 'delivery'),
+    ("expected date please", 'delivery'),
+    ("by which date will I get it", 'delivery'),
+    ("what's happening with my order", 'status'),
+    ("my booking", 'status'),
+    ("I have a question about my order", 'status'),
+    ("is my scooter ready", 'status'),
+    ("has it been manufactured yet", 'status'),
+    ("any news on my booking", 'status'),
+]
+
+
+def _features(text: str) -> Counter:
+    """Character n-grams of the normalized utterance, padded so word edges count"""
+    padded = f" {normalize_utterance(text)} "
+    low, high = NGRAM_RANGE
+    return Counter(
+        padded[i:i + n]
+        for n in range(low, high + 1)
+        for i in range(len(padded) - n + 1)
+    )
+
+
+def _l2_normalize(vector: dict) -> dict:
+    norm = math.sqrt(sum(w * w for w in vector.values()))
+    return {k: w / norm for k, w in vector.items()} if norm else vector
+
+
+class NgramIntentClassifier:
+    """TF-IDF weighted char n-grams, one L2-normalized centroid per intent"""
+
+    def __init__(self, idf: dict = None, centroids: dict = None, meta: dict = None):
+        self.idf = idf or {}
+        self.centroids = centroids or {}
+        self.meta = meta or {}
+
+    def _vectorize(self, text: str) -> dict:
+        idf = self.idf
+        return _l2_normalize({
+            gram: (1 + math.log(count)) * idf[gram]
+            for gram, count in _features(text).items()
+            if gram in idf
+        })
+
+    def fit(self, examples: list) -> "NgramIntentClassifier":
+        """Train on (utterance, intent) pairs"""
+
+        grams = [(_features(text), intent) for text, intent in examples]
+        df = Counter(gram for features, _ in grams for gram in features)
+        total = len(grams)
+        self.idf = {gram: math.log((1 + total) / (1 + count)) + 1 for gram, count in df.items()}
+
+        sums, counts = {}, Counter()
+        for features, intent in grams:
+            vector = _l2_normalize({gram: (1 + math.log(c)) * self.idf[gram] for gram, c in features.items()})
+            centroid = sums.setdefault(intent, {})
+            for gram, weight in vector.items():
+                centroid[gram] = centroid.get(gram, 0.0) + weight
+            counts[intent] += 1
+
+        # Keep each centroid's strongest features - smaller model, faster dot products
+        self.centroids = {}
+        for intent, centroid in sums.items():
+            top = sorted(centroid.items(), key=lambda item: item[1], reverse=True)[:MAX_CENTROID_FEATURES]
+            self.centroids[intent] = _l2_normalize(dict(top))
+        kept = {gram for centroid in self.centroids.values() for gram in centroid}
+        self.idf = {gram: weight for gram, weight in self.idf.items() if gram in kept}
+
+        self.meta = {
+            'trained_at': datetime.now().isoformat(),
+            'examples': total,
+            'per_intent': dict(counts),
+            'ngram_range': list(NGRAM_RANGE)
+        }
+        return self
+
+    def scores(self, text: str) -> dict:
+        """Cosine similarity to each intent centroid"""
+        vector = self._vectorize(text)
+        return {
+            intent: sum(weight * centroid.get(gram, 0.0) for gram, weight in vector.items())
+            for intent, centroid in self.centroids.items()
+        }
+
+    def predict(self, text: str) -> tuple:
+        """(intent, confidence) - confidence is the margin over the runner-up centroid"""
+        ranked = sorted(self.scores(text).items(), key=lambda item: item[1], reverse=True)
+        if not ranked or ranked[0][1] <= 0:
+            return None, 0.0
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        return ranked[0][0], round(ranked[0][1] - runner_up, 4)
+
+    def save(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'meta': self.meta, 'idf': self.idf, 'centroids': self.centroids}, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "NgramIntentClassifier":
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(idf=data['idf'], centroids=data['centroids'], meta=data.get('meta'))
+
+
+def load_model(path: str = None):
+    """Trained model from disk, or None if there isn't one (the LLM fallback still works)"""
+
+    path = path or NGRAM_MODEL_PATH
+    if not os.path.exists(path):
+        return None
+    try:
+        model = NgramIntentClassifier.load(path)
+        print(f"✅ Loaded n-gram intent model ({model.meta.get('examples', '?')} examples) from {path}")
+        return model
+    except (OSError, ValueError, KeyError) as e:
+        print(f"⚠️ Could not load n-gram intent model: {e}")
+        return None
+
+
+def load_training_examples(include_seed: bool = True) -> list:
+    """(utterance, intent) pairs from user turns whose intent came from a trusted source
+
+    Only keyword matches and real LLM answers count as labels - not the LLM's 'status'
+    default, nor this model's own predictions (that would just teach it its mistakes), nor
+    legacy transcripts, which only carry one intent for the whole call.
+    Duplicates (after normalization) collapse to their most common label.
+    """
+
+    from database import SessionLocal, ConversationTurn
+
+    labelled = {}
+
+    def add(text, intent):
+        key = normalize_utterance(text)
+        if key and intent in LABELS:
+            labelled.setdefault(key, Counter())[intent] += 1
+
+    db = SessionLocal()
+    try:
+        turns = (
+            db.query(ConversationTurn.content, ConversationTurn.intent)
+            .filter(ConversationTurn.role == 'user')
+            .filter(ConversationTurn.intent.in_(LABELS))
+            .filter(ConversationTurn.intent_source.in_(TRAINING_SOURCES))
+            .yield_per(1000)
+        )
+        for content, intent in turns:
+            add(content, intent)
+    finally:
+        db.close()
+
+    if include_seed:
+        for text, intent in SEED_EXAMPLES:
+            add(text, intent)
+
+    return [(text, votes.most_common(1)[0][0]) for text, votes in labelled.items()]
+
+
+def evaluate(model: NgramIntentClassifier, examples: list, thresholds=(0.0, 0.05, 0.1, 0.15, 0.2, 0.3)) -> dict:
+    """Accuracy, per-call latency and LLM deferral rate at several confidence thresholds"""
+
+    predictions, latencies = [], []
+    for text, expected in examples:
+        start = time.perf_counter()
+        intent, confidence = model.predict(text)
+        latencies.append((time.perf_counter() - start) * 1e6)
+        # Only utterances the keyword pass misses ever reach this model in production
+        slow_path = keyword_classifier.classify(text)['intent'] is None
+        predictions.append((expected, intent, confidence, slow_path))
+
+    def accuracy(rows):
+        return round(sum(1 for expected, intent, _, _ in rows if expected == intent) / len(rows), 3) if rows else None
+
+    latencies.sort()
+    slow = [row for row in predictions if row[3]]
+    per_intent = {label: accuracy([row for row in predictions if row[0] == label]) for label in LABELS}
+    return {
+        'examples': len(examples),
+        'accuracy': accuracy(predictions),
+        'keyword_miss_examples': len(slow),
+        'keyword_miss_accuracy': accuracy(slow),
+        'per_intent_accuracy': per_intent,
+        'latency_us': {
+            'mean': round(statistics.fmean(latencies), 1) if latencies else None,
+            'p50': round(latencies[len(latencies) // 2], 1) if latencies else None,
+            'p99': round(latencies[max(int(len(latencies) * 0.99) - 1, 0)], 1) if latencies else None
+        },
+        'thresholds': [
+            {
+                'min_confidence': threshold,
+                'answered_locally': round(sum(1 for row in predictions if row[2] >= threshold) / len(predictions), 3),
+                'accuracy_when_answered': accuracy([row for row in predictions if row[2] >= threshold])
+            }
+            for threshold in thresholds
+        ] if predictions else []
+    }
+
+
+def print_report(report: dict):
+    print("=" * 70)
+    print("N-GRAM INTENT MODEL REPORT")
+    print("=" * 70)
+    print(f"Examples evaluated:       {report['examples']}")
+    print(f"Accuracy:                 {report['accuracy']}")
+    print(f"Keyword-miss accuracy:    {report['keyword_miss_accuracy']} ({report['keyword_miss_examples']} examples)")
+    for label, value in report['per_intent_accuracy'].items():
+        print(f"  {label:<22}  {value}")
+    latency = report['latency_us']
+    print(f"Latency µs (mean/p50/p99): {latency['mean']} / {latency['p50']} / {latency['p99']}")
+    print("-" * 70)
+    print(f"{'min confidence':<18}{'answered locally':>20}{'accuracy':>14}")
+    for row in report['thresholds']:
+        print(f"{row['min_confidence']:<18}{row['answered_locally']:>20}{str(row['accuracy_when_answered']):>14}")
+    print("=" * 70)
+
+
+def train(out_path: str, holdout: float = 0.2, seed: int = 7) -> dict:
+    examples = load_training_examples()
+    if len({intent for _, intent in examples}) < 2:
+        print("❌ Need labelled examples for at least two intents")
+        return {}
+
+    rng = random.Random(seed)
+    rng.shuffle(examples)
+    split = int(len(examples) * (1 - holdout))
+    train_set, test_set = examples[:split], examples[split:]
+
+    report = {}
+    if test_set:
+        report = evaluate(NgramIntentClassifier().fit(train_set), test_set)
+        print(f"Held-out evaluation ({len(train_set)} train / {len(test_set)} test):")
+        print_report(report)
+
+    # Ship a model trained on everything we have
+    model = NgramIntentClassifier().fit(examples)
+    model.save(out_path)
+    print(f"✅ Saved n-gram intent model ({len(examples)} examples) to {out_path}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train / evaluate the offline intent classifier")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = subparsers.add_parser("train", help="train from stored transcripts and save the model")
+    train_parser.add_argument("--out", default=NGRAM_MODEL_PATH)
+    train_parser.add_argument("--holdout", type=float, default=0.2, help="fraction held out for the report")
+    train_parser.add_argument("--seed", type=int, default=7)
+
+    report_parser = subparsers.add_parser("report", help="accuracy/latency of a saved model on stored transcripts")
+    report_parser.add_argument("--model", default=NGRAM_MODEL_PATH)
+
+    args = parser.parse_args()
+
+    if args.command == "train":
+        train(args.out, args.holdout, args.seed)
+    elif args.command == "report":
+        saved = load_model(args.model)
+        if saved is None:
+            print(f"❌ No model at {args.model} - run `python ngram_classifier.py train` first")
+        else:
+            print("(in-sample: the model was trained on these transcripts)")
+            print_report(evaluate(saved, load_training_examples()))
@@ -0,0 +1,157 @@
+"""
+Spoken phone number parser for ASR transcripts
+"nine eight double seven six five triple four one" -> +919877654441
+Tokenizes once, understands multipliers, tens/teens, Hindi numerals, "plus nine one",
+filler words and numbers given in pieces, and says how sure it is.
+"""
+
+import re
+
+NATIONAL_LENGTH = 10
+DEFAULT_COUNTRY_CODE = '91'
+MOBILE_FIRST_DIGITS = '6789'  # Indian mobile numbers start with 6-9
+
+DIGIT_WORDS = {
+    'zero': '0', 'one': '1', 'two': '2', 'three': '3', 'four': '4',
+    'five': '5', 'six': '6', 'seven': '7', 'eight': '8', 'nine': '9',
+    # Hindi (romanized, as en-IN ASR writes it)
+    'shunya': '0', 'shoonya': '0', 'sunya': '0', 'ek': '1', 'teen': '3',
+    'char': '4', 'chaar': '4', 'paanch': '5', 'panch': '5', 'chhe': '6', 'chhah': '6', 'chah': '6',
+    'saat': '7', 'aath': '8', 'aat': '8', 'nau': '9',
+    # Hindi (Devanagari)
+    'शून्य': '0', 'एक': '1', 'दो': '2', 'तीन': '3', 'चार': '4', 'पांच': '5', 'पाँच': '5',
+    'छह': '6', 'छः': '6', 'छे': '6', 'सात': '7', 'आठ': '8', 'नौ': '9',
+}
+
+# Only read as digits next to other digits ("to" in "talk to" is not a 2)
+CONTEXT_DIGIT_WORDS = {'oh': '0', 'o': '0', 'do': '2', 'to': '2', 'too': '2', 'for': '4', 'won': '1', 'ate': '8', 'tree': '3'}
+# "oh" is how people say zero and "do" is Hindi two; the rest are ASR mishearings and cost confidence
+CONFIDENT_CONTEXT_WORDS = {'oh', 'o', 'do'}
+
+TEENS = {'ten': '10', 'eleven': '11', 'twelve': '12', 'thirteen': '13', 'fourteen': '14', 'fifteen': '15',
+         'sixteen': '16', 'seventeen': '17', 'eighteen': '18', 'nineteen': '19'}
+TENS = {'twenty': '2', 'thirty': '3', 'forty': '4', 'fifty': '5', 'sixty': '6', 'seventy': '7',
+        'eighty': '8', 'ninety': '9'}
+SCALES = {'hundred': '00', 'thousand': '000'}
+
+MULTIPLIERS = {'double': 2, 'triple': 3, 'treble': 3, 'quadruple': 4, 'dabal': 2, 'tripal': 3}
+
+PLUS_WORDS = {'plus', '+'}
+
+FILLER_WORDS = {
+    'my', 'mobile', 'phone', 'number', 'no', 'is', 'its', "it's", 'it', 'the', 'a', 'and', 'um', 'umm', 'uh',
+    'er', 'hmm', 'ok', 'okay', 'yes', 'yeah', 'so', 'like', 'actually', 'sorry', 'wait', 'please', 'sir',
+    'madam', 'maam', "ma'am", 'this', 'that', 'registered', 'contact', 'cell', 'i', "i'm", 'am', 'mera', 'hai',
+    'ji', 'haan', 'country', 'code', 'then', 'digits', 'digit', 'starting', 'with', 'ends', 'last', 'remaining',
+}
+
+_DEVANAGARI_DIGITS = str.maketrans('०१२३४५६७८९', '0123456789')
+_TOKEN = re.compile(r"\+|\d+|[a-z']+|[ऀ-ॿ]+")
+
+
+def _numeric_value(token: str):
+    """Digits for a token that is a number on its own (not context-dependent)"""
+    if token.isdigit():
+        return token
+    return DIGIT_WORDS.get(token) or TEENS.get(token)
+
+
+def _is_numeric(token) -> bool:
+    return token is not None and (
+        _numeric_value(token) is not None or token in TENS or token in MULTIPLIERS or token in SCALES
+    )
+
+
+def parse_phone_number(speech: str, prefix: str = '') -> dict:
+    """Digits in an ASR transcript of a phone number
+
+    `prefix` is what earlier turns already captured when the caller gave the number in parts.
+    Returns:
+        phone       - E.164 number when a full mobile number was heard, else None
+        digits      - national digits captured so far (prefix included)
+        complete    - True when digits is a full national number
+        confidence  - 0..1, lower for mishearing guesses, stray words and odd numbers
+        country_code, guesses, unknown_words
+    """
+
+    text = (speech or '').lower().translate(_DEVANAGARI_DIGITS)
+    tokens = _TOKEN.findall(text)
+
+    digits = []
+    guesses = 0
+    unknown = []
+    plus_seen = False
+    repeat = 1
+    i = 0
+
+    def emit(value: str):
+        nonlocal repeat
+        digits.append(value[0] * repeat + value[1:])
+        repeat = 1
+
+    while i < len(tokens):
+        token = tokens[i]
+        nxt = tokens[i + 1] if i + 1 < len(tokens) else None
+        prev = tokens[i - 1] if i > 0 else None
+
+        if token in PLUS_WORDS:
+            plus_seen = plus_seen or not digits
+        elif token in MULTIPLIERS and (_is_numeric(nxt) or nxt in CONTEXT_DIGIT_WORDS):  # "double oh"
+            repeat = MULTIPLIERS[token]
+        elif token in TENS:
+            unit = DIGIT_WORDS.get(nxt) if nxt is not None else None
+            if unit and unit != '0':
+                emit(TENS[token] + unit)  # "ninety eight" -> 98
+                i += 1
+            else:
+                emit(TENS[token] + '0')
+        elif token in SCALES and digits:
+            digits.append(SCALES[token])  # "nine hundred" -> 900
+        elif _numeric_value(token) is not None:
+            emit(_numeric_value(token))
+        elif token in CONTEXT_DIGIT_WORDS and (_is_numeric(prev) or _is_numeric(nxt) or (repeat > 1)):
+            if token not in CONFIDENT_CONTEXT_WORDS:
+                guesses += 1
+            emit(CONTEXT_DIGIT_WORDS[token])
+        elif token in FILLER_WORDS or token in CONTEXT_DIGIT_WORDS:
+            pass
+        else:
+            unknown.append(token)
+        i += 1
+
+    heard = ''.join(digits)
+    country_code = DEFAULT_COUNTRY_CODE
+
+    # Country code / trunk prefix: "+91 98...", "91 98..." (12 digits) or "0 98..." (11 digits)
+    if plus_seen and len(heard) > NATIONAL_LENGTH:
+        country_code, heard = heard[:-NATIONAL_LENGTH], heard[-NATIONAL_LENGTH:]
+    elif len(heard) == NATIONAL_LENGTH + 2 and heard.startswith(DEFAULT_COUNTRY_CODE):
+        heard = heard[2:]
+    elif len(heard) == NATIONAL_LENGTH + 1 and heard.startswith('0'):
+        heard = heard[1:]
+    elif plus_seen and heard.startswith(DEFAULT_COUNTRY_CODE) and not prefix:
+        heard = heard[2:]  # "plus nine one nine eight seven..." given in parts
+
+    # Continue a number given in parts - unless the caller clearly started over
+    national = heard
+    if prefix and len(heard) < NATIONAL_LENGTH:
+        national = prefix + heard
+
+    confidence = 1.0 - 0.15 * guesses - min(0.05 * len(unknown), 0.3)
+    complete = len(national) == NATIONAL_LENGTH
+    if len(national) > NATIONAL_LENGTH:
+        confidence = 0.0
+    elif national and national[0] not in MOBILE_FIRST_DIGITS:
+        confidence *= 0.5
+    if not complete:
+        confidence *= len(national) / NATIONAL_LENGTH if len(national) < NATIONAL_LENGTH else 0.0
+
+    return {
+        'phone': f"+{country_code}{national}" if complete else None,
+        'digits': national,
+        'complete': complete,
+        'confidence': round(max(confidence, 0.0), 2),
+        'country_code': country_code,
+        'guesses': guesses,
+        'unknown_words': unknown
+    }
@@ -0,0 +1,582 @@
+"""
+Call session store for the voice agent
+Replaces the unbounded `conversations` dict with idle-TTL + max-size eviction.
+
+Backends (SESSION_BACKEND):
+    memory  - in-process, fastest, single worker only (default)
+    sqlite  - shared file, lets several uvicorn workers on one host serve a call
+    redis   - any Redis-protocol server, lets several hosts serve a call
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from array import array
+from urllib.parse import urlparse, unquote
+from dotenv import load_dotenv
+
+from cache import TTLCache
+
+load_dotenv()
+
+SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", "900"))       # 15 minutes of silence
+SESSION_MAX_ACTIVE = int(os.getenv("SESSION_MAX_ACTIVE", "10000"))
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")
+SESSION_SQLITE_PATH = os.getenv("SESSION_SQLITE_PATH", "sessions.db")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# Messages kept in memory per call; the full transcript lives in conversation_turns
+HISTORY_WINDOW = int(os.getenv("HISTORY_WINDOW", "16"))
+
+ROLES = ('user', 'assistant')
+USER, ASSISTANT = 0, 1
+
+
+class CallSession:
+    """Compact per-call state; recent history is kept as a role array + text list"""
+
+    __slots__ = ('call_sid', 'caller', 'customer_phone', 'partial_phone', 'stage', 'start_time', 'last_intent',
+                 'business_intent', 'pending_gather', '_roles', '_texts', '_total')
+
+    def __init__(self, call_sid: str, caller: str, customer_phone: str = None,
+                 stage: str = 'phone_verification', start_time: float = None):
+        self.call_sid = call_sid
+        self.caller = caller
+        self.customer_phone = customer_phone
+        self.partial_phone = None  # digits heard so far when the number comes in parts
+        self.stage = stage
+        self.start_time = start_time if start_time is not None else time.time()
+        self.last_intent = None
+        self.business_intent = None  # last status/delivery/cancellation turn - what the call was about
+        self.pending_gather = None  # the Gather Twilio is running now (see GatherTuner.issued)
+        self._roles = array('B')
+        self._texts = []
+        self._total = 0
+
+    def add_message(self, role: str, content: str):
+        self._roles.append(ROLES.index(role))
+        self._texts.append(content)
+        self._total += 1
+        self._trim()
+
+    def add_turn(self, user_text: str, assistant_text: str):
+        self._roles.extend((USER, ASSISTANT))
+        self._texts.extend((user_text, assistant_text))
+        self._total += 2
+        self._trim()
+
+    def _trim(self):
+        overflow = len(self._texts) - HISTORY_WINDOW
+        if HISTORY_WINDOW > 0 and overflow > 0:
+            del self._roles[:overflow]
+            del self._texts[:overflow]
+
+    def history_messages(self) -> list:
+        """History in the {"role", "content"} shape business logic expects"""
+        return [{"role": ROLES[r], "content": t} for r, t in zip(self._roles, self._texts)]
+
+    @property
+    def message_count(self) -> int:
+        """Messages exchanged over the whole call, including trimmed ones"""
+        return self._total
+
+    def duration_seconds(self) -> int:
+        return int(time.time() - self.start_time)
+
+    def to_json(self) -> str:
+        return json.dumps({
+            'call_sid': self.call_sid,
+            'caller': self.caller,
+            'customer_phone': self.customer_phone,
+            'partial_phone': self.partial_phone,
+            'stage': self.stage,
+            'start_time': self.start_time,
+            'last_intent': self.last_intent,
+            'business_intent': self.business_intent,
+            'pending_gather': self.pending_gather,
+            'roles': self._roles.tolist(),
+            'texts': self._texts,
+            'total': self._total
+        }, separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, data) -> 'CallSession':
+        fields = json.loads(data)
+        session = cls(fields['call_sid'], fields['caller'], fields.get('customer_phone'),
+                      fields.get('stage', 'phone_verification'), fields.get('start_time'))
+        session.last_intent = fields.get('last_intent')
+        session.business_intent = fields.get('business_intent')
+        session.partial_phone = fields.get('partial_phone')
+        session.pending_gather = fields.get('pending_gather')
+        session._roles = array('B', fields.get('roles', []))
+        session._texts = fields.get('texts', [])
+        session._total = fields.get('total', len(session._texts))
+        return session
+
+
+class SessionStore:
+    """Active call sessions with idle expiry and LRU eviction"""
+
+    blocking = False  # plain memory access - safe to call on the event loop
+
+    def __init__(self, idle_ttl: float = SESSION_IDLE_TTL, max_sessions: int = SESSION_MAX_ACTIVE):
+        self._sessions = TTLCache(maxsize=max_sessions, ttl=idle_ttl, refresh_on_access=True)
+        self._partials = TTLCache(maxsize=max_sessions, ttl=idle_ttl)
+        self._partials_lock = threading.Lock()
+
+    def create(self, call_sid: str, caller: str) -> CallSession:
+        session = CallSession(call_sid, caller)
+        self._sessions.set(call_sid, session)
+        return session
+
+    def get(self, call_sid: str) -> CallSession:
+        if not call_sid:
+            return None
+        return self._sessions.get(call_sid)
+
+    def save(self, session: CallSession):
+        """Persist changes (a no-op refresh for the in-process store)"""
+        self._sessions.set(session.call_sid, session)
+
+    def delete(self, call_sid: str) -> bool:
+        self._partials.invalidate(call_sid)
+        return self._sessions.invalidate(call_sid)
+
+    def record_partial(self, call_sid: str, gather_id: str, at: float):
+        """A partial result for this Gather arrived - kept apart from the session so it never rewrites it"""
+        with self._partials_lock:
+            entry = self._partials.get(call_sid)
+            first = entry[0] if entry is not None and entry[2] == gather_id else at
+            self._partials.set(call_sid, (first, at, gather_id))
+
+    def take_partials(self, call_sid: str, gather_id: str):
+        """(first, last) partial-result times for this Gather, or None - and forget them"""
+        with self._partials_lock:
+            entry = self._partials.get(call_sid)
+            self._partials.invalidate(call_sid)
+        return entry[:2] if entry is not None and entry[2] == gather_id else None
+
+    def sessions(self) -> list:
+        return [session for _, session in self._sessions.items()]
+
+    def purge_expired(self) -> int:
+        return self._sessions.purge_expired()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def stats(self) -> dict:
+        stats = self._sessions.stats()
+        stats['backend'] = 'memory'
+        return stats
+
+
+class SQLiteSessionStore:
+    """Sessions in a shared SQLite file (WAL), visible to every worker on the host"""
+
+    blocking = True  # file I/O - callers on the event loop should use an executor
+
+    def __init__(self, path: str = SESSION_SQLITE_PATH, idle_ttl: float = SESSION_IDLE_TTL,
+                 max_sessions: int = SESSION_MAX_ACTIVE):
+        self.path = path
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self.evictions = 0
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS call_sessions (
+                    call_sid TEXT PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_call_sessions_updated ON call_sessions (updated_at)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS call_partials (
+                    call_sid TEXT NOT NULL,
+                    gather_id TEXT NOT NULL,
+                    first_at REAL NOT NULL,
+                    last_at REAL NOT NULL,
+                    PRIMARY KEY (call_sid, gather_id)
+                )
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def create(self, call_sid: str, caller: str) -> CallSession:
+        session = CallSession(call_sid, caller)
+        self.save(session)
+        self._evict_overflow()
+        return session
+
+    def get(self, call_sid: str) -> CallSession:
+        if not call_sid:
+            return None
+        now = time.time()
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT data FROM call_sessions WHERE call_sid = ? AND expires_at > ?", (call_sid, now)
+        ).fetchone()
+        if row is None:
+            return None
+        conn.execute(
+            "UPDATE call_sessions SET expires_at = ?, updated_at = ? WHERE call_sid = ?",
+            (now + self.idle_ttl, now, call_sid)
+        )
+        return CallSession.from_json(row[0])
+
+    def save(self, session: CallSession):
+        now = time.time()
+        self._connect().execute(
+            """INSERT INTO call_sessions (call_sid, data, expires_at, updated_at) VALUES (?, ?, ?, ?)
+               ON CONFLICT(call_sid) DO UPDATE SET data = excluded.data,
+                   expires_at = excluded.expires_at, updated_at = excluded.updated_at""",
+            (session.call_sid, session.to_json(), now + self.idle_ttl, now)
+        )
+
+    def delete(self, call_sid: str) -> bool:
+        conn = self._connect()
+        conn.execute("DELETE FROM call_partials WHERE call_sid = ?", (call_sid,))
+        cursor = conn.execute("DELETE FROM call_sessions WHERE call_sid = ?", (call_sid,))
+        return cursor.rowcount > 0
+
+    def record_partial(self, call_sid: str, gather_id: str, at: float):
+        """One atomic upsert - the session row is never read or rewritten here"""
+        self._connect().execute(
+            """INSERT INTO call_partials (call_sid, gather_id, first_at, last_at) VALUES (?, ?, ?, ?)
+               ON CONFLICT(call_sid, gather_id) DO UPDATE SET last_at = MAX(last_at, excluded.last_at)""",
+            (call_sid, gather_id, at, at)
+        )
+
+    def take_partials(self, call_sid: str, gather_id: str):
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT first_at, last_at FROM call_partials WHERE call_sid = ? AND gather_id = ?", (call_sid, gather_id)
+        ).fetchone()
+        conn.execute("DELETE FROM call_partials WHERE call_sid = ?", (call_sid,))  # this Gather's and any stale ones
+        return tuple(row) if row is not None else None
+
+    def sessions(self) -> list:
+        rows = self._connect().execute(
+            "SELECT data FROM call_sessions WHERE expires_at > ? ORDER BY updated_at", (time.time(),)
+        ).fetchall()
+        return [CallSession.from_json(row[0]) for row in rows]
+
+    def purge_expired(self) -> int:
+        conn = self._connect()
+        conn.execute("DELETE FROM call_partials WHERE last_at <= ?", (time.time() - self.idle_ttl,))
+        cursor = conn.execute("DELETE FROM call_sessions WHERE expires_at <= ?", (time.time(),))
+        return cursor.rowcount
+
+    def _evict_overflow(self):
+        conn = self._connect()
+        overflow = conn.execute("SELECT COUNT(*) FROM call_sessions").fetchone()[0] - self.max_sessions
+        if overflow > 0:
+            if self.purge_expired() < overflow:
+                cursor = conn.execute(
+                    """DELETE FROM call_sessions WHERE call_sid IN (
+                           SELECT call_sid FROM call_sessions ORDER BY updated_at LIMIT ?)""",
+                    (overflow,)
+                )
+                self.evictions += cursor.rowcount
+
+    def __len__(self) -> int:
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM call_sessions WHERE expires_at > ?", (time.time(),)
+        ).fetchone()[0]
+
+    def stats(self) -> dict:
+        return {
+            'backend': 'sqlite',
+            'size': len(self),
+            'maxsize': self.max_sessions,
+            'evictions': self.evictions
+        }
+
+
+class RedisProtocolError(Exception):
+    """Error reply from a Redis-protocol server"""
+
+
+class RedisClient:
+    """Minimal RESP2 client - just what the session store needs, no extra dependency"""
+
+    def __init__(self, url: str = REDIS_URL, timeout: float = 2.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or 'localhost'
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.username = unquote(parsed.username) if parsed.username else None
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self.timeout = timeout
+        self._sock = None
+        self._reader = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self._sock.makefile('rb')
+        if self.password:
+            auth = ('AUTH', self.username, self.password) if self.username else ('AUTH', self.password)
+            self._roundtrip([auth])
+        if self.db:
+            self._roundtrip([('SELECT', self.db)])
+
+    def close(self):
+        if self._sock is not None:
+            try:
+                self._reader.close()
+                self._sock.close()
+            finally:
+                self._sock = None
+                self._reader = None
+
+    @staticmethod
+    def _encode(args) -> bytes:
+        out = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            out.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        return b''.join(out)
+
+    def _read_reply(self):
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b'+':
+            return payload.decode()
+        if kind == b'-':
+            raise RedisProtocolError(payload.decode())
+        if kind == b':':
+            return int(payload)
+        if kind == b'$':
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            length = int(payload)
+            if length < 0:
+                return None
+            return [self._read_reply() for _ in range(length)]
+        raise RedisProtocolError(f"Unexpected reply: {line!r}")
+
+    def _roundtrip(self, commands: list) -> list:
+        self._sock.sendall(b''.join(self._encode(cmd) for cmd in commands))
+        return [self._read_reply() for _ in commands]
+
+    def pipeline(self, *commands) -> list:
+        """Send several commands in one write and return all replies"""
+        with self._lock:
+            for attempt in (1, 2):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    return self._roundtrip(list(commands))
+                except (ConnectionError, OSError):
+                    self.close()
+                    if attempt == 2:
+                        raise
+
+    def execute(self, *args):
+        return self.pipeline(args)[0]
+
+
+class RedisSessionStore:
+    """Sessions in a Redis-protocol server, shared by every worker and node"""
+
+    blocking = True  # socket round trips - callers on the event loop should use an executor
+
+    def __init__(self, url: str = REDIS_URL, idle_ttl: float = SESSION_IDLE_TTL,
+                 max_sessions: int = SESSION_MAX_ACTIVE, prefix: str = 'tvs:session:', client: RedisClient = None):
+        self.client = client or RedisClient(url)
+        self.idle_ttl = int(idle_ttl)
+        self.max_sessions = max_sessions
+        self.prefix = prefix
+        self.index_key = prefix + 'index'  # sorted set: call_sid -> expiry timestamp
+        self.evictions = 0
+
+    def _key(self, call_sid: str) -> str:
+        return self.prefix + call_sid
+
+    def create(self, call_sid: str, caller: str) -> CallSession:
+        session = CallSession(call_sid, caller)
+        self.save(session)
+        self._evict_overflow()
+        return session
+
+    def get(self, call_sid: str) -> CallSession:
+        if not call_sid:
+            return None
+        expires_at = time.time() + self.idle_ttl
+        data, _, _ = self.client.pipeline(
+            ('GET', self._key(call_sid)),
+            ('EXPIRE', self._key(call_sid), self.idle_ttl),
+            ('ZADD', self.index_key, 'XX', expires_at, call_sid)
+        )
+        if data is None:
+            # The key expired, but ZADD XX just pushed its index entry forward - drop it
+            self.client.execute('ZREM', self.index_key, call_sid)
+            return None
+        return CallSession.from_json(data)
+
+    def save(self, session: CallSession):
+        self.client.pipeline(
+            ('SET', self._key(session.call_sid), session.to_json(), 'EX', self.idle_ttl),
+            ('ZADD', self.index_key, time.time() + self.idle_ttl, session.call_sid)
+        )
+
+    def delete(self, call_sid: str) -> bool:
+        deleted, _ = self.client.pipeline(
+            ('DEL', self._key(call_sid)),
+            ('ZREM', self.index_key, call_sid)
+        )
+        return deleted > 0
+
+    def _partial_keys(self, call_sid: str, gather_id: str) -> tuple:
+        base = f"{self.prefix}partial:{call_sid}:{gather_id}"
+        return base + ':first', base + ':last'
+
+    def record_partial(self, call_sid: str, gather_id: str, at: float):
+        """Two keys of their own (first only if unset) - the session value is never rewritten here"""
+        first_key, last_key = self._partial_keys(call_sid, gather_id)
+        self.client.pipeline(
+            ('SET', first_key, at, 'EX', self.idle_ttl, 'NX'),
+            ('SET', last_key, at, 'EX', self.idle_ttl)
+        )
+
+    def take_partials(self, call_sid: str, gather_id: str):
+        first_key, last_key = self._partial_keys(call_sid, gather_id)
+        (first, last), _ = self.client.pipeline(
+            ('MGET', first_key, last_key),
+            ('DEL', first_key, last_key)
+        )
+        return (float(first), float(last)) if first is not None and last is not None else None
+
+    def sessions(self) -> list:
+        call_sids = self.client.execute('ZRANGEBYSCORE', self.index_key, time.time(), '+inf')
+        if not call_sids:
+            return []
+        values = self.client.execute('MGET', *(self._key(sid.decode()) for sid in call_sids))
+        return [CallSession.from_json(value) for value in values if value is not None]
+
+    def purge_expired(self) -> int:
+        # Keys expire on their own; this only trims the index
+        return self.client.execute('ZREMRANGEBYSCORE', self.index_key, '-inf', time.time())
+
+    def _evict_overflow(self):
+        overflow = self.client.execute('ZCARD', self.index_key) - self.max_sessions
+        if overflow > 0:
+            if self.purge_expired() >= overflow:
+                return
+            oldest = self.client.execute('ZRANGE', self.index_key, 0, overflow - 1)
+            if oldest:
+                self.client.pipeline(
+                    ('DEL', *(self._key(sid.decode()) for sid in oldest)),
+                    ('ZREM', self.index_key, *oldest)
+                )
+                self.evictions += len(oldest)
+
+    def __len__(self) -> int:
+        return self.client.execute('ZCOUNT', self.index_key, time.time(), '+inf')
+
+    def stats(self) -> dict:
+        return {
+            'backend': 'redis',
+            'size': len(self),
+            'maxsize': self.max_sessions,
+            'evictions': self.evictions
+        }
+
+
+def create_session_store(backend: str = None):
+    """Build the session store selected by SESSION_BACKEND"""
+
+    backend = (backend or SESSION_BACKEND).lower()
+    if backend == 'memory':
+        return SessionStore()
+    if backend == 'sqlite':
+        return SQLiteSessionStore()
+    if backend == 'redis':
+        return RedisSessionStore()
+    raise ValueError(f"Unknown SESSION_BACKEND: {backend}")
+
+
+if __name__ == "__main__":
+    # Memory benchmark: steady-state footprint under 100k simulated calls
+    import tracemalloc
+    from datetime import datetime
+
+    total_calls = 100_000
+    max_sessions = 5_000
+    turns_per_call = 4
+    abandon_every = 10  # every 10th call never sends a 'completed' status callback
+
+    def simulate(store_put, store_complete):
+        tracemalloc.start()
+        for i in range(total_calls):
+            call_sid = f"CA{i:032d}"
+            store_put(call_sid, i)
+            if i % abandon_every:
+                store_complete(call_sid)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return current, peak
+
+    def add_turns(add):
+        for t in range(turns_per_call):
+            add(f"Where is my vehicle, question {t}?",
+                "Great! Your Apache RTR 310 is dispatched and on the way. Anything else?")
+
+    # Before: unbounded dict-of-lists-of-dicts, nothing is ever deleted
+    legacy = {}
+
+    def legacy_put(call_sid, i):
+        conv = legacy[call_sid] = {
+            'caller': '+919633717592',
+            'customer_phone': '+919633717592',
+            'history': [],
+            'start_time': datetime.now().isoformat(),
+            'stage': 'asking_help'
+        }
+        add_turns(lambda u, a: conv['history'].extend(({"role": "user", "content": u},
+                                                        {"role": "assistant", "content": a})))
+
+    legacy_current, legacy_peak = simulate(legacy_put, lambda call_sid: None)
+    legacy_len = len(legacy)
+    legacy.clear()
+
+    # After: bounded store, cleaned up on 'completed'
+    store = SessionStore(max_sessions=max_sessions)
+
+    def store_put(call_sid, i):
+        session = store.create(call_sid, '+919633717592')
+        session.customer_phone = '+919633717592'
+        session.stage = 'asking_help'
+        add_turns(session.add_turn)
+
+    store_current, store_peak = simulate(store_put, store.delete)
+
+    print("=" * 60)
+    print(f"SESSION MEMORY BENCHMARK ({total_calls:,} calls, {turns_per_call} turns each)")
+    print("=" * 60)
+    print(f"Legacy dict:   {legacy_len:>7,} sessions  {legacy_current / 1e6:8.1f} MB held  (peak {legacy_peak / 1e6:.1f} MB)")
+    print(f"SessionStore:  {len(store):>7,} sessions  {store_current / 1e6:8.1f} MB held  (peak {store_peak / 1e6:.1f} MB)")
+    print(f"Evictions: {store.stats()['evictions']:,}")
+    print("=" * 60)
@@ -0,0 +1,84 @@
+"""
+Test setup - everything runs against throwaway local stand-ins, never Neon, OpenAI, Redis or Twilio.
+The environment is set here, before any app module is imported, because they read it at import.
+"""
+
+import os
+import tempfile
+import threading
+
+import pytest
+
+TEST_DIR = tempfile.mkdtemp(prefix="voice-agent-tests-")
+
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{TEST_DIR}/bto.db",
+    "SESSION_BACKEND": "memory",
+    "SESSION_SQLITE_PATH": f"{TEST_DIR}/sessions.db",
+    "WRITE_SPOOL_PATH": f"{TEST_DIR}/spool/pending_writes.jsonl",
+    "WRITE_DEAD_LETTER_PATH": f"{TEST_DIR}/spool/dead_letter.jsonl",
+    "AI_INTENT_CACHE_PATH": "",
+    "GATHER_STATS_PATH": "",
+    "NGRAM_MODEL_PATH": f"{TEST_DIR}/intent_ngram.json",
+    "TRACE_EXPORTER": "",
+    "MEDIA_STREAM_URL": "",
+    "OPENAI_API_KEY": "",
+})
+
+
+@pytest.fixture(scope="session")
+def seeded_phones():
+    """Stand-in BTO database with a few customers, plus the app's own tables"""
+
+    from benchmarks import prepare_database
+
+    phones = prepare_database(os.environ["DATABASE_URL"], customers=20)
+    from database import init_db
+    init_db()
+    return phones
+
+
+@pytest.fixture
+def call_session(seeded_phones):
+    """A call that has already given its phone number (ready for /process-speech)"""
+
+    import main
+
+    created = []
+
+    def make(index: int = 0, call_sid: str = None):
+        call_sid = call_sid or f"CA-test-{len(created)}-{index}"
+        session = main.sessions.create(call_sid, "+919800000000")
+        session.customer_phone = seeded_phones[index % len(seeded_phones)]
+        session.stage = 'asking_help'
+        main.sessions.save(session)
+        created.append(call_sid)
+        return session
+
+    yield make
+    for call_sid in created:
+        main.sessions.delete(call_sid)
+
+
+@pytest.fixture
+def logic(seeded_phones, monkeypatch):
+    """Fresh caches and counters, with the booking loads counted (and held back on request)"""
+    import main
+    from business_logic import TVSBusinessLogic
+
+    logic = TVSBusinessLogic()
+    loader = logic.agent.get_booking_snapshot
+    logic.loads = []
+    logic.entered = threading.Event()
+    logic.release = threading.Event()
+    logic.release.set()
+
+    def get_booking_snapshot(phone_number):
+        logic.loads.append(phone_number)
+        logic.entered.set()
+        logic.release.wait(5)
+        return loader(phone_number)
+
+    monkeypatch.setattr(logic.agent, "get_booking_snapshot", get_booking_snapshot)
+    monkeypatch.setattr(main, "business_logic", logic)
+    return logic
@@ -0,0 +1,174 @@
+"""
+In-process Redis stand-in for tests - a threaded RESP2 server over a real socket, implementing only
+the commands RedisSessionStore sends (strings with expiry + sorted sets), so RedisClient's wire
+protocol is exercised end to end without a Redis install.
+"""
+
+import socketserver
+import threading
+import time
+
+
+class RespError(Exception):
+    pass
+
+
+class RespStandIn(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, password: str = None, port: int = 0):
+        super().__init__(('127.0.0.1', port), _Handler)
+        self.password = password
+        self.strings = {}  # key -> (value bytes, expires_at or None)
+        self.zsets = {}    # key -> {member bytes: score}
+        self.commands = []
+        self.lock = threading.Lock()
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        auth = f":{self.password}@" if self.password else ""
+        return f"redis://{auth}127.0.0.1:{self.server_address[1]}/1"
+
+    def start(self) -> 'RespStandIn':
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    # ---------- commands ----------
+
+    def _live(self, key: bytes):
+        entry = self.strings.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.time():
+            del self.strings[key]
+            return None
+        return entry
+
+    @staticmethod
+    def _score(raw: bytes) -> float:
+        return float(raw)  # accepts '+inf' / '-inf' like Redis
+
+    def execute(self, name: str, args: list, authed: bool):
+        if name == 'AUTH':
+            if args[-1].decode() != self.password:
+                raise RespError("WRONGPASS invalid username-password pair")
+            return 'OK'
+        if self.password and not authed:
+            raise RespError("NOAUTH Authentication required.")
+        if name in ('SELECT', 'PING'):
+            return 'OK' if name == 'SELECT' else 'PONG'
+        if name == 'GET':
+            entry = self._live(args[0])
+            return entry[0] if entry else None
+        if name == 'MGET':
+            return [(self._live(key) or (None,))[0] for key in args]
+        if name == 'SET':
+            options = [arg.upper() for arg in args[2:]]
+            expires_at = time.time() + int(options[options.index(b'EX') + 1]) if b'EX' in options else None
+            if b'NX' in options and self._live(args[0]) is not None:
+                return None
+            self.strings[args[0]] = (args[1], expires_at)
+            return 'OK'
+        if name == 'EXPIRE':
+            entry = self._live(args[0])
+            if entry is None:
+                return 0
+            self.strings[args[0]] = (entry[0], time.time() + int(args[1]))
+            return 1
+        if name == 'DEL':
+            return sum(1 for key in args if self._live(key) is not None and self.strings.pop(key, None))
+        if name == 'ZADD':
+            zset = self.zsets.setdefault(args[0], {})
+            only_existing = args[1].upper() == b'XX'
+            pairs = args[2:] if only_existing else args[1:]
+            added = 0
+            for score, member in zip(pairs[::2], pairs[1::2]):
+                if only_existing and member not in zset:
+                    continue
+                added += member not in zset
+                zset[member] = self._score(score)
+            return added
+        if name == 'ZREM':
+            zset = self.zsets.get(args[0], {})
+            return sum(1 for member in args[1:] if zset.pop(member, None) is not None)
+        if name == 'ZCARD':
+            return len(self.zsets.get(args[0], {}))
+        if name in ('ZCOUNT', 'ZRANGEBYSCORE', 'ZREMRANGEBYSCORE'):
+            low, high = self._score(args[1]), self._score(args[2])
+            zset = self.zsets.get(args[0], {})
+            members = [m for m, s in sorted(zset.items(), key=lambda item: item[1]) if low <= s <= high]
+            if name == 'ZCOUNT':
+                return len(members)
+            if name == 'ZREMRANGEBYSCORE':
+                for member in members:
+                    del zset[member]
+                return len(members)
+            return members
+        if name == 'ZRANGE':
+            ordered = [m for m, _ in sorted(self.zsets.get(args[0], {}).items(), key=lambda item: item[1])]
+            start, stop = int(args[1]), int(args[2])
+            return ordered[start:stop + 1 if stop >= 0 else len(ordered) + stop + 1]
+        raise RespError(f"ERR unknown command '{name}'")
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        authed = False
+        while True:
+            command = self._read_command()
+            if command is None:
+                return
+            name = command[0].decode().upper()
+            server = self.server
+            with server.lock:
+                server.commands.append(name)
+                try:
+                    reply = server.execute(name, command[1:], authed)
+                    if name == 'AUTH':
+                        authed = True
+                except RespError as e:
+                    reply = e
+            self.wfile.write(_encode(reply))
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        count = int(line[1:-2])
+        args = []
+        for _ in range(count):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+
+def _encode(reply) -> bytes:
+    if isinstance(reply, RespError):
+        return b'-' + str(reply).encode() + b'\r\n'
+    if reply is None:
+        return b'$-1\r\n'
+    if isinstance(reply, str):
+        return b'+' + reply.encode() + b'\r\n'
+    if isinstance(reply, int):
+        return b':%d\r\n' % reply
+    if isinstance(reply, bytes):
+        return b'$%d\r\n%s\r\n' % (len(reply), reply)
+    return b'*%d\r\n' % len(reply) + b''.join(_encode(item) for item in reply)
+
+
+
+if __name__ == "__main__":
+    # Try SESSION_BACKEND=redis by hand: REDIS_URL=redis://127.0.0.1:6380/0
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Minimal in-memory Redis stand-in")
+    parser.add_argument("--port", type=int, default=6380)
+    args = parser.parse_args()
+
+    server = RespStandIn(port=args.port)
+    print(f"🧪 Redis stand-in on redis://127.0.0.1:{args.port}/0")
+    server.serve_forever()
@@ -0,0 +1,121 @@
+"""TTLCache: entries expire, the least recently used goes first, and save/load keeps both across restarts"""
+
+import json
+
+import pytest
+
+import cache
+import main
+from cache import TTLCache
+
+
+class Clock:
+    def __init__(self):
+        self.monotonic = 500.0
+        self.wall = 1_700_000_000.0
+
+    def advance(self, seconds: float):
+        self.monotonic += seconds
+        self.wall += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "monotonic", lambda: clock.monotonic)
+    monkeypatch.setattr(cache.time, "time", lambda: clock.wall)
+    return clock
+
+
+def test_entries_expire_after_their_ttl(clock):
+    entries = TTLCache(maxsize=10, ttl=60)
+    entries.set("where is it", "status")
+    entries.set("short lived", "delivery", ttl=5)
+
+    clock.advance(5)
+    assert entries.get("short lived") is None
+    clock.advance(54.9)
+    assert entries.get("where is it") == "status"  # absolute TTL - the hit doesn't extend it
+    clock.advance(0.1)
+    assert entries.get("where is it") is None
+    assert entries.stats()['expirations'] == 2
+
+
+def test_idle_ttl_is_refreshed_on_access(clock):
+    entries = TTLCache(maxsize=10, ttl=60, refresh_on_access=True)
+    entries.set("CA1", "session")
+
+    for _ in range(3):
+        clock.advance(45)
+        assert entries.get("CA1") == "session"
+    clock.advance(60)
+    assert entries.get("CA1") is None
+
+
+def test_purge_expired_drops_only_expired_entries(clock):
+    entries = TTLCache(maxsize=10, ttl=60)
+    entries.set("old", 1, ttl=10)
+    entries.set("new", 2)
+    clock.advance(10)
+
+    assert entries.purge_expired() == 1
+    assert entries.items() == [("new", 2)]
+
+
+def test_least_recently_used_is_evicted_first(clock):
+    entries = TTLCache(maxsize=3, ttl=60)
+    for key in ("a", "b", "c"):
+        entries.set(key, key.upper())
+    entries.get("a")       # a is now the most recently used
+    entries.set("b", "B2")  # so is b, after it
+
+    entries.set("d", "D")
+
+    assert entries.get("c") is None
+    assert [key for key, _ in entries.items()] == ["a", "b", "d"]
+    assert entries.stats()['evictions'] == 1
+
+
+def test_save_and_load_keep_values_order_and_remaining_ttl(clock, tmp_path):
+    path = str(tmp_path / "nested" / "ai_intents.json")
+    entries = TTLCache(maxsize=10, ttl=60)
+    entries.set("i want my money back", "cancellation")
+    entries.set("when does it come home", "delivery", ttl=20)
+    entries.set("gone already", "status", ttl=1)
+    entries.get("i want my money back")
+    clock.advance(1)
+
+    assert entries.save(path) == 2
+    clock.advance(10)  # the restart takes a while
+
+    restored = TTLCache(maxsize=10, ttl=60)
+    assert restored.load(path) == 2
+    assert restored.items() == [("when does it come home", "delivery"), ("i want my money back", "cancellation")]
+
+    clock.advance(9)
+    assert restored.get("when does it come home") is None  # 20s from when it was first set
+    assert restored.get("i want my money back") == "cancellation"
+
+
+def test_load_skips_entries_that_expired_while_saved(clock, tmp_path):
+    path = tmp_path / "ai_intents.json"
+    path.write_text(json.dumps([["stale", clock.wall - 1, "status"], ["fresh", clock.wall + 30, "delivery"]]))
+
+    restored = TTLCache(maxsize=10, ttl=60)
+
+    assert restored.load(str(path)) == 1
+    assert restored.items() == [("fresh", "delivery")]
+    assert TTLCache().load(str(tmp_path / "missing.json")) == 0
+
+
+def test_ai_intent_cache_survives_a_restart(clock, monkeypatch, tmp_path):
+    logic = main.business_logic
+    monkeypatch.setattr(logic, "ai_intent_cache", TTLCache(maxsize=10, ttl=86400))
+    monkeypatch.setattr(logic, "ai_intent_cache_path", str(tmp_path / "ai_intents.json"))
+    logic.ai_intent_cache.set("i would like my money back", "cancellation")
+
+    assert logic.save_ai_intent_cache() == 1
+
+    restarted = TTLCache(maxsize=10, ttl=86400)
+    restarted.load(logic.ai_intent_cache_path)
+    assert restarted.get("i would like my money back") == "cancellation"
@@ -0,0 +1,40 @@
+"""A whole scripted call through the webhooks, checked against what ends up in the database"""
+
+import asyncio
+import uuid
+
+import httpx
+from sqlalchemy import text
+
+import main
+
+
+async def scripted_call(call_sid: str, phone: str, utterances: list):
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.post("/voice", data={"CallSid": call_sid, "From": phone})
+        await client.post("/get-phone-number", data={"CallSid": call_sid, "SpeechResult": ' '.join(phone[-10:])})
+        for utterance in utterances:
+            response = await client.post("/process-speech", data={"CallSid": call_sid, "SpeechResult": utterance})
+            assert response.status_code == 200
+        await client.post("/call-status", data={"CallSid": call_sid, "CallStatus": "completed"})
+
+
+def test_call_is_logged_with_its_business_intent_not_the_goodbye(seeded_phones):
+    from database import SessionLocal
+
+    call_sid = f"CA-{uuid.uuid4().hex[:8]}"
+    asyncio.run(scripted_call(call_sid, seeded_phones[1], ["where is my bike", "thanks bye"]))
+
+    db = SessionLocal()
+    try:
+        call_logs = db.execute(text("SELECT intent, outcome FROM call_logs WHERE call_id = :sid"), {'sid': call_sid}).all()
+        header = db.execute(text("SELECT intent FROM conversations WHERE call_sid = :sid"), {'sid': call_sid}).all()
+        turns = db.execute(text("SELECT intent FROM conversation_turns WHERE call_sid = :sid AND role = 'user' "
+                                "ORDER BY turn_index"), {'sid': call_sid}).all()
+    finally:
+        db.close()
+
+    assert [tuple(row) for row in call_logs] == [('status', 'completed')]
+    assert [tuple(row) for row in header] == [('status',)]
+    assert [row[0] for row in turns] == ['status', 'end_call']  # each turn still keeps its own intent
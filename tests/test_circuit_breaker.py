@@ -0,0 +1,143 @@
+"""The LLM circuit breaker trips, cools down and probes; the intent fallback respects it and the turn budget"""
+
+import time
+from types import SimpleNamespace
+
+import openai
+import pytest
+
+import circuit_breaker
+import main
+from cache import TTLCache
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", clock)
+    return clock
+
+
+def tripped(clock, threshold: int = 3, reset_timeout: float = 30.0) -> CircuitBreaker:
+    breaker = CircuitBreaker("llm", failure_threshold=threshold, slow_call_seconds=1.0, reset_timeout=reset_timeout)
+    for _ in range(threshold):
+        assert breaker.allow_request()
+        breaker.record_failure()
+    return breaker
+
+
+def test_consecutive_failures_trip_the_breaker(clock):
+    breaker = CircuitBreaker("llm", failure_threshold=3, slow_call_seconds=1.0)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success(0.1)  # a success resets the run
+    breaker.record_failure()
+    breaker.record_success(1.2)  # too slow - counts as a failure
+    assert breaker.state == CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+    assert breaker.stats()['rejected'] == 1
+    assert breaker.stats()['slow_calls'] == 1
+
+
+def test_cooldown_lets_one_probe_through(clock):
+    breaker = tripped(clock)
+
+    clock.now += 29.9
+    assert not breaker.allow_request()
+    clock.now += 0.2
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow_request()  # one probe at a time
+
+
+def test_half_open_success_closes(clock):
+    breaker = tripped(clock)
+    clock.now += 30
+    assert breaker.allow_request()
+
+    breaker.record_success(0.1)
+
+    assert breaker.state == CLOSED
+    assert breaker.allow_request() and breaker.allow_request()
+
+
+def test_half_open_failure_reopens_for_another_cooldown(clock):
+    breaker = tripped(clock)
+    clock.now += 30
+    assert breaker.allow_request()
+
+    breaker.record_failure()
+
+    assert breaker.state == OPEN
+    assert breaker.stats()['opened'] == 2
+    assert not breaker.allow_request()
+    clock.now += 30
+    assert breaker.allow_request()
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    """The business logic with a fresh breaker and cache, and a stand-in OpenAI client"""
+    calls = []
+
+    class ChatCompletion:
+        reply = "delivery"
+        error = None
+
+        @classmethod
+        def create(cls, **kwargs):
+            calls.append(kwargs)
+            if cls.error is not None:
+                raise cls.error
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=cls.reply))])
+
+    logic = main.business_logic
+    monkeypatch.setattr(openai, "ChatCompletion", ChatCompletion)
+    monkeypatch.setattr(logic, "ai_intent_cache", TTLCache(maxsize=16, ttl=60))
+    monkeypatch.setattr(logic, "llm_breaker", CircuitBreaker("openai", failure_threshold=2, reset_timeout=30))
+    return SimpleNamespace(logic=logic, calls=calls, client=ChatCompletion)
+
+
+def test_open_breaker_skips_the_llm(llm):
+    llm.client.error = TimeoutError("Request timed out")
+    for utterance in ("the thing about the", "hmm my thing"):
+        timings = {}
+        assert llm.logic._classify_with_ai(utterance, timings=timings) == 'status'
+        assert (timings['llm_outcome'], timings['resolution']) == ('error', 'llm_default')
+    assert llm.logic.llm_breaker.state == OPEN
+
+    timings = {}
+    assert llm.logic._classify_with_ai("something else entirely", timings=timings) == 'status'
+    assert timings == {'llm_outcome': 'breaker_open', 'resolution': 'llm_default'}
+    assert len(llm.calls) == 2
+
+
+def test_exhausted_turn_budget_skips_the_llm(llm):
+    timings = {}
+    deadline = time.perf_counter() + 0.05  # less than the minimum LLM timeout is left of the turn
+
+    assert llm.logic._classify_with_ai("the thing about the", deadline=deadline, timings=timings) == 'status'
+    assert timings == {'llm_outcome': 'no_budget', 'resolution': 'llm_default'}
+    assert llm.calls == []
+
+
+def test_llm_timeout_is_capped_by_the_turn_budget(llm):
+    timings = {}
+    deadline = time.perf_counter() + 1.5
+
+    assert llm.logic._classify_with_ai("when does it come home", deadline=deadline, timings=timings) == 'delivery'
+    assert timings['resolution'] == 'llm' and timings['llm_outcome'] == 'ok'
+    assert llm.calls[0]['request_timeout'] < 1.5
+    assert llm.logic.ai_intent_cache.get("when does it come home") == 'delivery'
@@ -0,0 +1,17 @@
+"""Generated cancellations carry the fees the agent would quote for the order's stage"""
+
+import pytest
+
+from bto_schema import ORDER_STATUSES
+from data_generator import cancellation_fee_pct
+from langchain_agent import TVSBTOAgent
+
+
+@pytest.mark.parametrize("status_index, status", list(enumerate(ORDER_STATUSES)))
+def test_fee_matches_the_agents_quote(status_index, status):
+    quoted = TVSBTOAgent()._build_cancellation_info("BTO1", status, 0)['fee_pct']
+    assert cancellation_fee_pct(status_index) == quoted
+
+
+def test_every_fee_tier_is_generated():
+    assert {cancellation_fee_pct(index) for index in range(len(ORDER_STATUSES))} == {0, 25, 50, 75, 100}
@@ -0,0 +1,55 @@
+"""Concurrent /process-speech webhooks share the stage executor instead of queueing on the event loop"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+import main
+from executor import StageExecutor
+
+TURN_SECONDS = 0.4
+
+
+def slow_turn(phone_number, user_message, call_sid, conversation_history):
+    time.sleep(TURN_SECONDS)  # stands in for a Neon query + OpenAI call
+    return {"message": "Your Apache is at the dealership.", "intent": "status", "escalated": False,
+            "end_call": False, "data": None, "timings": {}}
+
+
+async def post_turns(call_sids: list) -> tuple:
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        started = time.perf_counter()
+        responses = await asyncio.gather(*(
+            client.post("/process-speech", data={"CallSid": call_sid, "SpeechResult": "where is my bike"})
+            for call_sid in call_sids
+        ))
+        return responses, time.perf_counter() - started
+
+
+@pytest.fixture
+def slow_turns(monkeypatch):
+    monkeypatch.setattr(main.business_logic, "generate_response", slow_turn)
+
+
+@pytest.mark.parametrize("calls", [1, 8])
+def test_concurrent_turns_finish_in_about_one_turn(monkeypatch, slow_turns, call_session, calls):
+    monkeypatch.setattr(main, "stage_executor", StageExecutor({'turn': 16}))
+    call_sids = [call_session(i).call_sid for i in range(calls)]
+
+    responses, elapsed = asyncio.run(post_turns(call_sids))
+
+    assert all(r.status_code == 200 and "Apache is at the dealership" in r.text for r in responses)
+    assert TURN_SECONDS <= elapsed < TURN_SECONDS * 1.75, f"{calls} turns took {elapsed:.2f}s"
+
+
+def test_turns_beyond_the_stage_limit_wait_for_a_slot(monkeypatch, slow_turns, call_session):
+    monkeypatch.setattr(main, "stage_executor", StageExecutor({'turn': 2}))
+    call_sids = [call_session(i).call_sid for i in range(4)]
+
+    responses, elapsed = asyncio.run(post_turns(call_sids))
+
+    assert all(r.status_code == 200 for r in responses)
+    assert TURN_SECONDS * 2 <= elapsed < TURN_SECONDS * 2.75, f"4 turns at limit 2 took {elapsed:.2f}s"
@@ -0,0 +1,84 @@
+"""Gather outcomes come from real re-prompt signals; Gather state survives several workers"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+import main
+from gather_tuning import GatherTuner
+from session_store import SQLiteSessionStore
+
+
+def turn(intent: str, resolution: str = None) -> dict:
+    return {"message": "...", "intent": intent, "resolution": resolution, "escalated": False,
+            "end_call": False, "data": None, "timings": {}}
+
+
+@pytest.mark.parametrize("result, speech, outcome", [
+    (turn('status', 'keyword'), "where is my bike", 'answered'),
+    (turn('delivery', 'ngram'), "when does it come home", 'answered'),
+    (turn('cancellation', 'llm'), "I don't want it any more", 'answered'),
+    (turn('status', 'llm_default'), "the thing about the", 'reprompt'),   # no budget / breaker / LLM error
+    (turn('unknown'), "where is my bike", 'reprompt'),                     # turn errored, "please try again"
+    (turn('status', 'keyword'), "...?", 'reprompt'),                       # nothing parseable was heard
+])
+def test_gather_outcome(result, speech, outcome):
+    assert main.gather_outcome(result, speech) == outcome
+
+
+def record(tuner, gathers: int, reprompts: int, caller: str = "+919800000001"):
+    for index in range(gathers):
+        gather = tuner.issued('phone', {'timeout': 5, 'speech_timeout': '3'}, caller)
+        gather['first_partial'] = gather['last_partial'] = time.time()
+        tuner.completed(gather, 'reprompt' if index < reprompts else 'answered')
+
+
+def test_workers_add_their_counts_instead_of_overwriting(tmp_path):
+    path = str(tmp_path / "gather_stats.json")
+    first, second = GatherTuner(path), GatherTuner(path)
+    record(first, gathers=3, reprompts=1)
+    record(second, gathers=2, reprompts=2)
+    first.save()
+    second.save()
+    first.save()  # nothing new since its last save - must not count its three again
+
+    merged = GatherTuner(path)
+    row = merged.settings['phone']['3']
+    assert (row['gathers'], row['reprompts'], row['wait_samples']) == (5, 3, 5)
+    assert len(merged.speech_starts['phone']) == 5
+    assert merged.callers.get("+919800000001") == {'gathers': 5, 'reprompts': 3}
+
+    # Saving also brought the other worker's counts in
+    assert first.settings['phone']['3']['gathers'] == 5
+
+
+def test_pending_gather_rides_in_the_session(seeded_phones, monkeypatch, tmp_path):
+    # A store that serializes every session, as it would between workers
+    monkeypatch.setattr(main, "sessions", SQLiteSessionStore(str(tmp_path / "sessions.db")))
+    asyncio.run(_phone_gather_across_webhooks(seeded_phones[0]))
+
+
+async def _phone_gather_across_webhooks(phone: str):
+    call_sid = "CA-gather-session"
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.post("/voice", data={"CallSid": call_sid, "From": phone})
+        pending = (await main.get_session(call_sid)).pending_gather
+        assert pending['stage'] == 'phone' and pending['first_partial'] is None
+        row = main.gather_tuner.settings['phone'][pending['speech_timeout']]
+        before = (row['gathers'], row['wait_samples'])
+
+        await client.post("/partial-speech", data={"CallSid": call_sid, "UnstableSpeechResult": "nine eight"})
+        assert main.sessions.take_partials(call_sid, pending['id']) is not None
+        await client.post("/partial-speech", data={"CallSid": call_sid, "UnstableSpeechResult": "nine eight"})
+
+        await client.post("/get-phone-number", data={"CallSid": call_sid, "SpeechResult": ' '.join(phone[-10:])})
+        assert (await main.get_session(call_sid)).pending_gather['stage'] == 'question'
+
+        await client.post("/call-status", data={"CallSid": call_sid, "CallStatus": "completed"})
+
+    row = main.gather_tuner.settings['phone'][pending['speech_timeout']]
+    assert (row['gathers'], row['wait_samples']) == (before[0] + 1, before[1] + 1)
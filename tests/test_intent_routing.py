@@ -0,0 +1,61 @@
+"""The compiled classifier routes every turn the way the legacy keyword scans did"""
+
+import random
+
+import pytest
+
+import main
+from benchmarks import INTENT_CORPUS, _legacy_scans
+from intent_classifier import INTENT_KEYWORDS, PHRASE_LABELS, WHOLE_UTTERANCE_LABELS, classifier
+
+VOCABULARY = sorted({phrase for table in (INTENT_KEYWORDS, PHRASE_LABELS, WHOLE_UTTERANCE_LABELS)
+                     for phrases in table.values() for phrase in phrases}
+                    | {'my', 'the', 'is', 'it', 'please', 'apache', 'booking', 'hello', 'scooter', 'whenever'})
+
+
+def fuzz_utterances(count: int, seed: int = 11) -> list:
+    rng = random.Random(seed)
+    utterances = [rng.choice(VOCABULARY) for _ in range(count // 4)]  # bare words: "yes", "no", "bye" ...
+    while len(utterances) < count:
+        words = rng.sample(VOCABULARY, rng.randint(2, 6))
+        utterances.append(rng.choice(['', 'Um, ']) + ' '.join(words) + rng.choice(['', '.', '?']))
+    return utterances
+
+
+def legacy_route(utterance: str) -> str:
+    """What the pre-classifier generate_response did with the utterance (before any AI call)"""
+    intent, escalate, _ = _legacy_scans(utterance)
+    if any(phrase in utterance.lower() for phrase in PHRASE_LABELS['end_call']):
+        return 'end_call'
+    if escalate:
+        return 'escalation'
+    return intent or 'llm'
+
+
+def compiled_route(utterance: str) -> str:
+    classification = classifier.classify(utterance)
+    if 'end_call' in classification['labels']:
+        return 'end_call'
+    if main.business_logic.should_escalate_to_human(utterance, [], classification):
+        return 'escalation'
+    return classification['intent'] or 'llm'
+
+
+@pytest.mark.parametrize("utterance", INTENT_CORPUS + fuzz_utterances(400))
+def test_routing_matches_the_legacy_scans(utterance):
+    assert compiled_route(utterance) == legacy_route(utterance)
+
+
+@pytest.mark.parametrize("answer", ["yes", "Okay.", "no", "nope"])
+def test_bare_yes_no_is_classified_like_any_unclear_utterance(monkeypatch, answer):
+    asked = []
+
+    def classify_with_ai(user_message, deadline=None, timings=None):
+        asked.append(user_message)
+        return 'status'
+
+    monkeypatch.setattr(main.business_logic, "ngram_model", None)
+    monkeypatch.setattr(main.business_logic, "_classify_with_ai", classify_with_ai)
+
+    assert main.business_logic.classify_intent(answer) == 'status'
+    assert asked == [answer]
@@ -0,0 +1,121 @@
+"""/media-stream end to end: start -> caller speaks -> reply audio + mark -> caller talks over it -> clear -> stop"""
+
+import base64
+import json
+import random
+
+import pytest
+from starlette.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+import main
+import media_stream
+from media_stream import FRAME_BYTES, STREAM_MIN_SPEECH_MS, STREAM_SILENCE_MS, FRAME_MS, ToneSynthesizer, ulaw_encode
+
+rng = random.Random(7)
+LOUD = ulaw_encode(int(rng.gauss(0, 4000)) for _ in range(FRAME_BYTES))
+QUIET = ulaw_encode([0] * FRAME_BYTES)
+
+
+def turn(phone_number, user_message, call_sid, conversation_history):
+    return {"message": "Your Apache is at the dealership.", "intent": "status", "resolution": "keyword",
+            "escalated": False, "end_call": False, "data": None, "timings": {}}
+
+
+def media(stream_sid: str, frame: bytes) -> dict:
+    return {'event': 'media', 'streamSid': stream_sid,
+            'media': {'track': 'inbound', 'payload': base64.b64encode(frame).decode('ascii')}}
+
+
+def test_reply_barge_in_and_stop(monkeypatch, call_session):
+    partials = []
+    monkeypatch.setattr(main.business_logic, "generate_response", turn)
+    monkeypatch.setattr(main, "speculate", lambda session, text: partials.append(text))
+
+    call_sid = call_session().call_sid
+    stream_sid = f"MZ{call_sid}"
+    speech_frames = 2 * STREAM_MIN_SPEECH_MS // FRAME_MS
+    silence_frames = STREAM_SILENCE_MS // FRAME_MS + 1
+
+    with TestClient(main.app).websocket_connect("/media-stream") as ws:
+        ws.send_json({'event': 'connected', 'protocol': 'Call', 'version': '1.0.0'})
+        ws.send_json({'event': 'start', 'streamSid': stream_sid, 'start': {
+            'streamSid': stream_sid, 'callSid': call_sid, 'tracks': ['inbound'],
+            'customParameters': {'fixture_transcripts': json.dumps(["where is my bike", "no wait"])}
+        }})
+
+        # One utterance: speech, then enough silence to end it
+        for frame in [LOUD] * speech_frames + [QUIET] * silence_frames:
+            ws.send_json(media(stream_sid, frame))
+
+        # The reply streams back as μ-law, then a mark once it has all been sent
+        replies = []
+        while True:
+            message = ws.receive_json()
+            assert message['streamSid'] == stream_sid
+            replies.append(message['event'])
+            if message['event'] == 'mark':
+                break
+        assert message['mark']['name'] == 'reply-1'
+        assert replies[:-1] and set(replies[:-1]) == {'media'}
+
+        # The mark isn't echoed back (still playing) - talking now interrupts the reply
+        for frame in [LOUD] * speech_frames:
+            ws.send_json(media(stream_sid, frame))
+        assert ws.receive_json() == {'event': 'clear', 'streamSid': stream_sid}
+
+        ws.send_json({'event': 'stop', 'streamSid': stream_sid, 'stop': {'callSid': call_sid}})
+        with pytest.raises(WebSocketDisconnect):
+            ws.receive_json()
+
+    assert partials and partials[0] == "where"
+    session = main.sessions.get(call_sid)
+    assert session.history_messages()[-2:] == [{"role": "user", "content": "where is my bike"},
+                                               {"role": "assistant", "content": "Your Apache is at the dealership."}]
+
+
+def test_failed_turn_is_answered_with_a_spoken_apology(monkeypatch, call_session):
+    spoken = []
+
+    async def broken_turn(session, text):
+        raise RuntimeError("connection to server was lost")
+
+    class RecordingSynthesizer(ToneSynthesizer):
+        def synthesize(self, text):
+            spoken.append(text)
+            return super().synthesize(text)
+
+    monkeypatch.setattr(main, "run_turn", broken_turn)
+    monkeypatch.setattr(main, "speculate", lambda session, text: None)
+    monkeypatch.setattr(media_stream, "MEDIA_SYNTHESIZER", "recording")
+    monkeypatch.setitem(media_stream.SYNTHESIZERS, "recording", RecordingSynthesizer)
+
+    call_sid = call_session().call_sid
+    stream_sid = f"MZ{call_sid}"
+    with TestClient(main.app).websocket_connect("/media-stream") as ws:
+        ws.send_json({'event': 'start', 'streamSid': stream_sid, 'start': {
+            'streamSid': stream_sid, 'callSid': call_sid,
+            'customParameters': {'fixture_transcripts': json.dumps(["where is my bike"])}
+        }})
+        for frame in [LOUD] * (2 * STREAM_MIN_SPEECH_MS // FRAME_MS) + [QUIET] * (STREAM_SILENCE_MS // FRAME_MS + 1):
+            ws.send_json(media(stream_sid, frame))
+
+        while (message := ws.receive_json())['event'] != 'mark':
+            assert message['event'] == 'media'
+        ws.send_json({'event': 'stop', 'streamSid': stream_sid})
+
+    assert spoken == [media_stream.REPLY_ON_ERROR]
+
+
+@pytest.mark.parametrize("url, transcriber, expected", [
+    ("wss://agent.example/media-stream", "fixture", ""),  # would never hear a live caller
+    ("wss://agent.example/media-stream", "stt.deepgram:DeepgramTranscriber", "wss://agent.example/media-stream"),
+    ("", "stt.deepgram:DeepgramTranscriber", ""),
+])
+def test_calls_only_switch_to_the_stream_with_a_live_transcriber(url, transcriber, expected):
+    assert media_stream.usable_stream_url(url, transcriber) == expected
+
+
+def test_synthesizers_must_implement_synthesize():
+    with pytest.raises(TypeError):
+        media_stream.Synthesizer()
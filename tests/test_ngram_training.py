@@ -0,0 +1,40 @@
+"""The n-gram model only learns from labels it can trust - never the LLM default or its own guesses"""
+
+import uuid
+
+from database import SessionLocal, Conversation, write_conversation_turns
+from ngram_classifier import load_training_examples
+from intent_classifier import normalize_utterance
+
+
+def test_training_examples_come_from_keyword_and_llm_turns_only(seeded_phones):
+    call_sid = f"CA-{uuid.uuid4().hex[:8]}"
+    tag = call_sid[-6:]
+    turns = [
+        (f"where has my scooter got to {tag}", 'status', 'keyword'),
+        (f"i would like my money back {tag}", 'cancellation', 'llm'),
+        (f"hmm the thing about the thing {tag}", 'status', 'llm_default'),
+        (f"when does it reach my home {tag}", 'delivery', 'ngram'),
+        (f"is it coming soon {tag}", 'delivery', None),
+    ]
+    write_conversation_turns([
+        {"call_sid": call_sid, "phone": seeded_phones[0], "turn_index": index * 2, "user_text": text,
+         "assistant_text": "ok", "intent": intent, "resolution": resolution}
+        for index, (text, intent, resolution) in enumerate(turns)
+    ])
+
+    # An unmigrated legacy call: one intent for every utterance in it
+    db = SessionLocal()
+    try:
+        db.add(Conversation(call_sid=f"{call_sid}-legacy", customer_phone=seeded_phones[0], intent='cancellation',
+                            transcript={"messages": [{"role": "user", "content": f"hello there {tag}"},
+                                                     {"role": "user", "content": f"cancel it please {tag}"}]}))
+        db.commit()
+    finally:
+        db.close()
+
+    examples = {text: intent for text, intent in load_training_examples(include_seed=False) if text.endswith(tag)}
+    assert examples == {
+        normalize_utterance(f"where has my scooter got to {tag}"): 'status',
+        normalize_utterance(f"i would like my money back {tag}"): 'cancellation',
+    }
@@ -0,0 +1,40 @@
+"""Spoken phone numbers -> the E.164 number main.py looks up (None when it must ask again)"""
+
+import pytest
+
+from benchmarks import PHONE_CORPUS
+from main import PHONE_MIN_CONFIDENCE
+from phone_parser import parse_phone_number
+
+
+def looked_up(speech: str, prefix: str = '') -> str:
+    result = parse_phone_number(speech, prefix=prefix)
+    return result['phone'] if result['confidence'] >= PHONE_MIN_CONFIDENCE else None
+
+
+@pytest.mark.parametrize("speech, expected", PHONE_CORPUS + [
+    ("nine eight seven six five treble four three two", "+919876544432"),
+    ("double nine double eight double seven double six double five", "+919988776655"),
+    ("dabal nau aath saat chhe paanch char teen do shunya", "+919987654320"),
+    ("९८७६५ ४३२१०", "+919876543210"),
+    ("plus 91 98765 43210", "+919876543210"),
+    ("nine one nine eight seven six five four three two one zero", "+919876543210"),
+    ("talk to me on nine eight seven six five four three two one zero", "+919876543210"),
+    ("nine eight seven six five four three two one zero one", None),  # too many digits
+    ("one two three four five six seven eight nine zero", None),      # not a mobile number
+])
+def test_corpus(speech, expected):
+    assert looked_up(speech) == expected
+
+
+@pytest.mark.parametrize("first, second, expected", [
+    ("nine eight seven six five", "four three two one zero", "+919876543210"),
+    ("plus nine one nine eight seven", "six five four three two one zero", "+919876543210"),
+    ("double nine eight", "seven triple five four three two", "+919987555432"),
+    # The caller started over with the whole number - the earlier digits are dropped
+    ("nine eight seven", "nine eight seven six five four three two one zero", "+919876543210"),
+])
+def test_number_given_in_parts(first, second, expected):
+    partial = parse_phone_number(first)
+    assert not partial['complete'] and partial['phone'] is None
+    assert looked_up(second, prefix=partial['digits']) == expected
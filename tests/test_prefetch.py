@@ -0,0 +1,65 @@
+"""Booking data is loaded once per call - by the prefetch when it ran - and dropped when the call ends"""
+
+import asyncio
+import threading
+
+import httpx
+
+import main
+
+
+def test_completed_prefetch_answers_the_first_lookup(logic, seeded_phones):
+    phone = seeded_phones[0]
+    logic.prefetch_call_data(phone, "CA-prefetched")
+
+    result = logic.get_booking_snapshot(phone, "CA-prefetched")
+    logic.get_booking_snapshot(phone, "CA-prefetched")
+
+    assert result['success']
+    assert logic.loads == [phone]
+    stats = logic.prefetch_stats()
+    assert (stats['started'], stats['completed'], stats['hits'], stats['misses']) == (1, 1, 1, 0)
+
+
+def test_lookup_waits_for_a_prefetch_in_flight(logic, seeded_phones):
+    phone = seeded_phones[1]
+    logic.release.clear()
+    prefetch = threading.Thread(target=logic.prefetch_call_data, args=(phone, "CA-in-flight"))
+    prefetch.start()
+    assert logic.entered.wait(5)
+    threading.Timer(0.1, logic.release.set).start()
+
+    result = logic.get_booking_snapshot(phone, "CA-in-flight")
+    prefetch.join()
+
+    assert result['success']
+    assert logic.loads == [phone]  # the turn didn't query again while the prefetch was running
+    assert logic.prefetch_stats()['hits'] == 1
+
+
+def test_lookup_for_another_number_ignores_the_prefetch(logic, seeded_phones):
+    logic.prefetch_call_data(seeded_phones[0], "CA-new-number")
+
+    logic.get_booking_snapshot(seeded_phones[2], "CA-new-number")
+
+    assert logic.loads == [seeded_phones[0], seeded_phones[2]]
+    assert logic.prefetch_stats()['misses'] == 1
+
+
+def test_call_status_drops_the_calls_cached_data(logic, call_session):
+    session = call_session(index=3)
+    logic.prefetch_call_data(session.customer_phone, session.call_sid)
+    logic.speculate_response(session.customer_phone, session.call_sid, 'status', "where is")
+    assert logic.booking_snapshots.get(session.call_sid) is not None
+
+    asyncio.run(_call_completed(session.call_sid))
+
+    assert logic.booking_snapshots.get(session.call_sid) is None
+    assert logic.speculations.get(session.call_sid) is None
+
+
+async def _call_completed(call_sid: str):
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/call-status", data={"CallSid": call_sid, "CallStatus": "completed"})
+        assert response.status_code == 200
@@ -0,0 +1,146 @@
+"""Every session backend behaves the same: create, get, save, delete, idle TTL, len and partial results"""
+
+import time
+
+import pytest
+
+from resp_server import RespStandIn
+from session_store import (CallSession, RedisClient, RedisProtocolError, RedisSessionStore, SessionStore,
+                           SQLiteSessionStore)
+
+IDLE_TTL = 1  # seconds - Redis EXPIRE has whole-second resolution
+
+
+@pytest.fixture
+def redis_server():
+    server = RespStandIn(password="s3cret").start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def store(request, tmp_path):
+    def make(idle_ttl=IDLE_TTL, max_sessions=100):
+        if request.param == "memory":
+            return SessionStore(idle_ttl=idle_ttl, max_sessions=max_sessions)
+        if request.param == "sqlite":
+            return SQLiteSessionStore(str(tmp_path / "sessions.db"), idle_ttl=idle_ttl, max_sessions=max_sessions)
+        server = request.getfixturevalue("redis_server")
+        return RedisSessionStore(server.url, idle_ttl=idle_ttl, max_sessions=max_sessions)
+    return make
+
+
+def test_create_then_get_round_trips_the_session(store):
+    sessions = store()
+    created = sessions.create("CA1", "+919800000001")
+
+    loaded = sessions.get("CA1")
+
+    assert isinstance(created, CallSession)
+    assert (loaded.call_sid, loaded.caller, loaded.stage) == ("CA1", "+919800000001", "phone_verification")
+    assert sessions.get("CA-missing") is None
+    assert sessions.get(None) is None
+
+
+def test_save_persists_changes(store):
+    sessions = store()
+    session = sessions.create("CA1", "+919800000001")
+    session.customer_phone = "+919600000003"
+    session.partial_phone = "98765"
+    session.last_intent = "status"
+    session.add_turn("where is my bike", "It's at the dealership.")
+    sessions.save(session)
+
+    loaded = sessions.get("CA1")
+
+    assert loaded.customer_phone == "+919600000003"
+    assert loaded.partial_phone == "98765"
+    assert loaded.last_intent == "status"
+    assert loaded.message_count == 2
+    assert loaded.history_messages() == [{"role": "user", "content": "where is my bike"},
+                                         {"role": "assistant", "content": "It's at the dealership."}]
+
+
+def test_delete_removes_the_session(store):
+    sessions = store()
+    sessions.create("CA1", "+919800000001")
+
+    assert sessions.delete("CA1") is True
+    assert sessions.get("CA1") is None
+    assert sessions.delete("CA1") is False
+    assert len(sessions) == 0
+
+
+def test_len_counts_live_sessions(store):
+    sessions = store()
+    for i in range(3):
+        sessions.create(f"CA{i}", "+919800000001")
+    sessions.delete("CA0")
+
+    assert len(sessions) == 2
+    assert sorted(s.call_sid for s in sessions.sessions()) == ["CA1", "CA2"]
+
+
+def test_idle_sessions_expire_and_get_refreshes_the_ttl(store):
+    sessions = store()
+    sessions.create("CA-idle", "+919800000001")
+    sessions.create("CA-active", "+919800000002")
+
+    time.sleep(IDLE_TTL * 0.6)
+    assert sessions.get("CA-active") is not None  # a webhook for this call keeps it alive
+    time.sleep(IDLE_TTL * 0.6)
+
+    assert sessions.get("CA-idle") is None
+    assert sessions.get("CA-active") is not None
+    assert len(sessions) == 1
+
+
+def test_oldest_sessions_are_evicted_past_max_sessions(store):
+    sessions = store(idle_ttl=60, max_sessions=2)
+    for i in range(3):
+        sessions.create(f"CA{i}", "+919800000001")
+        time.sleep(0.01)
+
+    assert len(sessions) == 2
+    assert sessions.get("CA0") is None
+    assert sessions.stats()['evictions'] == 1
+
+
+def test_partials_are_recorded_apart_from_the_session(store):
+    sessions = store(idle_ttl=60)
+    session = sessions.create("CA1", "+919800000001")
+    session.pending_gather = {'id': "g1", 'stage': 'phone'}
+    sessions.save(session)
+
+    sessions.record_partial("CA1", "g1", 100.0)
+    sessions.record_partial("CA1", "g1", 101.5)
+    session.partial_phone = "98765"  # an action webhook's save doesn't lose the partials, nor they its change
+    sessions.save(session)
+    sessions.record_partial("CA1", "g1", 102.0)
+
+    assert sessions.get("CA1").partial_phone == "98765"
+    assert sessions.take_partials("CA1", "g1") == (100.0, 102.0)
+    assert sessions.take_partials("CA1", "g1") is None  # taken once
+
+    sessions.record_partial("CA1", "g1", 103.0)
+    sessions.record_partial("CA1", "g2", 104.0)  # the next Gather starts its own timing
+    assert sessions.take_partials("CA1", "g2") == (104.0, 104.0)
+
+
+def test_redis_client_authenticates_selects_db_and_pipelines(redis_server):
+    client = RedisClient(redis_server.url)
+
+    replies = client.pipeline(('SET', 'k', 'v'), ('GET', 'k'), ('GET', 'missing'))
+
+    assert replies == ['OK', b'v', None]
+    assert redis_server.commands[:2] == ['AUTH', 'SELECT']
+    with pytest.raises(RedisProtocolError):
+        client.execute('NOSUCHCOMMAND')
+
+
+def test_redis_client_reconnects_after_the_connection_drops(redis_server):
+    client = RedisClient(redis_server.url)
+    client.execute('SET', 'k', 'v')
+    client._sock.close()  # server restart / idle timeout
+
+    assert client.execute('GET', 'k') == b'v'
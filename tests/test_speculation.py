@@ -0,0 +1,38 @@
+"""Answers computed from partial results are reused only when the final intent and number match"""
+
+import pytest
+
+
+def test_matching_speculation_is_reused(logic, seeded_phones):
+    phone = seeded_phones[4]
+    logic.speculate_response(phone, "CA-spec", 'delivery', "when will")
+    timings = {}
+
+    result = logic.take_speculation("CA-spec", phone, 'delivery', timings)
+
+    assert result == logic.handle_delivery_update(phone, "CA-spec")
+    assert 'speculation_saved_ms' in timings
+    assert logic.take_speculation("CA-spec", phone, 'delivery') is None  # used once
+    stats = logic.speculation_stats()
+    assert (stats['started'], stats['used'], stats['discarded']) == (1, 1, 0)
+
+
+@pytest.mark.parametrize("final_intent, final_phone", [('status', 0), ('delivery', 5)])
+def test_mismatched_speculation_is_discarded(logic, seeded_phones, final_intent, final_phone):
+    logic.speculate_response(seeded_phones[0], "CA-spec-miss", 'delivery', "when will")
+
+    assert logic.take_speculation("CA-spec-miss", seeded_phones[final_phone], final_intent) is None
+    assert logic.speculations.get("CA-spec-miss") is None
+    stats = logic.speculation_stats()
+    assert (stats['used'], stats['discarded']) == (0, 1)
+
+
+def test_partials_changing_intent_replace_the_speculation(logic, seeded_phones):
+    phone = seeded_phones[6]
+    logic.speculate_response(phone, "CA-spec-change", 'status', "where")
+    logic.speculate_response(phone, "CA-spec-change", 'delivery', "where is the delivery")
+
+    assert logic.speculation_intent("CA-spec-change", "when is the delivery") is None  # already speculated
+    assert logic.take_speculation("CA-spec-change", phone, 'delivery') is not None
+    stats = logic.speculation_stats()
+    assert (stats['started'], stats['used'], stats['discarded']) == (2, 1, 1)
@@ -0,0 +1,40 @@
+"""Pre-rendered templates produce exactly what the Twilio library builds for the same values"""
+
+import xml.etree.ElementTree as ET
+
+import pytest
+
+import twiml_templates
+from twiml_templates import PHONE_CONFIRMED_STREAM, REPLY_AND_CONTINUE, TwimlTemplate
+
+TEMPLATES = [value for value in vars(twiml_templates).values() if isinstance(value, TwimlTemplate)]
+
+PLAIN = {'timeout': 5, 'speech_timeout': 'auto', 'digits': '9 8 7 6 5', 'remaining': 5, 'phone': '+919876543210',
+         'stream_url': 'wss://agent.example/media-stream', 'message': "Your Apache is at the dealership."}
+AWKWARD = {'timeout': 5, 'speech_timeout': '2" extra="1', 'digits': '9 & 8', 'remaining': '<5>',
+           'phone': "+91 'quoted'", 'stream_url': 'wss://agent.example/s?a=1&b="2"\n<x>',
+           'message': 'Fee is 25% & refund < ₹50,000 > "soon", it\'s\nqueued'}
+
+
+def library_render(template: TwimlTemplate, values: dict) -> str:
+    build = getattr(twiml_templates, '_' + template.name)
+    return str(build(lambda name: str(values[name])))
+
+
+@pytest.mark.parametrize("values", [PLAIN, AWKWARD], ids=["plain", "awkward"])
+@pytest.mark.parametrize("template", TEMPLATES, ids=lambda template: template.name)
+def test_template_matches_the_library(template, values):
+    assert template.render(**values) == library_render(template, values)
+
+
+def test_text_and_attribute_values_are_escaped():
+    message = 'Fee & refund: <25%> "soon", it\'s queued'
+    url = 'wss://agent.example/s?a=1&b="2"<x>'
+
+    reply = ET.fromstring(REPLY_AND_CONTINUE.render(message=message, timeout=5, speech_timeout='auto'))
+    stream = ET.fromstring(PHONE_CONFIRMED_STREAM.render(phone='+919876543210', stream_url=url))
+
+    assert reply.find('Say').text == message
+    assert reply.find('Gather').get('speechTimeout') == 'auto'
+    assert stream.find('Connect/Stream').get('url') == url
+    assert '&amp;b=&quot;2&quot;&lt;x&gt;' in PHONE_CONFIRMED_STREAM.render(phone='+919876543210', stream_url=url)
@@ -0,0 +1,97 @@
+"""Spooled writes give up after WRITE_MAX_ATTEMPTS tries, and replaying them never duplicates rows"""
+
+import json
+import uuid
+
+from sqlalchemy import text
+
+from write_behind import WriteBehindQueue, _write_escalations as write_escalations
+
+
+def make_queue(tmp_path, writers: dict = None, max_attempts: int = 3) -> WriteBehindQueue:
+    return WriteBehindQueue(spool_path=str(tmp_path / "pending.jsonl"), dead_letter_path=str(tmp_path / "dead.jsonl"),
+                            writers=writers, max_attempts=max_attempts)
+
+
+def read_entries(path) -> list:
+    return [json.loads(line) for line in path.read_text().splitlines()] if path.exists() else []
+
+
+def test_poison_entry_dead_letters_and_spares_its_batch(tmp_path):
+    written = []
+
+    def write_escalations(items, replay=False):
+        if any(item['escalation_type'] == 'poison' for item in items):
+            raise ValueError("value too long for type character varying(50)")
+        written.extend(items)
+
+    queue = make_queue(tmp_path, writers={'escalation': write_escalations})
+    queue.enqueue_escalation("CA-1", "BTO1", "poison", "bad row", "ops")
+    assert [entry['attempts'] for entry in read_entries(tmp_path / "pending.jsonl")] == [1]
+
+    # Every successful flush retries the spool - the poison row burns one attempt each time
+    queue.enqueue_escalation("CA-1", "BTO1", "production_delay", "good row", "ops")
+    assert [entry['attempts'] for entry in read_entries(tmp_path / "pending.jsonl")] == [2]
+
+    # Replay isolates the bad row, so a good one spooled beside it still goes through
+    queue._append(queue.spool_path, 'escalation', [({'call_sid': "CA-2", 'booking_id': "BTO2",
+                                                      'escalation_type': "cancellation_request",
+                                                      'description': "good row", 'escalated_to': "ops"}, 1)])
+    assert queue.replay_spool() == 1
+    assert [item['escalation_type'] for item in written] == ['production_delay', 'cancellation_request']
+
+    assert not (tmp_path / "pending.jsonl").exists()
+    dead = read_entries(tmp_path / "dead.jsonl")
+    assert [(entry['payload']['escalation_type'], entry['attempts']) for entry in dead] == [('poison', 3)]
+    assert queue.stats()['dead_lettered'] == 1
+
+    # Nothing left to retry - later flushes leave the dead letter alone
+    queue.enqueue_escalation("CA-3", "BTO3", "complex_query", "good row", "ops")
+    assert len(read_entries(tmp_path / "dead.jsonl")) == 1
+
+    assert queue.requeue_dead_letters() == 1
+    assert [entry['attempts'] for entry in read_entries(tmp_path / "pending.jsonl")] == [0]
+    assert not (tmp_path / "dead.jsonl").exists()
+
+
+def test_replay_skips_escalations_and_call_logs_already_committed(tmp_path, seeded_phones):
+    from database import SessionLocal
+
+    call_sid = f"CA-{uuid.uuid4().hex[:8]}"
+    written = []
+
+    def record_escalations(items, replay=False):
+        written.extend(items)
+        write_escalations(items, replay=replay)
+
+    queue = make_queue(tmp_path)
+    queue.writers['escalation'] = record_escalations
+    queue.enqueue_escalation(call_sid, "BTO1", "production_delay", "late bike", "ops")
+    queue.enqueue_call_log(seeded_phones[0], "status", "answered", call_id=call_sid)
+
+    # The first attempt committed but its caller saw an error (e.g. the connection dropped on COMMIT's
+    # reply), so the same writes were spooled as well - and the spool may even hold them twice
+    queue._append(queue.spool_path, 'escalation', [(dict(written[0]), 1)] * 2)
+    queue._append(queue.spool_path, 'call_log', [({'phone_number': seeded_phones[0], 'intent': "status",
+                                                    'outcome': "answered", 'call_id': call_sid}, 1)] * 2)
+    queue.replay_spool()
+
+    db = SessionLocal()
+    try:
+        escalations = db.execute(text("SELECT COUNT(*) FROM escalations WHERE call_sid = :sid"), {'sid': call_sid}).scalar()
+        call_logs = db.execute(text("SELECT COUNT(*) FROM call_logs WHERE call_id = :sid"), {'sid': call_sid}).scalar()
+    finally:
+        db.close()
+    assert (escalations, call_logs) == (1, 1)
+    assert not (tmp_path / "pending.jsonl").exists()
+
+    # A second escalation of the same type in the same call is a new one, not a replay
+    queue.enqueue_escalation(call_sid, "BTO1", "production_delay", "still late", "ops")
+    queue.replay_spool()
+    db = SessionLocal()
+    try:
+        descriptions = db.execute(text("SELECT description FROM escalations WHERE call_sid = :sid ORDER BY id"),
+                                  {'sid': call_sid}).scalars().all()
+    finally:
+        db.close()
+    assert descriptions == ["late bike", "still late"]
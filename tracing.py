@@ -0,0 +1,406 @@
+"""
+Per-turn latency tracing
+Spans for each stage of a webhook turn (request parsing, session lookup, intent passes, DB
+queries, queued writes, TwiML rendering), grouped into one trace per call - the trace id is
+derived from the CallSid. Finished traces are exported as OTLP/JSON, either appended to a file
+(one ExportTraceServiceRequest per line, as the OpenTelemetry collector's file exporter writes)
+or POSTed to a collector's /v1/traces.
+
+Usage:
+    python tracing.py summary [--path traces/spans.jsonl] [--slowest 5]
+"""
+
+import argparse
+import contextvars
+import functools
+import hashlib
+import json
+import os
+import threading
+import time
+import urllib.request
+from collections import deque
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "").lower()  # '' (off) | file | otlp
+TRACE_FILE = os.getenv("TRACE_FILE", "traces/spans.jsonl")
+OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318")
+TRACE_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "tvs-voice-agent")
+TRACE_MIN_MS = float(os.getenv("TRACE_MIN_MS", "0"))  # only export requests slower than this
+TRACE_FLUSH_INTERVAL = float(os.getenv("TRACE_FLUSH_INTERVAL", "2.0"))
+TRACE_MAX_QUEUE = int(os.getenv("TRACE_MAX_QUEUE", "20000"))
+
+# OTLP enums
+KIND_INTERNAL, KIND_SERVER, KIND_CLIENT = 1, 2, 3
+STATUS_UNSET, STATUS_ERROR = 0, 2
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+def _trace_id_for(call_sid: str = None) -> str:
+    if call_sid:
+        return hashlib.md5(call_sid.encode('utf-8')).hexdigest()  # every turn of a call in one trace
+    return os.urandom(16).hex()
+
+
+class _Trace:
+    """Spans of one request, held until its root span ends so the CallSid can be set late"""
+
+    __slots__ = ('trace_id', 'call_sid', 'root', 'spans', 'closed')
+
+    def __init__(self, call_sid: str = None):
+        self.call_sid = call_sid
+        self.trace_id = _trace_id_for(call_sid)
+        self.root = None
+        self.spans = []
+        self.closed = False
+
+
+class Span:
+    __slots__ = ('name', 'kind', 'attributes', 'trace', 'span_id', 'parent_id', 'start_ns', 'end_ns',
+                 'error', '_token')
+
+    def __init__(self, name: str, trace: _Trace, parent_id: str = None, kind: int = KIND_INTERNAL,
+                 attributes: dict = None, start_ns: int = None):
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes or {}
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns = None
+        self.error = None
+        self._token = None
+        if parent_id is None:
+            trace.root = self
+
+    def set(self, key: str, value):
+        self.attributes[key] = value
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        _current_span.reset(self._token)
+        self.end()
+        return False
+
+    def end(self):
+        self.end_ns = time.time_ns()
+        tracer.finish(self)
+
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def to_otlp(self) -> dict:
+        span = {
+            'traceId': self.trace.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': self.kind,
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns),
+            'attributes': [_otlp_attribute(key, value) for key, value in self.attributes.items()
+                           if value is not None],
+            'status': {'code': STATUS_ERROR, 'message': self.error} if self.error else {'code': STATUS_UNSET}
+        }
+        if self.parent_id:
+            span['parentSpanId'] = self.parent_id
+        return span
+
+
+class _NoopSpan:
+    """Returned when tracing is off or there is no request to attach to - costs one call"""
+
+    def set(self, key, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def _otlp_attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        typed = {'boolValue': value}
+    elif isinstance(value, int):
+        typed = {'intValue': str(value)}
+    elif isinstance(value, float):
+        typed = {'doubleValue': value}
+    else:
+        typed = {'stringValue': str(value)}
+    return {'key': key, 'value': typed}
+
+
+# ---------- instrumentation API ----------
+
+def trace(name: str, call_sid: str = None, kind: int = KIND_INTERNAL, **attributes):
+    """Root span of a new request/job (use as a context manager)"""
+    if not tracer.enabled:
+        return _NOOP
+    attributes['twilio.call_sid'] = call_sid
+    return Span(name, _Trace(call_sid), kind=kind, attributes=attributes)
+
+
+def span(name: str, kind: int = KIND_INTERNAL, **attributes):
+    """Child of the current span; a no-op outside a traced request"""
+    parent = _current_span.get()
+    if parent is None:
+        return _NOOP
+    return Span(name, parent.trace, parent.span_id, kind, attributes)
+
+
+def mark(name: str, **attributes):
+    """Record a span from the start of the request until now (work done before the handler ran)"""
+    parent = _current_span.get()
+    if parent is None:
+        return
+    Span(name, parent.trace, parent.span_id, KIND_INTERNAL, attributes, start_ns=parent.start_ns).end()
+
+
+def set_call_sid(call_sid: str):
+    """Key the current request's trace by its CallSid once the form has been read"""
+    parent = _current_span.get()
+    if parent is None or not call_sid or parent.trace.closed:
+        return
+    parent.trace.call_sid = call_sid
+    parent.trace.trace_id = _trace_id_for(call_sid)
+    parent.trace.root.set('twilio.call_sid', call_sid)
+
+
+def traced(name: str, kind: int = KIND_INTERNAL, **attributes):
+    """Decorator form of span()"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, kind, **attributes):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class TraceMiddleware:
+    """ASGI middleware: one root span per HTTP request (handlers add the CallSid)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        root = trace(f"{scope['method']} {scope['path']}", kind=KIND_SERVER,
+                     **{'http.request.method': scope['method'], 'url.path': scope['path']})
+
+        async def send_with_status(message):
+            if message['type'] == 'http.response.start':
+                root.set('http.response.status_code', message['status'])
+            await send(message)
+
+        with root:
+            await self.app(scope, receive, send_with_status)
+
+
+# ---------- export ----------
+
+class Tracer:
+    """Buffers finished traces and exports them from a background thread"""
+
+    def __init__(self, exporter: str = TRACE_EXPORTER, path: str = TRACE_FILE, endpoint: str = OTLP_ENDPOINT,
+                 min_ms: float = TRACE_MIN_MS):
+        self.exporter = exporter
+        self.enabled = exporter in ('file', 'otlp')
+        self.path = path
+        self.endpoint = endpoint.rstrip('/') + '/v1/traces'
+        self.min_ms = min_ms
+        self._queue = deque(maxlen=TRACE_MAX_QUEUE)
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._running = False
+        self.counts = {'traces': 0, 'spans': 0, 'sampled_out': 0, 'exported': 0, 'dropped': 0, 'errors': 0}
+
+    def finish(self, span: Span):
+        trace = span.trace
+        with self._lock:
+            if trace.closed:
+                self._enqueue([span])  # background work that outlived its request (prefetch, speculation)
+                return
+
+            trace.spans.append(span)
+            if span.parent_id is None:
+                trace.closed = True
+                self.counts['traces'] += 1
+                if span.duration_ms() < self.min_ms:
+                    self.counts['sampled_out'] += 1
+                    return
+                self._enqueue(trace.spans)
+
+    def _enqueue(self, spans: list):
+        if len(self._queue) + len(spans) > self._queue.maxlen:
+            self.counts['dropped'] += len(spans)
+            return
+        self._queue.extend(spans)
+        self.counts['spans'] += len(spans)
+
+    def start(self):
+        if not self.enabled or self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="trace-export", daemon=True)
+        self._thread.start()
+        target = self.path if self.exporter == 'file' else self.endpoint
+        print(f"✅ Tracing enabled ({self.exporter} -> {target})")
+
+    def stop(self, timeout: float = 5.0):
+        if not self._running:
+            return
+        self._running = False
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while self._running:
+            self._wake.wait(TRACE_FLUSH_INTERVAL)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        spans = []
+        while self._queue:
+            try:
+                spans.append(self._queue.popleft())
+            except IndexError:
+                break
+        if not spans:
+            return 0
+
+        payload = json.dumps(self.export_request(spans))
+        try:
+            if self.exporter == 'otlp':
+                request = urllib.request.Request(self.endpoint, data=payload.encode('utf-8'), method='POST',
+                                                 headers={'Content-Type': 'application/json'})
+                urllib.request.urlopen(request, timeout=5).close()
+            else:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(payload + '\n')
+            self.counts['exported'] += len(spans)
+        except Exception as e:
+            self.counts['errors'] += 1
+            print(f"⚠️ Trace export failed ({len(spans)} spans dropped): {e}")
+        return len(spans)
+
+    @staticmethod
+    def export_request(spans: list) -> dict:
+        """OTLP ExportTraceServiceRequest (JSON encoding)"""
+        return {
+            'resourceSpans': [{
+                'resource': {'attributes': [_otlp_attribute('service.name', TRACE_SERVICE_NAME)]},
+                'scopeSpans': [{
+                    'scope': {'name': 'voice-agent.tracing'},
+                    'spans': [span.to_otlp() for span in spans]
+                }]
+            }]
+        }
+
+    def stats(self) -> dict:
+        return dict(self.counts, enabled=self.enabled, queued=len(self._queue))
+
+
+# Shared tracer used by main.py, business logic and the DB agent
+tracer = Tracer()
+
+
+# ---------- reading exported files ----------
+
+def load_spans(path: str) -> list:
+    spans = []
+    with open(path, encoding='utf-8') as f:
+        for line in filter(str.strip, f):
+            for resource in json.loads(line)['resourceSpans']:
+                for scope in resource['scopeSpans']:
+                    spans.extend(scope['spans'])
+    return spans
+
+
+def summarize(spans: list, slowest: int = 5) -> dict:
+    """Per-stage latency percentiles and a breakdown of the slowest requests"""
+
+    def ms(span):
+        return (int(span['endTimeUnixNano']) - int(span['startTimeUnixNano'])) / 1e6
+
+    def attribute(span, key):
+        for item in span['attributes']:
+            if item['key'] == key:
+                return next(iter(item['value'].values()))
+        return None
+
+    by_name = {}
+    children = {}
+    roots = []
+    for span in spans:
+        by_name.setdefault(span['name'], []).append(ms(span))
+        if 'parentSpanId' in span:
+            children.setdefault(span['parentSpanId'], []).append(span)
+        else:
+            roots.append(span)
+
+    def pct(values, q):
+        return round(values[min(len(values) - 1, int(q * len(values)))], 2)
+
+    stages = {}
+    for name, values in sorted(by_name.items()):
+        values.sort()
+        stages[name] = {'count': len(values), 'p50_ms': pct(values, 0.5), 'p95_ms': pct(values, 0.95),
+                        'max_ms': round(values[-1], 2)}
+
+    def breakdown(span, depth=0):
+        rows = [('  ' * depth + span['name'], round(ms(span), 2))]
+        for child in sorted(children.get(span['spanId'], []), key=lambda s: int(s['startTimeUnixNano'])):
+            rows.extend(breakdown(child, depth + 1))
+        return rows
+
+    slow = sorted(roots, key=ms, reverse=True)[:slowest]
+    return {
+        'stages': stages,
+        'slowest': [{'name': root['name'], 'call_sid': attribute(root, 'twilio.call_sid'),
+                     'total_ms': round(ms(root), 2), 'breakdown': breakdown(root)} for root in slow]
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize exported trace files")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    summary_parser = subparsers.add_parser("summary", help="per-stage p50/p95 and the slowest requests")
+    summary_parser.add_argument("--path", default=TRACE_FILE)
+    summary_parser.add_argument("--slowest", type=int, default=5)
+    args = parser.parse_args()
+
+    summary = summarize(load_spans(args.path), args.slowest)
+    print("=" * 72)
+    print(f"{'span':<40}{'count':>8}{'p50 ms':>8}{'p95 ms':>8}{'max ms':>8}")
+    print("-" * 72)
+    for name, row in summary['stages'].items():
+        print(f"{name:<40}{row['count']:>8}{row['p50_ms']:>8}{row['p95_ms']:>8}{row['max_ms']:>8}")
+    for request in summary['slowest']:
+        print(f"\n🐢 {request['name']} ({request['call_sid']}) - {request['total_ms']} ms")
+        for name, duration in request['breakdown']:
+            print(f"   {name:<50}{duration:>10} ms")
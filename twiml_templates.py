@@ -0,0 +1,223 @@
+"""
+Pre-rendered TwiML for the webhook responses
+Each response is built once with the Twilio helper library at import time and split into
+serialized fragments around its dynamic slots; a request only joins strings, escaping the
+values it fills in.
+"""
+
+import re
+from xml.sax.saxutils import escape
+
+from twilio.twiml.voice_response import VoiceResponse, Gather, Connect
+
+VOICE = 'Polly.Joanna'
+
+# What ElementTree escapes in attribute values on top of &, < and >
+_ATTRIBUTE_ENTITIES = {'"': '&quot;', '\r': '&#13;', '\n': '&#10;', '\t': '&#09;'}
+
+
+class TwimlTemplate:
+    """A VoiceResponse rendered once, with named slots filled in per request
+
+    Slot values are escaped the way the library escapes them: &, < and > in text, plus
+    quotes and line breaks in attributes.
+    """
+
+    _MARK = '@@TWIML_SLOT_{}@@'
+
+    def __init__(self, build):
+        """`build(slot)` returns a VoiceResponse; use slot('name') wherever a value goes
+
+        A name may be used more than once (every Gather in a response shares 'timeout').
+        """
+
+        self.name = build.__name__.strip('_')
+        self.slots = []
+
+        def slot(name: str) -> str:
+            self.slots.append(name)
+            return self._MARK.format(name)
+
+        rendered = str(build(slot))
+
+        # Alternate literal fragments and slot names in document order: [text, name, text, ..., text]
+        self._parts = re.split(self._MARK.format('(\\w+)'), rendered)
+        self.static = rendered if not self.slots else None
+
+        # A slot is inside an attribute when its tag is still open (literal text has no raw < or >)
+        self._entities = {}
+        for i in range(1, len(self._parts), 2):
+            before = ''.join(self._parts[0:i:2])
+            self._entities[i] = _ATTRIBUTE_ENTITIES if before.rfind('<') > before.rfind('>') else {}
+
+    def render(self, **values) -> str:
+        if self.static is not None:
+            return self.static
+
+        parts = self._parts[:]
+        for i in range(1, len(parts), 2):
+            parts[i] = escape(str(values[parts[i]]), self._entities[i])
+        return ''.join(parts)
+
+
+def _phone_gather(slot, prompt: str, voice: str = None) -> Gather:
+    gather = Gather(
+        input='speech',
+        action='/get-phone-number',
+        method='POST',
+        timeout=slot('timeout'),  # per stage and caller, see gather_tuning
+        speech_timeout=slot('speech_timeout'),
+        language='en-IN',
+        partial_result_callback='/partial-speech',
+        partial_result_callback_method='POST'
+    )
+    if voice:
+        gather.say(prompt, voice=voice)
+    else:
+        gather.say(prompt)
+    return gather
+
+
+def _speech_gather(slot, **kwargs) -> Gather:
+    return Gather(
+        input='speech',
+        action='/process-speech',
+        method='POST',
+        timeout=slot('timeout'),
+        speech_timeout=slot('speech_timeout'),
+        language='en-IN',
+        partial_result_callback='/partial-speech',  # interim transcripts start the answer early
+        partial_result_callback_method='POST',
+        **kwargs
+    )
+
+
+def _greeting(slot):
+    response = VoiceResponse()
+    response.say("Hello! Welcome to TVS vehicle booking support.", voice=VOICE, language='en-IN')
+    response.pause(length=1)
+    response.append(_phone_gather(
+        slot, "To help you better, please provide your mobile number. Say your 10-digit number.", voice=VOICE
+    ))
+    response.say("I didn't hear your number. Please call back. Goodbye!")
+    return response
+
+
+def _phone_not_heard(slot):
+    response = VoiceResponse()
+    response.say("I'm sorry, I didn't catch your number. Please try again.", voice=VOICE)
+    response.pause(length=1)
+    response.append(_phone_gather(slot, "Please say your 10-digit mobile number."))
+    return response
+
+
+def _phone_partial(slot):
+    response = VoiceResponse()
+    response.append(_phone_gather(
+        slot, f"I got {slot('digits')}. Please say the remaining {slot('remaining')} digits.", voice=VOICE
+    ))
+    return response
+
+
+def _phone_retry(slot):
+    response = VoiceResponse()
+    response.say("I'm sorry, I couldn't understand the number. Let me try again.", voice=VOICE)
+    response.pause(length=1)
+    response.append(_phone_gather(slot, "Please say your 10-digit mobile number clearly."))
+    return response
+
+
+def _phone_confirmed(slot):
+    response = VoiceResponse()
+    response.say(
+        f"Thank you! I have your number as {slot('phone')}. Let me retrieve your booking details.",
+        voice=VOICE,
+        language='en-IN'
+    )
+    response.pause(length=2)
+    gather = _speech_gather(slot, num_digits=0, hints='status,delivery,cancel,where,when')
+    gather.say(
+        "Now, how can I help you today? Ask about your vehicle status, delivery updates, or cancellation.",
+        voice=VOICE
+    )
+    response.append(gather)
+    response.say("I didn't hear your question. Please call back. Goodbye!", voice=VOICE)
+    return response
+
+
+def _phone_confirmed_stream(slot):
+    response = VoiceResponse()
+    response.say(
+        f"Thank you! I have your number as {slot('phone')}. Now, how can I help you today? "
+        "Ask about your vehicle status, delivery updates, or cancellation.",
+        voice=VOICE,
+        language='en-IN'
+    )
+    connect = Connect()
+    connect.stream(url=slot('stream_url'))  # the rest of the call runs over the media stream
+    response.append(connect)
+    response.hangup()
+    return response
+
+
+def _session_expired(slot):
+    response = VoiceResponse()
+    response.say("Session expired. Please call back.")
+    response.hangup()
+    return response
+
+
+def _phone_needed(slot):
+    response = VoiceResponse()
+    response.say("I need to verify your phone number first.")
+    gather = Gather(input='speech', action='/get-phone-number', method='POST', timeout=5)
+    gather.say("Please say your 10-digit mobile number.")
+    response.append(gather)
+    return response
+
+
+def _speech_not_heard(slot):
+    response = VoiceResponse()
+    response.say("I'm sorry, I didn't catch that. Please speak clearly.", voice=VOICE)
+    response.pause(length=1)
+    gather = _speech_gather(slot)
+    gather.say("What would you like to know?")
+    response.append(gather)
+    return response
+
+
+def _reply_and_continue(slot):
+    response = VoiceResponse()
+    response.pause(length=0.5)
+    response.say(slot('message'), voice=VOICE, language='en-IN')
+    response.pause(length=0.5)
+    response.pause(length=1)
+    gather = _speech_gather(slot, hints='delivery,status,cancel,when,where')
+    gather.say("Is there anything else I can help you with?", voice=VOICE)
+    response.append(gather)
+    response.say("I didn't hear your response. Thank you for calling. Goodbye!", voice=VOICE)
+    return response
+
+
+def _reply_and_goodbye(slot):
+    response = VoiceResponse()
+    response.pause(length=0.5)
+    response.say(slot('message'), voice=VOICE, language='en-IN')
+    response.pause(length=0.5)
+    response.say("Thank you for choosing TVS. Goodbye!", voice=VOICE)
+    response.hangup()
+    return response
+
+
+# Rendered once per process
+GREETING = TwimlTemplate(_greeting)
+PHONE_NOT_HEARD = TwimlTemplate(_phone_not_heard)
+PHONE_PARTIAL = TwimlTemplate(_phone_partial)
+PHONE_RETRY = TwimlTemplate(_phone_retry)
+PHONE_CONFIRMED = TwimlTemplate(_phone_confirmed)
+PHONE_CONFIRMED_STREAM = TwimlTemplate(_phone_confirmed_stream)
+SESSION_EXPIRED = TwimlTemplate(_session_expired)
+PHONE_NEEDED = TwimlTemplate(_phone_needed)
+SPEECH_NOT_HEARD = TwimlTemplate(_speech_not_heard)
+REPLY_AND_CONTINUE = TwimlTemplate(_reply_and_continue)
+REPLY_AND_GOODBYE = TwimlTemplate(_reply_and_goodbye)
@@ -0,0 +1,295 @@
+"""
+Write-behind queue for call records
+Conversation turns, escalations and call logs are written after Twilio has its reply:
+batched, coalesced per call, flushed on size/time/shutdown, spooled to disk if the DB is down.
+Spooled entries carry an attempt count and go to a dead-letter file after WRITE_MAX_ATTEMPTS tries
+"""
+
+import argparse
+import json
+import os
+import threading
+import uuid
+from datetime import datetime
+from dotenv import load_dotenv
+
+import metrics
+import tracing
+
+load_dotenv()
+
+WRITE_FLUSH_SIZE = int(os.getenv("WRITE_FLUSH_SIZE", "100"))
+WRITE_FLUSH_INTERVAL = float(os.getenv("WRITE_FLUSH_INTERVAL", "1.0"))
+WRITE_SPOOL_PATH = os.getenv("WRITE_SPOOL_PATH", "spool/pending_writes.jsonl")
+WRITE_MAX_ATTEMPTS = int(os.getenv("WRITE_MAX_ATTEMPTS", "5"))
+WRITE_DEAD_LETTER_PATH = os.getenv("WRITE_DEAD_LETTER_PATH", "spool/dead_letter.jsonl")
+
+KINDS = ('turn', 'escalation', 'call_log')
+
+
+# Writers get replay=True for spooled entries: the failed attempt may have committed before it
+# raised, so anything without a unique constraint to lean on must skip rows that already exist
+
+def _write_turns(items: list, replay: bool = False):
+    from database import write_conversation_turns
+    write_conversation_turns(items)  # (call_sid, turn_index) conflicts are already ignored
+
+
+def _write_escalations(items: list, replay: bool = False):
+    from database import create_escalations
+    create_escalations(items, skip_existing=replay)
+
+
+def _write_call_logs(items: list, replay: bool = False):
+    from langchain_agent import TVSBTOAgent
+    result = TVSBTOAgent().log_calls(items, skip_existing=replay)
+    if not result['success']:
+        raise RuntimeError(result.get('error'))
+
+
+class WriteBehindQueue:
+    """Buffers DB writes off the response path and flushes them in batches"""
+
+    def __init__(self, flush_size: int = WRITE_FLUSH_SIZE, flush_interval: float = WRITE_FLUSH_INTERVAL,
+                 spool_path: str = WRITE_SPOOL_PATH, writers: dict = None,
+                 max_attempts: int = WRITE_MAX_ATTEMPTS, dead_letter_path: str = WRITE_DEAD_LETTER_PATH):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.spool_path = spool_path
+        self.max_attempts = max_attempts
+        self.dead_letter_path = dead_letter_path
+        self.writers = writers or {
+            'turn': _write_turns,
+            'escalation': _write_escalations,
+            'call_log': _write_call_logs
+        }
+        self._pending = []
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._running = False
+        self.stats_counts = {'enqueued': 0, 'written': 0, 'batches': 0, 'spooled': 0, 'replayed': 0,
+                             'dead_lettered': 0, 'errors': 0}
+
+    # ---------- producers ----------
+
+    def enqueue(self, kind: str, payload: dict):
+        if kind not in KINDS:
+            raise ValueError(f"Unknown write kind: {kind}")
+
+        payload.setdefault('at', datetime.now().isoformat())
+        with tracing.span(f'{kind}.enqueue'), self._cond:
+            self._pending.append((kind, payload, 0))
+            self.stats_counts['enqueued'] += 1
+            size = len(self._pending)
+            if self._running and size >= self.flush_size:
+                self._cond.notify()
+
+        if not self._running:
+            self.flush()  # no background thread (scripts, tests) - write through
+
+    def enqueue_turn(self, call_sid: str, phone: str, turn_index: int, user_text: str, assistant_text: str, intent: str,
+                     resolution: str = None):
+        self.enqueue('turn', {
+            'call_sid': call_sid,
+            'phone': phone,
+            'turn_index': turn_index,
+            'user_text': user_text,
+            'assistant_text': assistant_text,
+            'intent': intent,
+            'resolution': resolution
+        })
+
+    def enqueue_escalation(self, call_sid: str, booking_id: str, escalation_type: str, description: str, escalated_to: str):
+        self.enqueue('escalation', {
+            'call_sid': call_sid,
+            'booking_id': booking_id,
+            'escalation_type': escalation_type,
+            'description': description,
+            'escalated_to': escalated_to,
+            'write_id': uuid.uuid4().hex  # replays dedupe on this, not on the call and type
+        })
+        metrics.ESCALATIONS.inc(type=escalation_type)
+        print(f"⚠️ Escalation queued: {escalation_type}")
+
+    def enqueue_call_log(self, phone_number: str, intent: str, outcome: str, call_id: str = None):
+        self.enqueue('call_log', {
+            'phone_number': phone_number,
+            'intent': intent,
+            'outcome': outcome,
+            'call_id': call_id
+        })
+
+    # ---------- lifecycle ----------
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self.replay_spool()
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+        print(f"✅ Write-behind queue started (batch {self.flush_size}, every {self.flush_interval}s)")
+
+    def stop(self, timeout: float = 10.0):
+        """Stop the flusher and drain everything that is still buffered"""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+        print(f"✅ Write-behind queue drained ({self.stats_counts['written']} writes)")
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._running and len(self._pending) < self.flush_size:
+                    self._cond.wait(self.flush_interval)
+                if not self._running:
+                    return
+            self.flush()
+
+    # ---------- flushing ----------
+
+    def flush(self) -> int:
+        """Write everything buffered; failed batches go to the spool file"""
+        with self._flush_lock:
+            with self._cond:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+
+            written = self._write_batch(batch)
+            if written == len(batch):
+                self.replay_spool(locked=True)
+            return written
+
+    def _write_batch(self, batch: list, replay: bool = False) -> int:
+        """Write (kind, payload, attempts) entries grouped by kind; failed groups are spooled"""
+        grouped = {kind: [] for kind in KINDS}
+        for kind, payload, attempts in batch:
+            grouped[kind].append((payload, attempts))
+
+        written = 0
+        for kind, entries in grouped.items():
+            if not entries:
+                continue
+            if self._write_group(kind, entries, replay):
+                written += len(entries)
+            elif replay and len(entries) > 1:
+                # The DB was up a moment ago, so this is likely one bad row - retry one by one so it
+                # alone burns attempts instead of dragging its whole batch to the dead-letter file
+                for entry in entries:
+                    if self._write_group(kind, [entry], replay):
+                        written += 1
+                    else:
+                        self._spool(kind, [entry])
+            else:
+                self._spool(kind, entries)
+        return written
+
+    def _write_group(self, kind: str, entries: list, replay: bool) -> bool:
+        try:
+            with tracing.trace(f'write_behind.{kind}', items=len(entries)):
+                self.writers[kind]([payload for payload, _ in entries], replay=replay)
+        except Exception as e:
+            print(f"❌ Write-behind {kind} batch failed ({len(entries)} items): {e}")
+            self.stats_counts['errors'] += 1
+            return False
+        self.stats_counts['written'] += len(entries)
+        self.stats_counts['batches'] += 1
+        return True
+
+    def _spool(self, kind: str, entries: list):
+        """Append failed (payload, attempts) entries to the spool, or dead-letter them when out of tries"""
+        retry, dead = [], []
+        for payload, attempts in entries:
+            (dead if attempts + 1 >= self.max_attempts else retry).append((payload, attempts + 1))
+
+        if retry:
+            self._append(self.spool_path, kind, retry)
+            self.stats_counts['spooled'] += len(retry)
+            print(f"💽 Spooled {len(retry)} {kind} writes to {self.spool_path}")
+        if dead:
+            self._append(self.dead_letter_path, kind, dead)
+            self.stats_counts['dead_lettered'] += len(dead)
+            print(f"🪦 {len(dead)} {kind} writes failed {self.max_attempts} times - moved to {self.dead_letter_path}")
+
+    @staticmethod
+    def _append(path: str, kind: str, entries: list):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as spool:
+            for payload, attempts in entries:
+                spool.write(json.dumps({'kind': kind, 'payload': payload, 'attempts': attempts}) + '\n')
+            spool.flush()
+            os.fsync(spool.fileno())
+
+    def replay_spool(self, locked: bool = False) -> int:
+        """Retry writes that were spooled while the DB was unreachable"""
+        replay_path = self.spool_path + '.replay'
+        if not os.path.exists(self.spool_path) and not os.path.exists(replay_path):
+            return 0
+
+        if not locked:
+            with self._flush_lock:
+                return self.replay_spool(locked=True)
+
+        # Move the spool aside first so failures during replay re-spool cleanly
+        # (a leftover .replay file means we crashed mid-replay - pick it up again)
+        if os.path.exists(self.spool_path):
+            if os.path.exists(replay_path):
+                with open(self.spool_path, encoding='utf-8') as spool, open(replay_path, 'a', encoding='utf-8') as leftover:
+                    leftover.write(spool.read())
+                os.remove(self.spool_path)
+            else:
+                os.replace(self.spool_path, replay_path)
+        with open(replay_path, encoding='utf-8') as spool:
+            batch = [(entry['kind'], entry['payload'], entry.get('attempts', 1))
+                     for entry in map(json.loads, filter(str.strip, spool))]
+
+        written = self._write_batch(batch, replay=True) if batch else 0
+        os.remove(replay_path)
+        self.stats_counts['replayed'] += written
+        if written:
+            print(f"♻️ Replayed {written} spooled writes")
+        return written
+
+    def requeue_dead_letters(self) -> int:
+        """Move dead-lettered writes back to the spool with fresh attempts (after fixing the cause)"""
+        if not os.path.exists(self.dead_letter_path):
+            return 0
+
+        with self._flush_lock:
+            with open(self.dead_letter_path, encoding='utf-8') as dead:
+                entries = [json.loads(line) for line in filter(str.strip, dead)]
+            for entry in entries:
+                self._append(self.spool_path, entry['kind'], [(entry['payload'], 0)])
+            os.remove(self.dead_letter_path)
+        print(f"♻️ Requeued {len(entries)} dead-lettered writes")
+        return len(entries)
+
+    def stats(self) -> dict:
+        with self._cond:
+            pending = len(self._pending)
+        return dict(self.stats_counts, pending=pending, running=self._running)
+
+
+# Shared queue used by main.py and business logic
+write_queue = WriteBehindQueue()
+
+
+if __name__ == "__main__":
+    # Flush spooled writes by hand, e.g. after a DB outage with the server stopped
+    parser = argparse.ArgumentParser(description="Replay spooled write-behind entries")
+    parser.add_argument("--requeue-dead", action="store_true",
+                        help=f"Move {WRITE_DEAD_LETTER_PATH} back to the spool before replaying")
+    args = parser.parse_args()
+
+    if args.requeue_dead:
+        write_queue.requeue_dead_letters()
+    replayed = write_queue.replay_spool()
+    print(f"Replayed {replayed} writes from {WRITE_SPOOL_PATH}")